@@ -0,0 +1,79 @@
+import math
+import time
+
+class AnalysisRateController:
+    # Adaptive frame skipping for ImageConsumer.ImageWorker. Only every `stride`-th captured frame is analysed; the stride is
+    # re-chosen every ADJUST_INTERVAL seconds from the measured per-frame analysis cost and the measured capture rate,
+    # so the analysis rate stays within [min_rate, max_rate] and below what the analyzer can sustain.
+    # Skipped frames are still reported (with analysis_skipped set), and the rolling windows are time based,
+    # so PERCLOS and blink rates keep their meaning at any stride
+    ADJUST_INTERVAL = 1.0   #In seconds
+    COST_SMOOTHING = 0.2    #Weight of the newest cost in the moving average
+    HEADROOM = 0.8          #Share of the analyzer's time the face model may use
+
+    def __init__(self, capture_fps, min_rate, max_rate) -> None:
+        self.capture_fps = max(1.0, float(capture_fps))
+        self.min_rate = max(0.1, float(min_rate))
+        self.max_rate = max(self.min_rate, float(max_rate))
+        self.stride = 1
+        self.counter = 0
+        self.cost = None
+        self.window_start = time.monotonic()
+        self.window_frames = 0
+
+        # Stats
+        self.frames_seen = 0
+        self.frames_analysed = 0
+        self.frames_skipped = 0
+        self.max_stride = 1
+
+    def should_analyse(self):
+        # Called once per captured frame
+        self.frames_seen += 1
+        self.window_frames += 1
+        now = time.monotonic()
+        if now - self.window_start >= self.ADJUST_INTERVAL:
+            self.capture_fps = max(1.0, self.window_frames / (now - self.window_start))
+            self.window_start = now
+            self.window_frames = 0
+            self.adjust()
+
+        self.counter += 1
+        if self.counter >= self.stride:
+            self.counter = 0
+            self.frames_analysed += 1
+            return True
+        self.frames_skipped += 1
+        return False
+
+    def record_cost(self, seconds):
+        # Time spent analysing one frame
+        if self.cost is None:
+            self.cost = seconds
+        else:
+            self.cost += self.COST_SMOOTHING * (seconds - self.cost)
+
+    def get_analysis_rate(self):
+        return self.capture_fps / self.stride
+
+    def adjust(self):
+        target_rate = self.max_rate
+        if self.cost:
+            target_rate = min(target_rate, self.HEADROOM / self.cost)
+        target_rate = max(target_rate, self.min_rate)
+        stride = max(1, math.ceil(self.capture_fps / target_rate))
+        # Never go under the minimum analysis rate, even if frames then queue up
+        stride = min(stride, max(1, math.floor(self.capture_fps / self.min_rate)))
+        self.stride = stride
+        self.max_stride = max(self.max_stride, stride)
+
+    def get_stats(self):
+        return {
+            'frames_seen': self.frames_seen,
+            'frames_analysed': self.frames_analysed,
+            'frames_skipped': self.frames_skipped,
+            'stride': self.stride,
+            'max_stride': self.max_stride,
+            'avg_analysis_cost': self.cost or 0.0,
+            'capture_fps': self.capture_fps
+        }
@@ -0,0 +1,163 @@
+import multiprocessing
+import queue
+import sys
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+import cv2 as cv
+import numpy as np
+
+class AnalysisWorker:
+    # Runs FaceAnalyzer.process/process_eyes in a child process.
+    # RGB frames are written straight into a shared-memory ring of slots, only (slot, frame info) goes through the request queue,
+    # and each result comes back as a small EyeMeasurement record. Up to `slots` frames can be in flight, so the parent
+    # converts, draws, logs and previews frame N while the child runs inference on frame N+1.
+    # With max_faces > 1 each result is the list of measure_faces, one EyeMeasurement per face
+    DEFAULT_SLOTS = int(3)
+    START_TIMEOUT = 120     #In seconds, mediapipe graph creation can be slow on first start
+    STOP_TIMEOUT = 10       #In seconds
+    RESULT_POLL_INTERVAL = 0.5  #In seconds, how often a blocked get_result checks the child is still alive
+
+    def __init__(self, frame_shape, blink_detection_threshold, slots=DEFAULT_SLOTS, analysis_resolution=0, face_roi_cropping=False, max_faces=1) -> None:
+        self.frame_shape = tuple(frame_shape)
+        self.slots = max(1, int(slots))
+        frame_size = int(np.prod(self.frame_shape))
+        self.shared_frames = shared_memory.SharedMemory(create=True, size=frame_size * self.slots)
+        self.frames = np.ndarray((self.slots,) + self.frame_shape, dtype=np.uint8, buffer=self.shared_frames.buf)
+        self.free_slots = deque(range(self.slots))
+        self.in_flight = 0
+        # Frame info of the frames in flight, oldest first, so they can be accounted for if the child dies
+        self.pending = deque()
+        self.failed = False
+        self.frames_rejected = 0
+        self.frames_lost = 0
+        self.last_inference_time = 0.0     #In seconds, measured in the child for the last result
+
+        # spawn: the child starts from a clean interpreter, without the parent's Qt state
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(target=run_inference, args=(self.shared_frames.name, self.frame_shape, self.slots, blink_detection_threshold, analysis_resolution, face_roi_cropping, max_faces, self.requests, self.results), daemon=True)
+        self.process.start()
+        # The child reports once its face model is built. If it never does, the worker is failed and already cleaned up
+        self.started = self.wait_for_start()
+        if not self.started:
+            self.failed = True
+            print(f"Analysis process did not start (exit code {self.process.exitcode})")
+            self.shutdown()
+
+    def wait_for_start(self):
+        deadline = time.monotonic() + self.START_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                self.results.get(timeout=self.RESULT_POLL_INTERVAL)
+                return True
+            except queue.Empty:
+                if not self.process.is_alive():
+                    # Crashed while importing or building the face model
+                    return False
+        return False
+
+    def can_submit(self):
+        return not self.failed and len(self.free_slots) > 0
+
+    def submit(self, frame, frame_info):
+        # Converts the BGR frame to RGB directly into a free slot and queues it for inference. Returns False if it could not
+        if self.failed or frame.shape != self.frame_shape or not self.free_slots:
+            self.frames_rejected += 1
+            return False
+        slot = self.free_slots.popleft()
+        cv.cvtColor(frame, cv.COLOR_BGR2RGB, dst=self.frames[slot])
+        self.requests.put((slot, frame_info))
+        self.pending.append(frame_info)
+        self.in_flight += 1
+        return True
+
+    def get_result(self, block=True):
+        # Returns (image, frame_info, measurement, slot) for the oldest frame in flight, or None.
+        # image is a view of the slot: call release(slot) once done with it.
+        # None while blocking means the child died: check failed and take_lost_frames()
+        if self.in_flight == 0:
+            return None
+        while True:
+            try:
+                slot, frame_info, measurement, self.last_inference_time = self.results.get(timeout=self.RESULT_POLL_INTERVAL) if block else self.results.get_nowait()
+                break
+            except queue.Empty:
+                if self.process.is_alive():
+                    if not block:
+                        return None
+                    continue
+                self.fail()
+                return None
+        self.in_flight -= 1
+        self.pending.popleft()
+        return self.frames[slot], frame_info, measurement, slot
+
+    def fail(self):
+        # The child died (crash, out of memory, killed): nothing in flight will come back, the slots are free again
+        self.failed = True
+        print(f"Analysis process died (exit code {self.process.exitcode}) with {self.in_flight} frames in flight")
+        self.frames_lost += self.in_flight
+        self.in_flight = 0
+        self.free_slots = deque(range(self.slots))
+
+    def take_lost_frames(self):
+        # Frame info of the frames that were in flight when the child died
+        lost = list(self.pending)
+        self.pending.clear()
+        return lost
+
+    def release(self, slot):
+        self.free_slots.append(slot)
+
+    def shutdown(self):
+        # Safe to call more than once
+        if self.shared_frames is None:
+            return
+        self.requests.put(None)
+        self.process.join(timeout=self.STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.frames = None
+        self.shared_frames.close()
+        self.shared_frames.unlink()
+        self.shared_frames = None
+
+def run_inference(shared_frames_name, frame_shape, slots, blink_detection_threshold, analysis_resolution, face_roi_cropping, max_faces, requests, results):
+    # Child process entry point. mediapipe is only imported here
+    from FaceAnalyzer import FaceAnalyzer
+    from Model.FrameAnalyzer import measure_eyes, measure_faces
+    from Model.EyeLandmarkIndex import EyeLandmarkIndex
+    from Model.FaceRoiTracker import FaceRoiTracker
+
+    shared_frames = shared_memory.SharedMemory(name=shared_frames_name)
+    frames = np.ndarray((slots,) + frame_shape, dtype=np.uint8, buffer=shared_frames.buf)
+    fa = FaceAnalyzer(max_nb_faces=max_faces)
+    # Cropping around one face would hide the others
+    tracker = FaceRoiTracker(analysis_resolution, face_roi_cropping and max_faces == 1)
+    landmark_index = EyeLandmarkIndex()
+    results.put(None)
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            slot, frame_info = request
+            inference_start = time.perf_counter()
+            try:
+                if max_faces > 1:
+                    measurement = measure_faces(fa, frames[slot], tracker, landmark_index=landmark_index)
+                else:
+                    measurement = measure_eyes(fa, frames[slot], blink_detection_threshold, tracker, landmark_index=landmark_index)
+            except:
+                print("Inference failed: ", sys.exc_info())
+                measurement = [] if max_faces > 1 else None
+            if measurement is not None and max_faces == 1:
+                # Face objects hold mediapipe state and stay in this process
+                measurement.face = None
+            results.put((slot, frame_info, measurement, time.perf_counter() - inference_start))
+    finally:
+        del frames
+        shared_frames.close()
@@ -0,0 +1,52 @@
+import sys
+
+import cv2 as cv
+
+# Camera opening and mode negotiation for ImageProducer.
+# Linux uses V4L2 directly: the requested fourcc, resolution and frame rate are negotiated with the driver,
+# which then paces the capture loop (grab() blocks until the next frame). Windows keeps DirectShow.
+
+def capture_api():
+    if sys.platform.startswith("linux"):
+        return cv.CAP_V4L2
+    if sys.platform.startswith("win"):
+        return cv.CAP_DSHOW
+    return cv.CAP_ANY
+
+def is_driver_paced(api):
+    # With V4L2 the driver delivers frames at the negotiated rate, no sleep pacing is needed
+    return api == cv.CAP_V4L2
+
+def fourcc_to_str(value):
+    value = int(value)
+    if value <= 0:
+        return ""
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00")
+
+def open_camera(camera, fps, width=0, height=0, fourcc=""):
+    # Returns (cap, mode) where mode holds what the driver actually accepted. 0/"" keep the driver default
+    api = capture_api()
+    cap = cv.VideoCapture(camera, api)
+    if not cap.isOpened():
+        return cap, None
+
+    # V4L2 picks the frame size list from the pixel format, so the fourcc goes first
+    if fourcc:
+        cap.set(cv.CAP_PROP_FOURCC, cv.VideoWriter_fourcc(*fourcc))
+    if width and height:
+        cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv.CAP_PROP_FPS, fps)
+    if is_driver_paced(api):
+        # Keep the driver queue short, a stale frame is worth less than a fresh one
+        cap.set(cv.CAP_PROP_BUFFERSIZE, 1)
+
+    mode = {
+        'api': cap.getBackendName(),
+        'width': int(cap.get(cv.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv.CAP_PROP_FPS),
+        'fourcc': fourcc_to_str(cap.get(cv.CAP_PROP_FOURCC)),
+        'driver_paced': is_driver_paced(api)
+    }
+    return cap, mode
@@ -1,3 +1,5 @@
+import copy
+
 class CaptureConfig:
     # Default values
     DEFAULT_PERCLOS_HIGH_THRESHOLD = int(20)   #As percentage (i.e., 20 = 20%, 15 = 15%)
@@ -8,6 +10,48 @@ class CaptureConfig:
     DEFAULT_BLINK_DETECTION_THRESHOLD = float(0.35)
     DEFAULT_BLINK_WINDOW_SIZE = int(15)          #In seconds
     DEFAULT_FPS = int(40)
+    LANDMARK_SPACE = "frame_pixels"               #Written to config.csv: landmark columns are in pixels of the captured frame (reports before it: 640x480 scaled)
+    CAPTURE_FOURCCS = ["", "MJPG", "YUYV"]        #Pixel format requested from the camera, "" = driver default. MJPG needs less USB bandwidth
+    DEFAULT_CAPTURE_FOURCC = ""
+    DEFAULT_CAPTURE_WIDTH = int(0)                #In pixels, 0 = driver default
+    DEFAULT_CAPTURE_HEIGHT = int(0)               #In pixels, 0 = driver default
+    FRAME_SOURCES = ["camera", "video", "images", "synthetic"]   #Where frames come from. video/images replay frame_source_path, synthetic generates frames
+    DEFAULT_FRAME_SOURCE = "camera"
+    DEFAULT_FRAME_SOURCE_PATH = ""                #Video file or image directory replayed by the video/images sources
+    FRAME_SOURCE_PACINGS = ["realtime", "fast"]   #realtime: replay at the recorded frame rate. fast: as fast as the pipeline takes frames, none dropped
+    DEFAULT_FRAME_SOURCE_PACING = "realtime"
+    DEFAULT_FRAME_SOURCE_LOOP = False             #Start the replay over at the end of the video/images
+    DEFAULT_ASYNC_REPORT_WRITING = True
+    DEFAULT_REPORT_FLUSH_ROWS = int(20)           #Rows buffered by the report writer before flushing to disk
+    DEFAULT_REPORT_FLUSH_INTERVAL = float(1.0)    #In seconds
+    DEFAULT_REPORT_QUEUE_SIZE = int(2048)         #Max rows waiting for the report writer
+    DEFAULT_REPORT_CHUNK_SIZE = int(0)            #In MB of compressed data. Split data.csv into compressed chunks of this size, 0 = no size limit
+    DEFAULT_REPORT_CHUNK_DURATION = int(0)        #In minutes. Split data.csv into compressed chunks of this duration, 0 = no time limit
+    DEFAULT_BINARY_RECORDING = False              #Also record data as chunked .npy columns next to data.csv
+    DEFAULT_BINARY_CHUNK_ROWS = int(1024)         #Rows per binary recording chunk
+    DEFAULT_RECORD_RAW_VIDEO = False              #Record the camera frames of each trial in a separate encoder process
+    DEFAULT_RAW_VIDEO_BUFFER_SLOTS = int(8)       #Frames that can wait for the encoder before new ones are dropped
+    ANALYSIS_MODES = ["thread", "process"]        #thread: face model runs in the analyzer QThread. process: in a child process fed through shared memory
+    DEFAULT_ANALYSIS_MODE = "thread"
+    DEFAULT_ANALYSIS_WORKER_SLOTS = int(3)        #Frames in flight to the analysis process
+    FRAME_HANDOFF_POLICIES = ["fifo", "latest"]   #fifo: analyse queued frames in order. latest: always analyse the freshest frame, dropping stale ones
+    DEFAULT_FRAME_HANDOFF = "fifo"
+    DEFAULT_FRAME_QUEUE_SIZE = int(5)             #Frames the fifo hand-off keeps before dropping new ones
+    DEFAULT_FRAME_POOL_SIZE = int(8)              #Preallocated capture buffers, must exceed the frame queue size plus frames held by consumers
+    DEFAULT_ADAPTIVE_FRAME_SKIPPING = False       #Analyse every Nth frame, N chosen from the measured analysis cost
+    DEFAULT_MIN_ANALYSIS_RATE = float(10)         #In analysed frames per second, lower bound of adaptive frame skipping
+    DEFAULT_MAX_ANALYSIS_RATE = float(30)         #In analysed frames per second, upper bound of adaptive frame skipping
+    DEFAULT_ANALYSIS_RESOLUTION = int(0)          #Longest side, in pixels, of the image given to the face model. 0 = camera resolution
+    DEFAULT_FACE_ROI_CROPPING = False             #Only analyse the region around the face found in the previous frame
+    DEFAULT_MAX_FACES = int(1)                    #Faces tracked per frame. 1 = only frames with exactly one face are analysed
+    PRIMARY_FACE_POLICIES = ["persistent", "largest"]   #persistent: the face tracked for longest. largest: the biggest face
+    DEFAULT_PRIMARY_FACE_POLICY = "persistent"    #Which tracked face is the participant, when max_faces > 1
+    OVERLAY_MODES = ["pixels", "widgets", "off"]  #pixels: HUD burned into the frame. widgets: HUD drawn as Qt labels over the preview. off: no overlay at all
+    DEFAULT_OVERLAY_MODE = "pixels"
+    DEFAULT_PREVIEW_FPS = int(20)                 #Max preview frames per second, independent of capture and analysis FPS
+    DEFAULT_SHOW_STATS_PANEL = False              #Show per-stage latencies and pipeline counters next to the video feed
+    MAX_PARTICIPANTS = int(4)                     #Capture pipelines (camera + participant) running at once in a group session
+    DEFAULT_SUMMARY_INCLUDE_RAW_DATA = False      #Re-read data.csv at the end of a trial to add a raw_data sheet to final_report.xlsx
     
     def __init__(self) -> None:
         self.reset()
@@ -21,14 +65,72 @@ class CaptureConfig:
         self.blink_detection_threshold = self.DEFAULT_BLINK_DETECTION_THRESHOLD
         self.blink_window_size = self.DEFAULT_BLINK_WINDOW_SIZE
         self.fps = self.DEFAULT_FPS
+        self.capture_fourcc = self.DEFAULT_CAPTURE_FOURCC
+        self.capture_width = self.DEFAULT_CAPTURE_WIDTH
+        self.capture_height = self.DEFAULT_CAPTURE_HEIGHT
+        self.frame_source = self.DEFAULT_FRAME_SOURCE
+        self.frame_source_path = self.DEFAULT_FRAME_SOURCE_PATH
+        self.frame_source_pacing = self.DEFAULT_FRAME_SOURCE_PACING
+        self.frame_source_loop = self.DEFAULT_FRAME_SOURCE_LOOP
+        self.async_report_writing = self.DEFAULT_ASYNC_REPORT_WRITING
+        self.report_flush_rows = self.DEFAULT_REPORT_FLUSH_ROWS
+        self.report_flush_interval = self.DEFAULT_REPORT_FLUSH_INTERVAL
+        self.report_queue_size = self.DEFAULT_REPORT_QUEUE_SIZE
+        self.report_chunk_size = self.DEFAULT_REPORT_CHUNK_SIZE
+        self.report_chunk_duration = self.DEFAULT_REPORT_CHUNK_DURATION
+        self.binary_recording = self.DEFAULT_BINARY_RECORDING
+        self.binary_chunk_rows = self.DEFAULT_BINARY_CHUNK_ROWS
+        self.summary_include_raw_data = self.DEFAULT_SUMMARY_INCLUDE_RAW_DATA
+        self.show_stats_panel = self.DEFAULT_SHOW_STATS_PANEL
+        self.record_raw_video = self.DEFAULT_RECORD_RAW_VIDEO
+        self.analysis_mode = self.DEFAULT_ANALYSIS_MODE
+        self.frame_handoff = self.DEFAULT_FRAME_HANDOFF
+        self.preview_fps = self.DEFAULT_PREVIEW_FPS
+        self.overlay_mode = self.DEFAULT_OVERLAY_MODE
+        self.analysis_resolution = self.DEFAULT_ANALYSIS_RESOLUTION
+        self.adaptive_frame_skipping = self.DEFAULT_ADAPTIVE_FRAME_SKIPPING
+        self.min_analysis_rate = self.DEFAULT_MIN_ANALYSIS_RATE
+        self.max_analysis_rate = self.DEFAULT_MAX_ANALYSIS_RATE
+        self.face_roi_cropping = self.DEFAULT_FACE_ROI_CROPPING
+        self.max_faces = self.DEFAULT_MAX_FACES
+        self.primary_face_policy = self.DEFAULT_PRIMARY_FACE_POLICY
+        self.frame_queue_size = self.DEFAULT_FRAME_QUEUE_SIZE
+        self.frame_pool_size = self.DEFAULT_FRAME_POOL_SIZE
+        self.analysis_worker_slots = self.DEFAULT_ANALYSIS_WORKER_SLOTS
+        self.raw_video_buffer_slots = self.DEFAULT_RAW_VIDEO_BUFFER_SLOTS
         self.camera = None
         self.participant_id = ""
+        # Group sessions: (camera, participant_id) of every participant after the first, who uses camera/participant_id
+        self.additional_participants = []
         self.condition = ""
         self.report_directory = ""
         
     def set_camera(self, camera):
         self.camera = camera
         
+    def add_participant(self, camera, participant_id):
+        if len(self.additional_participants) + 1 >= self.MAX_PARTICIPANTS:
+            raise ValueError(f"At most {self.MAX_PARTICIPANTS} participants can be captured at once")
+        self.additional_participants.append((camera, participant_id))
+        
+    def clear_additional_participants(self):
+        self.additional_participants = []
+        
+    def for_participant(self, camera, participant_id):
+        # Same settings for another camera and participant, so each capture pipeline has its own config
+        participant_config = copy.copy(self)
+        participant_config.additional_participants = []
+        participant_config.set_participant_id(participant_id)
+        if camera != self.camera:
+            # The selected camera mode belongs to the first camera, others open in their driver default mode
+            participant_config.set_camera(camera)
+            participant_config.set_capture_resolution(self.DEFAULT_CAPTURE_WIDTH, self.DEFAULT_CAPTURE_HEIGHT)
+            participant_config.set_capture_fourcc(self.DEFAULT_CAPTURE_FOURCC)
+        return participant_config
+        
+    def get_participant_configs(self):
+        return [self] + [self.for_participant(camera, participant_id) for camera, participant_id in self.additional_participants]
+        
     def set_perclos_high_threshold(self, perclos_high_threshold):
         self.perclos_high_threshold = int(perclos_high_threshold)
         
@@ -53,6 +155,120 @@ class CaptureConfig:
     def set_fps(self, fps):
         self.fps = int(fps)    
         
+    def set_frame_source(self, frame_source):
+        if frame_source not in self.FRAME_SOURCES:
+            raise ValueError(f"Unknown frame source: {frame_source}")
+        self.frame_source = frame_source
+        
+    def set_frame_source_path(self, frame_source_path):
+        self.frame_source_path = frame_source_path
+        
+    def set_frame_source_pacing(self, frame_source_pacing):
+        if frame_source_pacing not in self.FRAME_SOURCE_PACINGS:
+            raise ValueError(f"Unknown frame source pacing: {frame_source_pacing}")
+        self.frame_source_pacing = frame_source_pacing
+        
+    def set_frame_source_loop(self, frame_source_loop):
+        self.frame_source_loop = bool(frame_source_loop)
+        
+    def set_capture_fourcc(self, capture_fourcc):
+        if capture_fourcc not in self.CAPTURE_FOURCCS:
+            raise ValueError(f"Unknown capture pixel format: {capture_fourcc}")
+        self.capture_fourcc = capture_fourcc
+
+    def set_capture_resolution(self, capture_width, capture_height):
+        self.capture_width = int(capture_width)
+        self.capture_height = int(capture_height)
+        
+    def set_async_report_writing(self, async_report_writing):
+        self.async_report_writing = bool(async_report_writing)
+
+    def set_report_flush_rows(self, report_flush_rows):
+        self.report_flush_rows = int(report_flush_rows)
+
+    def set_report_flush_interval(self, report_flush_interval):
+        self.report_flush_interval = float(report_flush_interval)
+
+    def set_report_queue_size(self, report_queue_size):
+        self.report_queue_size = int(report_queue_size)
+        
+    def set_report_chunk_size(self, report_chunk_size):
+        self.report_chunk_size = max(0, int(report_chunk_size))
+
+    def set_report_chunk_duration(self, report_chunk_duration):
+        self.report_chunk_duration = max(0, int(report_chunk_duration))
+
+    def is_report_rotated(self):
+        return self.report_chunk_size > 0 or self.report_chunk_duration > 0
+
+    def set_binary_recording(self, binary_recording):
+        self.binary_recording = bool(binary_recording)
+
+    def set_binary_chunk_rows(self, binary_chunk_rows):
+        self.binary_chunk_rows = int(binary_chunk_rows)
+        
+    def set_summary_include_raw_data(self, summary_include_raw_data):
+        self.summary_include_raw_data = bool(summary_include_raw_data)
+        
+    def set_show_stats_panel(self, show_stats_panel):
+        self.show_stats_panel = bool(show_stats_panel)
+        
+    def set_record_raw_video(self, record_raw_video):
+        self.record_raw_video = bool(record_raw_video)
+
+    def set_raw_video_buffer_slots(self, raw_video_buffer_slots):
+        self.raw_video_buffer_slots = int(raw_video_buffer_slots)
+        
+    def set_analysis_mode(self, analysis_mode):
+        if analysis_mode not in self.ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {analysis_mode}")
+        self.analysis_mode = analysis_mode
+
+    def set_analysis_worker_slots(self, analysis_worker_slots):
+        self.analysis_worker_slots = int(analysis_worker_slots)
+        
+    def set_frame_handoff(self, frame_handoff):
+        if frame_handoff not in self.FRAME_HANDOFF_POLICIES:
+            raise ValueError(f"Unknown frame hand-off policy: {frame_handoff}")
+        self.frame_handoff = frame_handoff
+
+    def set_frame_queue_size(self, frame_queue_size):
+        self.frame_queue_size = int(frame_queue_size)
+
+    def set_adaptive_frame_skipping(self, adaptive_frame_skipping):
+        self.adaptive_frame_skipping = bool(adaptive_frame_skipping)
+
+    def set_min_analysis_rate(self, min_analysis_rate):
+        self.min_analysis_rate = float(min_analysis_rate)
+
+    def set_max_analysis_rate(self, max_analysis_rate):
+        self.max_analysis_rate = float(max_analysis_rate)
+
+    def set_analysis_resolution(self, analysis_resolution):
+        self.analysis_resolution = int(analysis_resolution)
+
+    def set_face_roi_cropping(self, face_roi_cropping):
+        self.face_roi_cropping = bool(face_roi_cropping)
+
+    def set_max_faces(self, max_faces):
+        self.max_faces = max(1, int(max_faces))
+
+    def set_primary_face_policy(self, primary_face_policy):
+        if primary_face_policy not in self.PRIMARY_FACE_POLICIES:
+            raise ValueError(f"Unknown primary face policy: {primary_face_policy}")
+        self.primary_face_policy = primary_face_policy
+
+    def set_overlay_mode(self, overlay_mode):
+        if overlay_mode not in self.OVERLAY_MODES:
+            raise ValueError(f"Unknown overlay mode: {overlay_mode}")
+        self.overlay_mode = overlay_mode
+
+    def set_preview_fps(self, preview_fps):
+        self.preview_fps = int(preview_fps)
+
+    def set_frame_pool_size(self, frame_pool_size):
+        self.frame_pool_size = int(frame_pool_size)
+        
     def set_participant_id(self, participant_id):
         self.participant_id = participant_id
         
@@ -72,6 +288,7 @@ class CaptureConfig:
         ans.append(self.blink_detection_threshold)
         ans.append(self.blink_window_size)
         ans.append(self.fps)
+        ans.append(self.LANDMARK_SPACE)
         
         return ans
         
\ No newline at end of file
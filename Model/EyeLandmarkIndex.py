@@ -0,0 +1,33 @@
+import numpy as np
+
+class EyeLandmarkIndex:
+    # Index table of every face mesh landmark the analysis uses (iris centres, eyelids and eye contours of both eyes).
+    # They are gathered with one indexing operation into a preallocated (K, 3) float64 buffer, and each eye region is a view of it.
+    # float64 like the face mesh itself: float32 values widened by tolist() would write noise such as 0.30000001192092896 to data.csv
+    # The table is read from the first face seen; keep one per analysing thread, the buffer is reused every frame
+    def __init__(self) -> None:
+        self.indices = None
+        self.buffer = None
+
+    def build(self, face):
+        groups = [[face.left_eye_center_index], [face.right_eye_center_index], face.left_eyelids_indices, face.right_eyelids_indices, face.left_eye_contour_indices, face.right_eye_contour_indices]
+        self.indices = np.concatenate(groups).astype(np.intp)
+        bounds = np.cumsum([0] + [len(group) for group in groups])
+        # Iris centres are single points, the other groups (N, 3) blocks
+        self.left_iris = int(bounds[0])
+        self.right_iris = int(bounds[1])
+        self.regions = [slice(int(bounds[i]), int(bounds[i + 1])) for i in range(2, len(groups))]
+        self.buffer = np.empty((len(self.indices), 3), dtype=np.float64)
+
+    def gather(self, face, landmarks):
+        # landmarks: (N, 3) face mesh, or (F, N, 3) for several faces. A single face is gathered into the reused buffer
+        if self.indices is None:
+            self.build(face)
+        if landmarks.ndim == 2:
+            np.take(landmarks, self.indices, axis=0, out=self.buffer)
+            return self.buffer
+        return np.take(landmarks, self.indices, axis=1).astype(np.float64, copy=False)
+
+    def split(self, points):
+        # Views of a gathered block: left_iris_pos, right_iris_pos, left_eyelid_loc, right_eyelid_loc, left_eye_loc, right_eye_loc
+        return (points[..., self.left_iris, :], points[..., self.right_iris, :]) + tuple(points[..., region, :] for region in self.regions)
@@ -0,0 +1,57 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+class FaceModelPrewarm:
+    # Builds the FaceAnalyzer (mediapipe import, graph creation, first inference) on a background thread
+    # while the user is still on the configuration page, so the first trial does not pay for it.
+    # take() hands the ready model over. Analyzers live for the whole capture session, so the next model is only prepared
+    # when start() is called again, once the user is back on the configuration page.
+    # Nothing happens unless start() was called, so headless users (batch_analysis.py) are not affected
+    WARMUP_SHAPE = (480, 640, 3)
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.thread = None
+        self.face_analyzer = None
+        self.enabled = False
+
+    def start(self):
+        with self.lock:
+            self.enabled = True
+            if self.face_analyzer is not None or (self.thread is not None and self.thread.is_alive()):
+                return
+            self.thread = threading.Thread(target=self.build, daemon=True)
+            self.thread.start()
+
+    def build(self):
+        try:
+            build_start = time.perf_counter()
+            from FaceAnalyzer import FaceAnalyzer
+            face_analyzer = FaceAnalyzer(max_nb_faces=1)
+            # The first process() call initialises the inference graph
+            face_analyzer.image_size = (self.WARMUP_SHAPE[1], self.WARMUP_SHAPE[0])
+            face_analyzer.process(np.zeros(self.WARMUP_SHAPE, dtype=np.uint8))
+            print(f"Face model pre-warmed in {time.perf_counter() - build_start:.2f} s")
+        except:
+            print("Unable to pre-warm the face model: ", sys.exc_info())
+            return
+        with self.lock:
+            self.face_analyzer = face_analyzer
+
+    def take(self):
+        # Returns a ready FaceAnalyzer (waiting for one being built), or None if pre-warming is not enabled
+        with self.lock:
+            if not self.enabled:
+                return None
+            thread = self.thread
+        if thread is not None:
+            thread.join()
+        with self.lock:
+            face_analyzer = self.face_analyzer
+            self.face_analyzer = None
+        return face_analyzer
+
+face_model_prewarm = FaceModelPrewarm()
@@ -0,0 +1,93 @@
+import cv2 as cv
+import numpy as np
+
+class FaceRoiTracker:
+    # Chooses the image fed to the face model. With roi_cropping, the face bounding box of the previous
+    # frame (plus a margin) is cropped out and only that region is analysed; when no face is found in it,
+    # the next attempt uses the full frame again. Either image is downscaled so its longest side is at most
+    # analysis_resolution pixels (0 keeps the camera resolution).
+    # prepare() returns the model image and the transform needed by to_frame() to map model coordinates
+    # back to full-frame pixels, so landmark outputs keep their meaning
+    ROI_MARGIN = 0.35       #Added on each side of the face bounding box, relative to its largest side
+    MIN_ROI_SIZE = int(64)  #In pixels, smaller boxes are considered lost
+
+    def __init__(self, analysis_resolution=0, roi_cropping=False) -> None:
+        self.analysis_resolution = max(0, int(analysis_resolution))
+        self.roi_cropping = roi_cropping
+        self.roi = None     #(x0, y0, x1, y1) in full-frame pixels, None while not tracking
+
+        # Stats
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.lost = 0
+
+    def is_tracking(self):
+        return self.roi is not None
+
+    def is_identity(self, transform):
+        return transform == (1.0, 0, 0)
+
+    def prepare(self, image):
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            model_image = image[y0:y1, x0:x1]
+            self.roi_frames += 1
+        else:
+            x0, y0 = 0, 0
+            model_image = image
+            self.full_frames += 1
+
+        scale = 1.0
+        height, width = model_image.shape[:2]
+        if self.analysis_resolution and max(height, width) > self.analysis_resolution:
+            scale = self.analysis_resolution / max(height, width)
+            model_image = cv.resize(model_image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv.INTER_AREA)
+        elif self.roi is not None:
+            # The model needs contiguous pixels, a crop is only a view
+            model_image = np.ascontiguousarray(model_image)
+        return model_image, (scale, x0, y0)
+
+    def to_frame(self, points, transform):
+        # Maps model image coordinates (x, y[, z]) back to full-frame pixels. z scales like x
+        if self.is_identity(transform):
+            return points
+        scale, x0, y0 = transform
+        points = np.asarray(points, dtype=np.float64) / scale
+        points[..., 0] += x0
+        points[..., 1] += y0
+        return points
+
+    def update(self, landmarks, frame_shape):
+        # landmarks: full-frame face landmarks of the last result, or None when the face was not found
+        if not self.roi_cropping:
+            return
+        if landmarks is None:
+            if self.roi is not None:
+                self.lost += 1
+            self.roi = None
+            return
+        frame_height, frame_width = frame_shape[:2]
+        x_min, y_min = np.min(landmarks[:, :2], axis=0)
+        x_max, y_max = np.max(landmarks[:, :2], axis=0)
+        # Square box around the face centre, so head rotation does not cut the eyes off
+        half_side = max(x_max - x_min, y_max - y_min) * (0.5 + self.ROI_MARGIN)
+        centre_x = (x_min + x_max) / 2
+        centre_y = (y_min + y_max) / 2
+        x0 = max(0, int(centre_x - half_side))
+        y0 = max(0, int(centre_y - half_side))
+        x1 = min(frame_width, int(np.ceil(centre_x + half_side)))
+        y1 = min(frame_height, int(np.ceil(centre_y + half_side)))
+        if x1 - x0 < self.MIN_ROI_SIZE or y1 - y0 < self.MIN_ROI_SIZE:
+            self.roi = None
+            return
+        self.roi = (x0, y0, x1, y1)
+
+    def reset(self):
+        self.roi = None
+
+    def get_stats(self):
+        return {
+            'roi_frames': self.roi_frames,
+            'full_frames': self.full_frames,
+            'lost': self.lost
+        }
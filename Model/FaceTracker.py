@@ -0,0 +1,182 @@
+import numpy as np
+
+from Model.CaptureConfig import CaptureConfig
+from Utils.RollingWindow import RollingWindow
+
+# Multi-face analysis (CaptureConfig.max_faces > 1): faces found in a frame are associated with the faces of the
+# previous frames by bounding box overlap, so each person keeps a stable track with their own PERCLOS/blink state,
+# and a primary-face policy picks the one face (the participant) whose data is logged.
+# With max_faces == 1 FrameAnalyzer keeps a single FaceState
+
+class FaceState:
+    # Rolling PERCLOS and blink state of one face
+    def __init__(self, config: CaptureConfig) -> None:
+        self.config = config
+        # Prepare time-based rolling windows, sized for the configured fps
+        self.blink_window = RollingWindow.for_rate(self.config.blink_window_size, self.config.fps)
+        self.short_perclos_window = RollingWindow.for_rate(self.config.perclos_window_size, self.config.fps)
+        self.reset()
+
+    def reset(self):
+        # Blinks counter
+        self.n_blinks = 0
+
+        self.blink_window.reset()
+        self.short_perclos_window.reset()
+
+        #Setup bools
+        self.short_perclos_ready = False
+        self.blink_ready = False
+
+        # Blink detection, from capture timestamps
+        self.eyes_closed_since = None
+        self.last_blink_duration = 0.0
+
+    def update(self, curr_frame_time, left_eye_opening, right_eye_opening, is_blink):
+        # Pushes one measurement into the windows. Returns (short_perclos, num_blinks_in_window, blink_rate)
+        # Compute perclos items. Same measure as Face.compute_perclos (share of frames whose mean eye opening is under the threshold), but over the last perclos_window_size seconds instead of a frame count
+        eyes_closed = ((left_eye_opening + right_eye_opening) / 2) < (self.config.perclos_high_threshold / 100)
+        self.short_perclos_window.push(curr_frame_time, 1 if eyes_closed else 0)
+        short_perclos = self.short_perclos_window.mean()*100    #Gives result over time window in percentage
+
+        if self.short_perclos_window.is_ready(curr_frame_time):
+            self.short_perclos_ready = True
+
+        #Blink items
+        self.blink_window.push(curr_frame_time, 1 if is_blink else 0)
+
+        if self.blink_window.is_ready(curr_frame_time):
+            self.blink_ready = True
+
+        num_blinks_in_window = int(self.blink_window.sum())
+        blink_rate = num_blinks_in_window / (self.config.blink_window_size / 60)    # Finds blink rate by looking at number of blinks over the last blink_window_size seconds, and converting to blinks per minute
+
+        if is_blink:
+            self.n_blinks += 1   # Running counter of total blinks. Likely no longer needed
+        return short_perclos, num_blinks_in_window, blink_rate
+
+    def detect_blink(self, curr_frame_time, eye_opening, blink_detection_threshold):
+        # A blink is counted when the eyes close; its duration is known once they open again.
+        # Returns (is_blink, last_blink_duration)
+        if eye_opening < blink_detection_threshold:
+            if self.eyes_closed_since is None:
+                self.eyes_closed_since = curr_frame_time
+                return True, self.last_blink_duration
+        elif self.eyes_closed_since is not None:
+            self.last_blink_duration = curr_frame_time - self.eyes_closed_since
+            self.eyes_closed_since = None
+        return False, self.last_blink_duration
+
+class FaceTrack:
+    __slots__ = ('id', 'box', 'first_seen', 'last_seen', 'frames', 'state')
+
+    def __init__(self, track_id, box, curr_frame_time, config: CaptureConfig) -> None:
+        self.id = track_id
+        self.box = box
+        self.first_seen = curr_frame_time
+        self.last_seen = curr_frame_time
+        self.frames = 0
+        self.state = FaceState(config)
+
+    def get_area(self):
+        return max(0.0, self.box[2] - self.box[0]) * max(0.0, self.box[3] - self.box[1])
+
+def box_iou(boxes_a, boxes_b):
+    # Intersection over union of every pair of (x0, y0, x1, y1) boxes: (A, 4) x (B, 4) -> (A, B)
+    x0 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y0 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x1 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y1 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+def batch_eye_openings(eyelids, irises):
+    # Eye opening of every eye of every face in one pass, with the formula of FaceAnalyzer's Face.process_eyes so values
+    # and thresholds mean the same in both modes: the gap from lid point 4 to the middle of lid points 12 and 13, along
+    # the in-plane normal of the 12 -> 13 direction (normalised in 3D), clamped at 0, over the iris diameter (3D distance
+    # of iris points 1 and 3).
+    # eyelids: (F, 16, 3) eyelid points, irises: (F, 4, 3) iris points (FaceAnalyzer's *_eye_contour_indices), in pixels. Returns (F,)
+    lid_direction = eyelids[:, 13] - eyelids[:, 12]
+    lid_direction = lid_direction / np.maximum(np.linalg.norm(lid_direction, axis=1, keepdims=True), 1e-9)
+    # cross([0, 0, 1], lid_direction)
+    normal = np.stack((-lid_direction[:, 1], lid_direction[:, 0], np.zeros(len(lid_direction))), axis=1)
+    gap = np.sum(((eyelids[:, 12] + eyelids[:, 13]) / 2 - eyelids[:, 4]) * normal, axis=1)
+    iris_diameter = np.linalg.norm(irises[:, 3] - irises[:, 1], axis=1)
+    return np.maximum(gap, 0.0) / np.maximum(iris_diameter, 1e-9)
+
+class FaceTracker:
+    MIN_IOU = 0.3               #Minimum box overlap for a face to continue a track
+    MAX_MISSING_TIME = 2.0      #In seconds, how long a track (and its state) outlives its face
+
+    def __init__(self, config: CaptureConfig) -> None:
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        self.tracks = []
+        self.next_id = 0
+        self.primary_id = None
+
+        # Stats
+        self.primary_switches = 0
+
+    def update(self, measurements, curr_frame_time):
+        # Associates this frame's measurements (each with a .box) with the tracks. Returns [(track, measurement)]
+        pairs = []
+        matched_tracks = set()
+        matched_measurements = set()
+        if measurements and self.tracks:
+            iou = box_iou(np.array([measurement.box for measurement in measurements], dtype=np.float64), np.array([track.box for track in self.tracks], dtype=np.float64))
+            # Greedy: best overlaps first
+            for flat_index in np.argsort(iou, axis=None)[::-1]:
+                measurement_index, track_index = np.unravel_index(flat_index, iou.shape)
+                if iou[measurement_index, track_index] < self.MIN_IOU:
+                    break
+                if measurement_index in matched_measurements or track_index in matched_tracks:
+                    continue
+                matched_measurements.add(measurement_index)
+                matched_tracks.add(track_index)
+                pairs.append((self.tracks[track_index], measurements[measurement_index]))
+        for measurement_index, measurement in enumerate(measurements):
+            if measurement_index not in matched_measurements:
+                track = FaceTrack(self.next_id, measurement.box, curr_frame_time, self.config)
+                self.next_id += 1
+                self.tracks.append(track)
+                pairs.append((track, measurement))
+        for track, measurement in pairs:
+            track.box = measurement.box
+            track.last_seen = curr_frame_time
+            track.frames += 1
+        self.tracks = [track for track in self.tracks if curr_frame_time - track.last_seen <= self.MAX_MISSING_TIME]
+        return pairs
+
+    def select_primary(self, pairs):
+        # The participant. The primary face stays primary as long as its track lives: while it is briefly not found,
+        # nothing is logged rather than someone else's face. A new primary is chosen per CaptureConfig.primary_face_policy
+        # ("largest": the biggest face, i.e. the closest to the camera; "persistent": the face tracked for longest).
+        # Returns (track, measurement) or None
+        if any(track.id == self.primary_id for track in self.tracks):
+            for track, measurement in pairs:
+                if track.id == self.primary_id:
+                    return track, measurement
+            return None
+        if not pairs:
+            return None
+        if self.config.primary_face_policy == "persistent":
+            primary = max(pairs, key=lambda pair: (pair[0].frames, pair[0].get_area()))
+        else:
+            primary = max(pairs, key=lambda pair: pair[0].get_area())
+        if self.primary_id is not None:
+            self.primary_switches += 1
+        self.primary_id = primary[0].id
+        return primary
+
+    def get_stats(self):
+        return {
+            'tracks': len(self.tracks),
+            'faces_seen': self.next_id,
+            'primary_switches': self.primary_switches
+        }
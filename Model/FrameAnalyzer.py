@@ -0,0 +1,360 @@
+import cv2 as cv
+import numpy as np
+import sys
+import time
+from FaceAnalyzer import FaceAnalyzer
+
+from Model.CaptureConfig import CaptureConfig
+from Model.EyeLandmarkIndex import EyeLandmarkIndex
+from Model.FaceRoiTracker import FaceRoiTracker
+from Model.FaceTracker import FaceState, FaceTracker, batch_eye_openings
+from Model.FramePool import FrameMetadata
+from Model.FaceModelPrewarm import face_model_prewarm
+from Utils.PipelineTimings import PipelineTimings
+from Utils.ReportGenerator import ReportGenerator
+
+# Face model outputs for one frame. Small and picklable, so it can come back from an inference process
+class EyeMeasurement:
+    __slots__ = ('left_eye_opening', 'right_eye_opening', 'is_blink', 'last_blink_duration', 'left_iris_pos', 'right_iris_pos', 'left_eyelid_loc', 'right_eyelid_loc', 'left_eye_loc', 'right_eye_loc', 'face', 'box')
+
+    def __init__(self, left_eye_opening, right_eye_opening, is_blink, last_blink_duration, left_iris_pos, right_iris_pos, left_eyelid_loc, right_eyelid_loc, left_eye_loc, right_eye_loc, face=None, box=None) -> None:
+        self.left_eye_opening = left_eye_opening
+        self.right_eye_opening = right_eye_opening
+        self.is_blink = is_blink
+        self.last_blink_duration = last_blink_duration
+        self.left_iris_pos = left_iris_pos
+        self.right_iris_pos = right_iris_pos
+        self.left_eyelid_loc = left_eyelid_loc
+        self.right_eyelid_loc = right_eyelid_loc
+        self.left_eye_loc = left_eye_loc
+        self.right_eye_loc = right_eye_loc
+        # FaceAnalyzer Face object, only set when inference ran in this process
+        self.face = face
+        # Face bounding box (x0, y0, x1, y1) in frame pixels, set in multi-face mode
+        self.box = box
+
+def process_model_image(fa: FaceAnalyzer, model_image):
+    # FaceAnalyzer scales its landmarks by its image_size (640x480 unless set), not by the size of the image it is given.
+    # Keep them in model image pixels, so FaceRoiTracker.to_frame maps them back to the full frame
+    fa.image_size = (model_image.shape[1], model_image.shape[0])
+    fa.process(model_image)
+
+def measure_eyes(fa: FaceAnalyzer, image, blink_detection_threshold, tracker: FaceRoiTracker = None, timings: PipelineTimings = None, landmark_index: EyeLandmarkIndex = None):
+    # Runs the face model on an RGB image. Returns an EyeMeasurement, or None unless exactly one face is found.
+    # With a tracker, the model may only see a cropped/downscaled part of the image; positions are mapped back to full-frame pixels
+    process_start = time.perf_counter_ns()
+    if tracker is None:
+        model_image, transform = image, (1.0, 0, 0)
+        process_model_image(fa, model_image)
+    else:
+        model_image, transform = tracker.prepare(image)
+        process_model_image(fa, model_image)
+        if fa.nb_faces!=1 and tracker.is_tracking():
+            # Lost the face in the ROI, look for it in the whole frame
+            tracker.update(None, image.shape)
+            model_image, transform = tracker.prepare(image)
+            process_model_image(fa, model_image)
+    if timings is not None:
+        timings.record('face_process', time.perf_counter_ns() - process_start)
+    if fa.nb_faces!=1:
+        if tracker is not None:
+            tracker.update(None, image.shape)
+        return None
+    face = fa.faces[0]
+    # Computes eyes opening level and blinks
+    eyes_start = time.perf_counter_ns()
+    # Its blink outputs are replaced by FrameAnalyzer.detect_blink, which uses capture time
+    left_eye_opening, right_eye_opening, is_blink, last_blink_duration = face.process_eyes(model_image, detect_blinks=True, blink_th=blink_detection_threshold) #, normalize=True   blink_th=0.35   # TODO: Determine what values are best here - should we normalize?
+    if timings is not None:
+        timings.record('process_eyes', time.perf_counter_ns() - eyes_start)
+
+    # Get eyes positions: every eye landmark in one gather
+    #TODO: For Chiho, add the eye landmarks to EyeLandmarkIndex to get all contours around the eye. Alternatively, we could just return the whole faces meshes if desired. Put this behind a setting that is by default ON but can be turned off to improve performance and logging.  Logging I/O is batched by ReportWriter (see CaptureConfig.report_flush_rows/report_flush_interval).
+    if landmark_index is None:
+        landmark_index = EyeLandmarkIndex()
+    eye_points = landmark_index.gather(face, face.npLandmarks)
+
+    if tracker is not None:
+        tracker.update(tracker.to_frame(face.npLandmarks, transform), image.shape)
+    if tracker is not None and not tracker.is_identity(transform):
+        eye_points = tracker.to_frame(eye_points, transform)
+        # The Face object only knows model image coordinates, so it cannot draw on the full frame
+        face = None
+    else:
+        # The measurement outlives the frame (rows are formatted on the report writer thread), it gets its own copy of the buffer
+        eye_points = eye_points.copy()
+    left_iris_pos, right_iris_pos, left_eyelid_loc, right_eyelid_loc, left_eye_loc, right_eye_loc = landmark_index.split(eye_points)
+
+    return EyeMeasurement(left_eye_opening, right_eye_opening, is_blink, last_blink_duration, left_iris_pos, right_iris_pos, left_eyelid_loc, right_eyelid_loc, left_eye_loc, right_eye_loc, face=face)
+
+def measure_faces(fa: FaceAnalyzer, image, tracker: FaceRoiTracker = None, timings: PipelineTimings = None, landmark_index: EyeLandmarkIndex = None):
+    # Multi-face variant of measure_eyes: one EyeMeasurement (with its box) per face found, blinks not detected yet.
+    # The eye landmarks of all faces are gathered at once and their openings computed in one batched pass;
+    # blink detection needs each face's history and is done per track by FrameAnalyzer.process_faces
+    process_start = time.perf_counter_ns()
+    if tracker is None:
+        model_image, transform = image, (1.0, 0, 0)
+    else:
+        model_image, transform = tracker.prepare(image)
+    process_model_image(fa, model_image)
+    if timings is not None:
+        timings.record('face_process', time.perf_counter_ns() - process_start)
+    if fa.nb_faces < 1:
+        return []
+
+    eyes_start = time.perf_counter_ns()
+    faces = fa.faces[:fa.nb_faces]
+    landmarks = np.stack([face.npLandmarks for face in faces])
+    if tracker is not None:
+        landmarks = tracker.to_frame(landmarks, transform)
+    boxes = np.concatenate((landmarks[..., :2].min(axis=1), landmarks[..., :2].max(axis=1)), axis=1)
+    # (F, K, 3): every eye landmark of every face in one gather, each region is a view of it
+    if landmark_index is None:
+        landmark_index = EyeLandmarkIndex()
+    eye_points = landmark_index.gather(faces[0], landmarks)
+    left_iris_pos, right_iris_pos, left_eyelid_loc, right_eyelid_loc, left_eye_loc, right_eye_loc = landmark_index.split(eye_points)
+    left_eye_openings = batch_eye_openings(left_eyelid_loc, left_eye_loc)
+    right_eye_openings = batch_eye_openings(right_eyelid_loc, right_eye_loc)
+    measurements = [EyeMeasurement(float(left_eye_openings[i]), float(right_eye_openings[i]), False, 0.0, left_iris_pos[i], right_iris_pos[i], left_eyelid_loc[i], right_eyelid_loc[i], left_eye_loc[i], right_eye_loc[i], box=tuple(boxes[i])) for i in range(len(faces))]
+    if timings is not None:
+        timings.record('process_eyes', time.perf_counter_ns() - eyes_start)
+    return measurements
+
+# Per-frame PERCLOS/blink analysis, free of any Qt dependency so it can run both inside
+# ImageConsumer.ImageWorker (live) and in headless batch workers (batch_analysis.py).
+# With local_inference=False the face model runs elsewhere (see Model/AnalysisWorker.py) and results are fed to process_measurement
+class FrameAnalyzer:
+    def __init__(self, config: CaptureConfig, report_facade: ReportGenerator, overlay_mode=CaptureConfig.DEFAULT_OVERLAY_MODE, local_inference=True, timings: PipelineTimings = None) -> None:
+        self.config = config
+        self.report_facade = report_facade
+        # Per-stage latency histograms, None when not instrumented (e.g. batch analysis)
+        self.timings = timings
+        # pixels: landmarks and HUD burned into the frame. widgets: HUD values kept in self.hud for a Qt overlay. off: nothing
+        self.overlay_mode = overlay_mode
+
+        # PERCLOS/blink state of the face. In multi-face mode every tracked face has its own, see Model/FaceTracker.py
+        self.face_state = FaceState(self.config)
+        self.face_tracker = FaceTracker(self.config) if self.config.max_faces > 1 else None
+        self.reset_trial()
+
+        # Build face analyzer
+        self.fa = None
+        self.tracker = None
+        # Eye landmark gather table and buffer of this analyzer
+        self.landmark_index = EyeLandmarkIndex()
+        if local_inference:
+            self.start_local_inference()
+
+    def start_local_inference(self):
+        # Also used when the analysis process could not be started, the face model then runs in the calling thread.
+        # Use the model pre-warmed while the GUI was idle, if there is one (it looks for a single face)
+        if self.config.max_faces == 1:
+            self.fa = face_model_prewarm.take()
+        self.fa = self.fa or FaceAnalyzer(max_nb_faces=self.config.max_faces)
+        # Region and resolution the face model sees. Cropping around one face would hide the others
+        self.tracker = FaceRoiTracker(self.config.analysis_resolution, self.config.face_roi_cropping and self.config.max_faces == 1)
+
+    def reset_trial(self):
+        # Forget everything measured so far, the face model stays loaded. Called between trials by long-lived analyzers
+        self.hud = None
+        self.overlay_time_ns = 0
+        self.overlay_frames = 0
+
+        self.face_state.reset()
+        if self.face_tracker is not None:
+            self.face_tracker.reset()
+
+        if getattr(self, 'tracker', None) is not None:
+            self.tracker.reset()
+
+    def process(self, image, curr_frame_time, metadata: FrameMetadata = None):
+        # image must be RGB. Overlays, in pixels mode, are drawn on it in place.
+        # curr_frame_time is the capture time in epoch seconds, metadata the frame's capture record if there is one
+        if self.face_tracker is not None:
+            measurements = measure_faces(self.fa, image, self.tracker, self.timings, self.landmark_index)
+            return self.process_faces(image, curr_frame_time, measurements, metadata)
+        measurement = measure_eyes(self.fa, image, self.config.blink_detection_threshold, self.tracker, self.timings, self.landmark_index)
+        return self.process_measurement(image, curr_frame_time, measurement, metadata)
+
+    def process_result(self, image, curr_frame_time, result, metadata: FrameMetadata = None):
+        # Result of inference run elsewhere (Model/AnalysisWorker.py): measure_faces' list in multi-face mode, else measure_eyes'
+        if self.face_tracker is not None:
+            return self.process_faces(image, curr_frame_time, result, metadata)
+        return self.process_measurement(image, curr_frame_time, result, metadata)
+
+    def process_faces(self, image, curr_frame_time, measurements, metadata: FrameMetadata = None):
+        # Multi-face mode: every face keeps its own PERCLOS/blink state, only the primary face is logged and drawn
+        pairs = self.face_tracker.update(measurements, curr_frame_time)
+        for track, measurement in pairs:
+            self.detect_blink(measurement, curr_frame_time, track.state)
+        primary = self.face_tracker.select_primary(pairs)
+        for track, measurement in pairs:
+            if primary is None or track is not primary[0]:
+                track.state.update(curr_frame_time, measurement.left_eye_opening, measurement.right_eye_opening, measurement.is_blink)
+        if primary is None:
+            return self.process_measurement(image, curr_frame_time, None, metadata)
+        track, measurement = primary
+        return self.process_measurement(image, curr_frame_time, measurement, metadata, track.state)
+
+    def process_measurement(self, image, curr_frame_time, measurement, metadata: FrameMetadata = None, face_state: FaceState = None):
+        # face_state: rolling state of the measured face, the analyzer's single face by default
+        face_state = face_state or self.face_state
+        #Now if we find a face
+
+        if measurement is not None:
+            one_face_detected = True
+            if self.face_tracker is None:
+                # Multi-face measurements went through it in process_faces
+                self.detect_blink(measurement, curr_frame_time, face_state)
+            left_eye_opening = measurement.left_eye_opening
+            right_eye_opening = measurement.right_eye_opening
+            is_blink = measurement.is_blink
+            last_blink_duration = measurement.last_blink_duration
+
+            perclos_start = time.perf_counter_ns()
+            short_perclos, num_blinks_in_window, blink_rate = face_state.update(curr_frame_time, left_eye_opening, right_eye_opening, is_blink)
+
+            # Get eyes positions. Kept as arrays, the report writer turns them into lists off this thread
+            left_iris_pos  = measurement.left_iris_pos
+            right_iris_pos = measurement.right_iris_pos
+
+            left_eyelid_loc = measurement.left_eyelid_loc
+            right_eyelid_loc = measurement.right_eyelid_loc
+
+            left_eye_loc = measurement.left_eye_loc
+            right_eye_loc = measurement.right_eye_loc
+            if self.timings is not None:
+                self.timings.record('perclos', time.perf_counter_ns() - perclos_start)
+
+            if self.overlay_mode != "off":
+                overlay_start = time.perf_counter_ns()
+                if self.overlay_mode == "pixels":
+                    self.draw_overlay(image, measurement, short_perclos, num_blinks_in_window, face_state)
+                else:
+                    self.hud = self.build_hud(measurement, short_perclos, num_blinks_in_window, face_state)
+                overlay_time = time.perf_counter_ns() - overlay_start
+                self.overlay_time_ns += overlay_time
+                self.overlay_frames += 1
+                if self.timings is not None:
+                    self.timings.record('overlay', overlay_time)
+
+        else:
+            one_face_detected = False
+            self.hud = None
+            #TODO: Here, we should reset the variables that are logged to prevent duplicate logging of the same data point. These should probably instead be replaced with None or NaN, something to distinguish it from the rest of the data.
+
+        # TO-DO: review paying attention metrics for calculation
+        # if blink_ready is True and short_perclos_ready is True:
+        #     if (short_perclos > 20) or ((short_perclos > 10) and (num_blinks_in_window <= self.config.blink_threshold)):
+        #         PayingAttention = False
+        #     else:
+        #         PayingAttention = True
+        #         try:
+        #             self.report_facade.write_data(curr_frame_time, left_eye_opening, right_eye_opening, is_blink, last_blink_duration, short_perclos, blink_rate, num_blinks_in_window, PayingAttention)
+        #         except:
+        #             print("Unable to write to report: ", sys.exc_info())
+        #     # TO-DO: review paying attention metrics
+        #     # if PayingAttention:
+        #     #     cv.putText(image, f"Paying Attention? : Yes", (10, 135), cv.FONT_HERSHEY_SIMPLEX, .75, (0, 255, 0),2)
+        #     # else:
+        #     #     cv.putText(image, f"Paying Attention? : No", (10, 135), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 0, 0),2)
+        # else:
+        #     cv.putText(image, f"Paying Attention? : N/A", (10, 135), cv.FONT_HERSHEY_SIMPLEX, .75, (0, 255, 0),2)
+        #     try:
+        #         self.report_facade.write_data(curr_frame_time, left_eye_opening, right_eye_opening, is_blink, last_blink_duration, short_perclos, blink_rate, num_blinks_in_window, None)
+        #     except:
+        #         print("Unable to write to report: ", sys.exc_info())
+
+        write_start = time.perf_counter_ns()
+        try:
+            if one_face_detected:
+                self.report_facade.write_data(log_time = curr_frame_time, left_eye_opening = left_eye_opening, right_eye_opening = right_eye_opening, perclos = short_perclos, is_blink = is_blink, last_blink_duration = last_blink_duration, blink_rate = blink_rate, one_face_detected = one_face_detected, left_iris_loc = left_iris_pos, left_eyelid_loc = left_eyelid_loc, left_eye_loc = left_eye_loc, right_iris_loc = right_iris_pos, right_eyelid_loc = right_eyelid_loc, right_eye_loc = right_eye_loc, metadata = metadata)
+            else:
+                self.report_facade.write_data(log_time = curr_frame_time, left_eye_opening = "NaN", right_eye_opening = "NaN", perclos = "NaN", is_blink = "NaN", last_blink_duration = "NaN", blink_rate = "NaN", one_face_detected = one_face_detected,  left_iris_loc = "NaN", left_eyelid_loc = "NaN", left_eye_loc = "NaN", right_iris_loc = "NaN", right_eyelid_loc = "NaN", right_eye_loc = "NaN", metadata = metadata)
+        except:
+            print("Unable to write to report: ", sys.exc_info())
+        if self.timings is not None:
+            self.timings.record('write_data', time.perf_counter_ns() - write_start)
+
+        return image
+
+    def detect_blink(self, measurement, curr_frame_time, face_state: FaceState):
+        # Blinks and their durations come from capture timestamps. FaceAnalyzer's own detection (Face.process_eyes)
+        # times blinks with time.time() when the frame is analysed, in the analysis process in process mode
+        mean_eye_opening = (measurement.left_eye_opening + measurement.right_eye_opening) / 2
+        measurement.is_blink, measurement.last_blink_duration = face_state.detect_blink(curr_frame_time, mean_eye_opening, self.config.blink_detection_threshold)
+
+    def skip_frame(self, curr_frame_time, metadata: FrameMetadata = None):
+        # Frame dropped by adaptive frame skipping: logged with its timestamp and marked, nothing is measured
+        try:
+            self.report_facade.write_data(log_time = curr_frame_time, left_eye_opening = "NaN", right_eye_opening = "NaN", perclos = "NaN", is_blink = "NaN", last_blink_duration = "NaN", blink_rate = "NaN", one_face_detected = False,  left_iris_loc = "NaN", left_eyelid_loc = "NaN", left_eye_loc = "NaN", right_iris_loc = "NaN", right_eyelid_loc = "NaN", right_eye_loc = "NaN", analysis_skipped = True, metadata = metadata)
+        except:
+            print("Unable to write to report: ", sys.exc_info())
+
+    def perclos_style(self, short_perclos):
+        # (colour, thickness) of the perclos band
+        if short_perclos < self.config.perclos_low_threshold:
+            return (0, 255, 0), 2
+        elif (short_perclos >= self.config.perclos_low_threshold) and (short_perclos < self.config.perclos_high_threshold):
+            return (255, 170, 0), 4
+        else:
+            return (255, 0, 0), 4
+
+    def blinks_style(self, num_blinks_in_window):
+        # (colour, thickness) of the blinks band
+        if num_blinks_in_window <= self.config.blink_threshold:
+            return (255, 0, 0), 4
+        else:
+            return (0, 255, 0), 2
+
+    def draw_overlay(self, image, measurement, short_perclos, num_blinks_in_window, face_state: FaceState):
+        # Burns landmarks and HUD text into the RGB image
+        self.draw_eyes_landmarks(image, measurement)
+        left_iris_pos = measurement.left_iris_pos
+        right_iris_pos = measurement.right_iris_pos
+        left_eye_opening = measurement.left_eye_opening
+        right_eye_opening = measurement.right_eye_opening
+
+        # Plot eye opening on each eye
+        cv.putText(image, f"{left_eye_opening:2.2f}", (int(left_iris_pos[0]+30), int(left_iris_pos[1])), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 255, 255) if left_eye_opening>0.5 else (255,0,0),2)
+        cv.putText(image, f"{right_eye_opening:2.2f}", (int(right_iris_pos[0]-150), int(right_iris_pos[1])), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 255, 255) if right_eye_opening>0.5 else (255,0,0),2)
+
+        # Only after 15 seconds that we can use this perclos
+        if face_state.short_perclos_ready:
+            color, thickness = self.perclos_style(short_perclos)
+            cv.putText(image, f"Perclos ({self.config.perclos_window_size} seconds) : {short_perclos:2.2f}%", (10, 25), cv.FONT_HERSHEY_SIMPLEX, .75, color, thickness)
+
+        if face_state.blink_ready:
+            color, thickness = self.blinks_style(num_blinks_in_window)
+            cv.putText(image, f"Blinks in last {self.config.blink_window_size} seconds : {num_blinks_in_window}", (10, 50), cv.FONT_HERSHEY_SIMPLEX, .75, color, thickness)
+
+        # # Blink duration
+        cv.putText(image, f"Last Blink Duration (s) : {measurement.last_blink_duration:2.2f}s", (10, 75), cv.FONT_HERSHEY_SIMPLEX, .75, (0, 0, 0),2)
+
+    def build_hud(self, measurement, short_perclos, num_blinks_in_window, face_state: FaceState):
+        # Raw HUD values for the Qt overlay (View/Components/AnalysisHud.py), nothing is drawn on the frame.
+        # Colours are RGB; perclos/blinks are None until their window is full
+        return {
+            'left_eye_opening': measurement.left_eye_opening,
+            'right_eye_opening': measurement.right_eye_opening,
+            'perclos': short_perclos if face_state.short_perclos_ready else None,
+            'perclos_color': self.perclos_style(short_perclos)[0],
+            'perclos_window_size': self.config.perclos_window_size,
+            'blinks': num_blinks_in_window if face_state.blink_ready else None,
+            'blinks_color': self.blinks_style(num_blinks_in_window)[0],
+            'blink_window_size': self.config.blink_window_size,
+            'last_blink_duration': measurement.last_blink_duration
+        }
+
+    def get_overlay_time(self):
+        # Average overlay cost per analysed frame with a face, in milliseconds
+        return (self.overlay_time_ns / self.overlay_frames) / 1e6 if self.overlay_frames else 0.0
+
+    def draw_eyes_landmarks(self, image, measurement):
+        if measurement.face is not None:
+            measurement.face.draw_eyes_landmarks(image)
+            return
+        # No Face object when inference ran in another process, draw the landmarks we got back
+        for points in (measurement.left_eye_loc, measurement.right_eye_loc, measurement.left_eyelid_loc, measurement.right_eyelid_loc):
+            for point in points:
+                cv.circle(image, (int(point[0]), int(point[1])), 1, (255, 0, 0), -1)
@@ -0,0 +1,98 @@
+import queue
+import threading
+
+# Hand-off policies between ImageProducer and ImageConsumer. Both expose the same small interface:
+# offer(frame) never blocks the capture thread, get(timeout)/get_nowait() raise queue.Empty like queue.Queue,
+# and frames that are dropped are released back to their FramePool and counted in `dropped`.
+# offer_blocking(frame, timeout) is the lossless variant for fast replay (see Model/FrameSource.py): it waits for room
+# instead of dropping, and returns False, keeping the frame, if there was none before the timeout.
+# would_drop() tells the capture thread that offer() would drop a new frame right away, so it can count_drop() it
+# without decoding it.
+# Policies are selected with CaptureConfig.frame_handoff
+
+class FrameQueue(queue.Queue):
+    # FIFO: keeps up to maxsize frames in order, the newest frame is dropped when full
+    def __init__(self, maxsize) -> None:
+        super().__init__(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, frame):
+        try:
+            self.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            frame.release()
+            return False
+
+    def would_drop(self):
+        return self.full()
+
+    def count_drop(self):
+        self.dropped += 1
+
+    def offer_blocking(self, frame, timeout):
+        try:
+            self.put(frame, timeout=timeout)
+            return True
+        except queue.Full:
+            return False
+
+class LatestFrameMailbox:
+    # Latest wins: a single slot, a new frame replaces (and releases) the one that was not consumed yet,
+    # so the consumer always gets the freshest image
+    def __init__(self) -> None:
+        self.condition = threading.Condition()
+        self.frame = None
+        self.dropped = 0
+
+    def offer(self, frame):
+        with self.condition:
+            if self.frame is not None:
+                self.dropped += 1
+                self.frame.release()
+            self.frame = frame
+            self.condition.notify_all()
+        return True
+
+    def would_drop(self):
+        # A new frame always replaces the waiting one
+        return False
+
+    def count_drop(self):
+        self.dropped += 1
+
+    def offer_blocking(self, frame, timeout):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.frame is None, timeout=timeout):
+                return False
+            self.frame = frame
+            self.condition.notify_all()
+        return True
+
+    def get(self, block=True, timeout=None):
+        with self.condition:
+            if block and self.frame is None:
+                self.condition.wait_for(lambda: self.frame is not None, timeout=timeout)
+            if self.frame is None:
+                raise queue.Empty
+            frame = self.frame
+            self.frame = None
+            self.condition.notify_all()
+            return frame
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        return 0 if self.frame is None else 1
+
+    def empty(self):
+        return self.frame is None
+
+def create_frame_handoff(policy, maxsize):
+    if policy == "latest":
+        return LatestFrameMailbox()
+    if policy == "fifo":
+        return FrameQueue(maxsize)
+    raise ValueError(f"Unknown frame hand-off policy: {policy}")
@@ -0,0 +1,106 @@
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+class FrameMetadata:
+    # Capture facts of one frame, stamped by ImageCollector right after the camera returns it.
+    # capture_ns is time.monotonic_ns(), so intervals are immune to wall clock changes; get_capture_time()
+    # turns it into epoch seconds for the report with an offset fixed once per process.
+    # camera_timestamp is the driver timestamp in milliseconds (CAP_PROP_POS_MSEC), NaN if the backend has none
+    __slots__ = ('capture_ns', 'sequence', 'camera_timestamp')
+    EPOCH_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+    def __init__(self, capture_ns=0, sequence=-1, camera_timestamp=math.nan) -> None:
+        self.capture_ns = capture_ns
+        self.sequence = sequence
+        self.camera_timestamp = camera_timestamp
+
+    def stamp(self, capture_ns, sequence, camera_timestamp):
+        self.capture_ns = capture_ns
+        self.sequence = sequence
+        self.camera_timestamp = camera_timestamp
+
+    def get_capture_time(self):
+        return (self.capture_ns + self.EPOCH_OFFSET_NS) / 1e9
+
+    def copy(self):
+        # Pooled metadata is overwritten once the frame is released, copy it if it must outlive the frame
+        return FrameMetadata(self.capture_ns, self.sequence, self.camera_timestamp)
+
+    def __reduce__(self):
+        return (FrameMetadata, (self.capture_ns, self.sequence, self.camera_timestamp))
+
+class PooledFrame:
+    # A frame buffer borrowed from a FramePool, with its capture metadata. Whoever takes it off the queue must call release().
+    # Releasing twice is harmless, so error paths can release a frame without knowing whether it already was
+    __slots__ = ('pool', 'image', 'metadata', 'held')
+
+    def __init__(self, pool, image) -> None:
+        self.pool = pool
+        self.image = image
+        self.metadata = FrameMetadata()
+        self.held = False
+
+    def release(self):
+        self.pool.release(self)
+
+class FramePool:
+    # Fixed set of preallocated frame buffers shared by ImageProducer and ImageConsumer.
+    # cap.read(image=frame.image) fills a free buffer in place, so capturing allocates nothing per frame
+    DEFAULT_SIZE = int(8)
+
+    def __init__(self, size=DEFAULT_SIZE) -> None:
+        self.size = max(1, int(size))
+        self.lock = threading.Lock()
+        self.free = deque(PooledFrame(self, None) for _ in range(self.size))
+
+        # Stats
+        self.acquired = 0
+        self.exhausted = 0
+
+    def acquire(self):
+        # Returns a free frame, or None if every buffer is still held downstream
+        with self.lock:
+            if not self.free:
+                self.exhausted += 1
+                return None
+            self.acquired += 1
+            frame = self.free.popleft()
+            frame.held = True
+            return frame
+
+    def release(self, frame):
+        with self.lock:
+            if not frame.held:
+                return
+            frame.held = False
+            self.free.append(frame)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'in_use': self.size - len(self.free),
+                'acquired': self.acquired,
+                'exhausted': self.exhausted
+            }
+
+class ConversionBuffers:
+    # Small rotation of reusable destination buffers (e.g. for cv.cvtColor(..., dst=...)).
+    # Rotating keeps the last few results valid while the GUI still shows a QImage built on them
+    DEFAULT_COUNT = int(3)
+
+    def __init__(self, count=DEFAULT_COUNT) -> None:
+        self.count = max(1, int(count))
+        self.buffers = []
+        self.index = 0
+
+    def next(self, shape, dtype=np.uint8):
+        if not self.buffers or self.buffers[0].shape != tuple(shape) or self.buffers[0].dtype != dtype:
+            self.buffers = [np.empty(shape, dtype=dtype) for _ in range(self.count)]
+        buffer = self.buffers[self.index]
+        self.index = (self.index + 1) % self.count
+        return buffer
@@ -0,0 +1,245 @@
+import glob
+import math
+import os
+
+import cv2 as cv
+import numpy as np
+
+from Model.CaptureConfig import CaptureConfig
+from Model.CaptureBackend import open_camera
+
+# Frame sources for ImageProducer. All of them follow the cv.VideoCapture calls the capture loop uses:
+# grab() advances to the next frame (False at the end), retrieve(image=) decodes it, reusing the given buffer when it can,
+# get_timestamp() is the frame's media time in milliseconds. open() returns the negotiated mode, or None on failure.
+# Cameras are live: frames are stamped with the time they arrive. The other sources replay recorded or generated frames
+# and are stamped from their media time, paced in real time or as fast as the pipeline takes them (CaptureConfig.frame_source_pacing).
+# rewind() starts them over from the first frame, so every trial replays the same frames
+# Sources are selected with CaptureConfig.frame_source
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+SYNTHETIC_SIZE = (640, 480)     #Synthetic frame size when no capture resolution is configured
+
+class CameraSource:
+    live = True
+
+    def __init__(self, config: CaptureConfig) -> None:
+        self.config = config
+        self.cap = None
+        self.paced = False
+
+    def describe(self):
+        return f"camera {self.config.camera}"
+
+    def open(self):
+        self.cap, mode = open_camera(self.config.camera, self.config.fps, self.config.capture_width, self.config.capture_height, self.config.capture_fourcc)
+        # With V4L2, grab() blocks until the driver delivers the next frame
+        self.paced = mode is not None and mode['driver_paced']
+        return mode
+
+    def is_opened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image=image)
+
+    def get_timestamp(self):
+        camera_timestamp = self.cap.get(cv.CAP_PROP_POS_MSEC)
+        return camera_timestamp if camera_timestamp > 0 else math.nan
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+class VideoFileSource:
+    # Replays a recorded video file, e.g. a raw video recorded with a trial
+    live = False
+    paced = False
+
+    def __init__(self, config: CaptureConfig) -> None:
+        self.config = config
+        self.cap = None
+        self.fps = float(config.fps)
+        self.frames = 0
+        # Media time added on every loop, so timestamps keep increasing
+        self.loop_offset = 0.0
+        self.last_timestamp = 0.0
+
+    def describe(self):
+        return f"video file {self.config.frame_source_path}"
+
+    def open(self):
+        self.cap = cv.VideoCapture(self.config.frame_source_path)
+        if not self.cap.isOpened():
+            return None
+        self.fps = self.cap.get(cv.CAP_PROP_FPS) or float(self.config.fps)
+        return {
+            'api': 'video file',
+            'width': int(self.cap.get(cv.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.cap.get(cv.CAP_PROP_FRAME_HEIGHT)),
+            'fps': self.fps,
+            'fourcc': "",
+            'driver_paced': False
+        }
+
+    def is_opened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def grab(self):
+        if self.cap.grab():
+            self.frames += 1
+            return True
+        if not self.config.frame_source_loop or self.frames == 0:
+            return False
+        self.loop_offset = self.last_timestamp + 1000 / self.fps
+        self.frames = 0
+        self.cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+        return self.grab()
+
+    def rewind(self):
+        self.cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+        self.frames = 0
+        self.loop_offset = 0.0
+        self.last_timestamp = 0.0
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image=image)
+
+    def get_timestamp(self):
+        position = self.cap.get(cv.CAP_PROP_POS_MSEC)
+        if position <= 0 and self.frames > 1:
+            # Some containers do not report positions, fall back to the nominal frame rate
+            position = (self.frames - 1) * 1000 / self.fps
+        self.last_timestamp = self.loop_offset + position
+        return self.last_timestamp
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+class ImageDirectorySource:
+    # Replays the images of a directory in file name order, one frame every 1/config.fps seconds
+    live = False
+    paced = False
+
+    def __init__(self, config: CaptureConfig) -> None:
+        self.config = config
+        self.paths = []
+        self.index = -1
+        self.frames = 0
+
+    def describe(self):
+        return f"image directory {self.config.frame_source_path}"
+
+    def open(self):
+        self.paths = sorted(path for path in glob.glob(os.path.join(self.config.frame_source_path, "*")) if path.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            return None
+        first = cv.imread(self.paths[0])
+        if first is None:
+            return None
+        return {
+            'api': 'image directory',
+            'width': first.shape[1],
+            'height': first.shape[0],
+            'fps': float(self.config.fps),
+            'fourcc': "",
+            'driver_paced': False
+        }
+
+    def is_opened(self):
+        return bool(self.paths)
+
+    def grab(self):
+        if self.index + 1 >= len(self.paths):
+            if not self.config.frame_source_loop:
+                return False
+            self.index = -1
+        self.index += 1
+        self.frames += 1
+        return True
+
+    def rewind(self):
+        self.index = -1
+        self.frames = 0
+
+    def retrieve(self, image=None):
+        loaded = cv.imread(self.paths[self.index])
+        if loaded is None:
+            return False, image
+        if image is not None and image.shape == loaded.shape:
+            # Keep the pooled buffer, the pool expects frames to be filled in place
+            np.copyto(image, loaded)
+            return True, image
+        return True, loaded
+
+    def get_timestamp(self):
+        return (self.frames - 1) * 1000 / max(1, self.config.fps)
+
+    def release(self):
+        self.paths = []
+
+class SyntheticSource:
+    # Generated frames (a face-sized ellipse drifting over a noisy background), endless. Needs neither files nor hardware
+    live = False
+    paced = False
+
+    def __init__(self, config: CaptureConfig) -> None:
+        self.config = config
+        self.width = config.capture_width or SYNTHETIC_SIZE[0]
+        self.height = config.capture_height or SYNTHETIC_SIZE[1]
+        self.background = None
+        self.frames = 0
+
+    def describe(self):
+        return f"synthetic frames {self.width}x{self.height}"
+
+    def open(self):
+        rng = np.random.default_rng(seed=0)
+        self.background = rng.integers(0, 64, size=(self.height, self.width, 3), dtype=np.uint8)
+        return {
+            'api': 'synthetic',
+            'width': self.width,
+            'height': self.height,
+            'fps': float(self.config.fps),
+            'fourcc': "",
+            'driver_paced': False
+        }
+
+    def is_opened(self):
+        return self.background is not None
+
+    def grab(self):
+        self.frames += 1
+        return True
+
+    def rewind(self):
+        self.frames = 0
+
+    def retrieve(self, image=None):
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        np.copyto(image, self.background)
+        t = self.frames / max(1, self.config.fps)
+        center = (int(self.width / 2 + self.width / 8 * math.sin(t)), int(self.height / 2 + self.height / 16 * math.sin(t * 0.7)))
+        cv.ellipse(image, center, (self.width // 6, self.height // 4), 0, 0, 360, (170, 190, 220), -1)
+        return True, image
+
+    def get_timestamp(self):
+        return (self.frames - 1) * 1000 / max(1, self.config.fps)
+
+    def release(self):
+        self.background = None
+
+def create_frame_source(config: CaptureConfig):
+    if config.frame_source == "camera":
+        return CameraSource(config)
+    if config.frame_source == "video":
+        return VideoFileSource(config)
+    if config.frame_source == "images":
+        return ImageDirectorySource(config)
+    if config.frame_source == "synthetic":
+        return SyntheticSource(config)
+    raise ValueError(f"Unknown frame source: {config.frame_source}")
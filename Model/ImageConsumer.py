@@ -1,219 +1,363 @@
 import numpy as np
 import cv2 as cv
+import sys
+import threading
 import time
-from FaceAnalyzer import FaceAnalyzer 
 from Model.CaptureConfig import CaptureConfig
 from Utils.ReportGenerator import ReportGenerator
+from Model.FrameAnalyzer import FrameAnalyzer
+from Model.AnalysisWorker import AnalysisWorker
+from Model.AnalysisRateController import AnalysisRateController
+from Model.FramePool import ConversionBuffers
+from Model.PreviewRenderer import PreviewRenderer
+import Utils.StartupTimer as startup_timer
 import queue
-import sys
 
 from PyQt6.QtCore import QThread, pyqtSignal, QObject
 
 from PyQt6.QtGui import QImage
 
 class ImageConsumer(QObject):
-    image_update_signal = pyqtSignal(QImage)
+    image_update_signal = pyqtSignal(QImage, object)
     
-    def __init__(self, config: CaptureConfig, queue_reference: queue.Queue, report_facade: ReportGenerator) -> None:
+    def __init__(self, config: CaptureConfig, queue_reference: queue.Queue, report_facade: ReportGenerator, timings=None) -> None:
         super().__init__()
         self.config = config
+        self.timings = timings
         self.report_facade = report_facade
         self.queue = queue_reference
-        self.video_analysis = None
-        self.video_stream = None
+        # Single preview path, rate limited to config.preview_fps
+        self.preview = PreviewRenderer(max_fps=self.config.preview_fps, timings=self.timings)
+        self.preview.preview_update_signal.connect(self.output_image)
+        self.preview.start()
+        # One long-lived worker for preview and analysis; trials only switch its mode, the face model stays warm
+        self.worker = ImageConsumer.ImageWorker(config=self.config, queue_reference=self.queue, report_facade=self.report_facade, preview=self.preview, timings=self.timings)
         
     def start_video_stream(self):
-        self.video_stream = ImageConsumer.ImageStreamer(self.queue)
-        self.video_stream.inner_image_update_signal.connect(self.output_image)
-        self.video_stream.start()
+        if not self.worker.isRunning():
+            self.worker.start()
+        self.worker.set_mode(ImageConsumer.ImageWorker.MODE_PREVIEW)
         
-    def end_video_stream(self):
-        self.video_stream.quit()
+    def pause(self):
+        # Frames are released untouched, e.g. while the feed is not visible
+        self.worker.set_mode(ImageConsumer.ImageWorker.MODE_PAUSED)
+        
+    def is_analysing(self):
+        return self.worker.mode == ImageConsumer.ImageWorker.MODE_ANALYSING
         
     def start_video_analysis(self):
-        self.video_analysis = ImageConsumer.ImageAnalyzer(config=self.config, queue_reference=self.queue, report_facade=self.report_facade)
-        self.video_analysis.inner_image_update_signal.connect(self.output_image)
         self.report_facade.initial_setup()
-        self.video_analysis.start()
+        if not self.worker.isRunning():
+            self.worker.start()
+        # Frames captured before this call are not part of the trial
+        self.worker.set_mode(ImageConsumer.ImageWorker.MODE_ANALYSING)
+        
+    def end_video_analysis(self, wait=True):
+        # Returns once the frames of the trial are analysed and logged, so the report can be closed.
+        # Without wait, returns right away with the command, to be passed to wait_for_command later
+        return self.worker.set_mode(ImageConsumer.ImageWorker.MODE_PREVIEW, wait=wait)
         
-    def end_video_analysis(self):
-        self.video_analysis.quit()
+    def wait_for_command(self, command):
+        self.worker.wait_for_command(command)
         
-    def output_image(self, image):
-        self.image_update_signal.emit(image)
+    def output_image(self, image, hud):
+        self.image_update_signal.emit(image, hud)
+        
+    def preview_displayed(self):
+        self.preview.frame_displayed()
+        
+    def set_preview_size(self, width, height):
+        self.preview.set_target_size(width, height)
         
     def shutdown(self):
-        # Try to finish the threads, ignore exception if thread objects were not initialized 
-        try:
-            self.video_analysis.quit()
-        except:
-            pass
-        try:
-            self.video_stream.quit()
-        except:
-            pass
+        self.worker.stop()
+        self.preview.stop()
         
-    class ImageStreamer(QThread):
-        inner_image_update_signal = pyqtSignal(QImage)
-        def __init__(self, queue_reference):
-            super().__init__()
-            self.queue_reference = queue_reference
-        def run(self):
-            while self.isRunning():
-                image = self.queue_reference.get()
-                # Convert it to RGB
-                image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
-                qt_image = QImage(image.data, image.shape[1], image.shape[0], QImage.Format.Format_RGB888)
-                self.inner_image_update_signal.emit(qt_image)
+    class ImageWorker(QThread):
+        # Consumes the frame hand-off for the whole capture session. Commands from the GUI thread switch its mode:
+        #   preview:   frames are only converted when a preview is due
+        #   analysing: frames captured after the command are analysed and logged, starting with the very next one
+        #   paused:    frames are released untouched
+        # The FrameAnalyzer (and the analysis process, in process mode) is built once and reset between trials
+        MODE_PREVIEW = "preview"
+        MODE_ANALYSING = "analysing"
+        MODE_PAUSED = "paused"
+        QUEUE_TIMEOUT = 0.1     #In seconds, how often a blocked worker checks for commands
+        COMMAND_TIMEOUT = 5     #In seconds, how long set_mode(wait=True) waits for the worker
+        STOP_TIMEOUT = 5000     #In milliseconds
         
-    class ImageAnalyzer(QThread):
-        inner_image_update_signal = pyqtSignal(QImage)
-        def __init__(self, queue_reference, config, report_facade):
+        def __init__(self, queue_reference, config, report_facade, preview, timings=None):
             super().__init__()
+            self.timings = timings
             self.queue_reference = queue_reference
             self.report_facade = report_facade
             self.config = config
+            self.preview = preview
+            self.running = True
+            self.mode = self.MODE_PAUSED
+            self.commands = queue.Queue()
+            # The preview copies what it takes, one buffer is enough
+            self.rgb_buffers = ConversionBuffers(count=1)
+            
+            # Analysis state, built on the first trial and kept afterwards
+            self.analyzer = None
+            self.analysis_worker = None
+            self.rate_controller = None
+            self.trial_start_ns = 0
+            self.trial_start_time = 0.0
+            self.first_frame_analysed = False
+            # Copy of the metadata of the trial frame being handled, logged as not analysed if handling it fails
+            self.current_metadata = None
+            
+        def set_mode(self, mode, wait=False):
+            # Called from the GUI thread. The switch happens between two frames
+            done = threading.Event()
+            self.commands.put((mode, time.monotonic_ns(), done))
+            command = (mode, done)
+            if wait:
+                self.wait_for_command(command)
+            return command
+            
+        def wait_for_command(self, command):
+            mode, done = command
+            if self.isRunning() and not done.wait(self.COMMAND_TIMEOUT):
+                print(f"Image worker did not switch to {mode} in time")
+            
+        def stop(self):
+            # Finishes the current trial, if any, so its rows reach the report, then waits for the thread
+            self.running = False
+            self.wait(self.STOP_TIMEOUT)
+            
+        def next_frame(self):
+            try:
+                return self.queue_reference.get(timeout=self.QUEUE_TIMEOUT)
+            except queue.Empty:
+                return None
             
         def run(self):
-            # Blinks counter
-            n_blinks = 0
-
-            # FPS processing
-            prev_frame_time = time.time()
-            curr_frame_time = time.time()
-
-            # Prepare buffers
-            blink_buffer = []
-            short_perclos_buffer = []
-
-            #Setup bools
-            short_perclos_ready = False
-            blink_ready = False
-            PayingAttention = False
-            one_face_detected = False
-
-            # Build face analyzer
-            fa = FaceAnalyzer(max_nb_faces=1)
-            # Main Loop
-            while self.isRunning():
-                # Process fps
-                curr_frame_time = time.time()
-                dt = curr_frame_time-prev_frame_time
-                prev_frame_time = curr_frame_time
-                fps = 1/dt
-                # Read an image from the camera
-                image = self.queue_reference.get()
-                # Convert it to RGB
-                image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
-                #cv.imshow('RGB image',image)
-                # Process it
-                fa.process(image)
-                #Now if we find a face
-
-                if fa.nb_faces==1:
-                    one_face_detected = True
-                    # Computes eyes opening level and blinks
-                    left_eye_opening, right_eye_opening, is_blink, last_blink_duration = fa.faces[0].process_eyes(image, detect_blinks=True, blink_th=self.config.blink_detection_threshold) #, normalize=True   blink_th=0.35   # TODO: Determine what values are best here - should we normalize?
-
-                    # Compute perclos items
-                    # TODO: Below call for short_perclos may need to change fps to the config specified FPS. Currently, the buffer depth passed to compute perclos is dynamic which may lead to unexepcted behavior with the guaranteed fluctuations in calculated frame rate.
-                    short_perclos = fa.faces[0].compute_perclos(left_eye_opening, right_eye_opening, self.config.perclos_window_size * int(fps), short_perclos_buffer, threshold=(self.config.perclos_high_threshold / 100))*100    #Gives result over time window in percentage, change threshold to .2 as default 
-                    #print("Short perclos: ", short_perclos)
-                    
-                    if len(short_perclos_buffer) >= (self.config.perclos_window_size * int(fps)):
-                        short_perclos_ready = True
-
-                    fa.faces[0].draw_eyes_landmarks(image)
-                    # Get eyes positions
-                    left_iris_pos  = fa.faces[0].get_landmark_pos(fa.faces[0].left_eye_center_index).tolist()
-                    right_iris_pos = fa.faces[0].get_landmark_pos(fa.faces[0].right_eye_center_index).tolist()
-
-                    #TODO: For Chiho, use get_landmarks_pos function from Face class to get all contours around the eye. Alternatively, we could just return the whole faces meshes if desired. Put this behind a setting that is by default ON but can be turned off to improve performance and logging. Also, we can consider improving logging I/O performance by wrapping the write command in a simple "every 20 frames" type loop to reduce I/O demands without sacrificing data loss in the event of a crash.
-                    left_eyelid_loc = fa.faces[0].get_landmarks_pos(fa.faces[0].left_eyelids_indices).tolist()
-                    right_eyelid_loc = fa.faces[0].get_landmarks_pos(fa.faces[0].right_eyelids_indices).tolist()
-
-                    left_eye_loc = fa.faces[0].get_landmarks_pos(fa.faces[0].left_eye_contour_indices).tolist()
-                    right_eye_loc = fa.faces[0].get_landmarks_pos(fa.faces[0].right_eye_contour_indices).tolist()
-
-                    # Plot eye opening on each eye
-                    cv.putText(image, f"{left_eye_opening:2.2f}", (int(left_iris_pos[0]+30), int(left_iris_pos[1])), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 255, 255) if left_eye_opening>0.5 else (255,0,0),2)
-                    cv.putText(image, f"{right_eye_opening:2.2f}", (int(right_iris_pos[0]-150), int(right_iris_pos[1])), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 255, 255) if right_eye_opening>0.5 else (255,0,0),2)
-
-                    # Only after 15 seconds that we can use this perclos
-                    if short_perclos_ready:
-                        if short_perclos < self.config.perclos_low_threshold:
-                            cv.putText(image, f"Perclos ({self.config.perclos_window_size} seconds) : {short_perclos:2.2f}%", (10, 25), cv.FONT_HERSHEY_SIMPLEX, .75, (0, 255, 0),2)
-                        elif (short_perclos >= self.config.perclos_low_threshold) and (short_perclos < self.config.perclos_high_threshold):
-                            cv.putText(image, f"Perclos ({self.config.perclos_window_size} seconds) : {short_perclos:2.2f}%", (10, 25), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 170, 0),4)
+            try:
+                while self.running:
+                    frame = None
+                    self.current_metadata = None
+                    try:
+                        self.apply_commands()
+                        if self.mode == self.MODE_ANALYSING and self.analysis_worker is not None:
+                            self.collect_results()
+                        frame = self.next_frame()
+                        if frame is None:
+                            continue
+                        if self.mode == self.MODE_ANALYSING:
+                            self.analyse_frame(frame)
+                        elif self.mode == self.MODE_PREVIEW:
+                            self.preview_frame(frame)
                         else:
-                            cv.putText(image, f"Perclos ({self.config.perclos_window_size} seconds) : {short_perclos:2.2f}%", (10, 25), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 0, 0),4)
-
-
-
-                    #Blink items
-                    blink_buffer.append(is_blink)
-                    blink_buffer_len = self.config.blink_window_size * int(fps)
-                    #print("Expected len:", blink_buffer_len)
-                    #print("Current len:", len(blink_buffer))
-
-                    if len(blink_buffer) >= blink_buffer_len:
-                        blink_ready = True
-
-                    while len(blink_buffer) > blink_buffer_len:     # TODO: Is this necessary? If so, then perclos buffer should have similar statement. If not, then remove this.
-                        blink_buffer.pop(0)
-                    bb = np.array(blink_buffer)
-                    num_blinks_in_window = ((bb == 1).astype(int).sum())
-                    #blink_rate = (num_blinks_in_window / self.config.blink_window_size)*100    # Represents the number of blinks as a percentage of the total blink window size
-                    blink_rate = num_blinks_in_window / (self.config.blink_window_size / 60)    # Finds blink rate by looking at number of blinks over the last blink_window_size seconds, and converting to blinks per minute
+                            frame.release()
+                    except:
+                        # This thread serves the whole session: one bad frame must not end it
+                        self.frame_failed(frame)
+                self.leave_mode()
+            finally:
+                if self.analysis_worker is not None:
+                    self.analysis_worker.shutdown()
                     
-                    # print("Blink rate: ", blink_rate)
-                    # print("Blinks in last", self.config.blink_window_size, "seconds: ", num_blinks_in_window)
-
-                    if is_blink:
-                        n_blinks += 1   # Running counter of total blinks. Likely no longer needed
-                        
-                    if blink_ready:
-                        if num_blinks_in_window <= self.config.blink_threshold:
-                            cv.putText(image, f"Blinks in last {self.config.blink_window_size} seconds : {num_blinks_in_window}", (10, 50), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 0, 0),4)
-                        else:
-                            cv.putText(image, f"Blinks in last {self.config.blink_window_size} seconds : {num_blinks_in_window}", (10, 50), cv.FONT_HERSHEY_SIMPLEX, .75, (0, 255, 0),2)
-
-                    # # Blink duration
-                    cv.putText(image, f"Last Blink Duration (s) : {last_blink_duration:2.2f}s", (10, 75), cv.FONT_HERSHEY_SIMPLEX, .75, (0, 0, 0),2)
+        def apply_commands(self):
+            while True:
+                try:
+                    mode, command_ns, done = self.commands.get_nowait()
+                except queue.Empty:
+                    return
+                if mode != self.mode:
+                    self.leave_mode()
+                    if mode == self.MODE_ANALYSING:
+                        self.start_trial(command_ns)
+                    self.mode = mode
+                done.set()
+                
+        def leave_mode(self):
+            if self.mode == self.MODE_ANALYSING:
+                self.finish_trial()
+            
+        def start_trial(self, command_ns):
+            if self.analyzer is None:
+                # Build frame analyzer (face model, rolling windows) once for the session
+                self.analyzer = FrameAnalyzer(config=self.config, report_facade=self.report_facade, overlay_mode=self.config.overlay_mode, local_inference=self.config.analysis_mode != "process", timings=self.timings)
+            else:
+                self.analyzer.reset_trial()
+            self.rate_controller = self.create_rate_controller()
+            self.trial_start_ns = command_ns
+            self.trial_start_time = time.perf_counter()
+            self.first_frame_analysed = False
+            
+        def finish_trial(self):
+            # Drain frames still in flight
+            while self.analysis_worker is not None and self.analysis_worker.in_flight:
+                self.finish_result(self.analysis_worker.get_result(block=True))
+            self.print_overlay_time(self.analyzer)
+            self.print_rate_controller_stats(self.rate_controller)
+            if self.analyzer.tracker is not None:
+                print("Face ROI tracking: ", self.analyzer.tracker.get_stats())
+            if self.analyzer.face_tracker is not None:
+                print("Face tracking: ", self.analyzer.face_tracker.get_stats())
+            
+        def frame_analysed(self):
+            if self.first_frame_analysed:
+                return
+            self.first_frame_analysed = True
+            startup_timer.log_event("first analysed frame")
+            print(f"First analysed frame {time.perf_counter() - self.trial_start_time:.2f} s after the trial started")
+            
+        def preview_frame(self, frame):
+            if not self.preview.is_due():
+                # Nothing will be shown for this frame, skip the conversion
+                frame.release()
+                return
+            # Convert it to RGB into a reusable buffer and give the capture buffer back
+            image = self.rgb_buffers.next(frame.image.shape)
+            cv.cvtColor(frame.image, cv.COLOR_BGR2RGB, dst=image)
+            frame.release()
+            self.preview.offer(image)
+            
+        def analyse_frame(self, frame):
+            analyzer = self.analyzer
+            if frame.metadata.capture_ns < self.trial_start_ns:
+                # Captured before the trial started
+                self.preview_frame(frame)
+                return
+            if self.timings is not None:
+                queue_wait_ns = time.monotonic_ns() - frame.metadata.capture_ns
+                # Fast replay stamps frames with media time, which can run ahead of the clock
+                if queue_wait_ns >= 0:
+                    self.timings.record('queue_wait', queue_wait_ns)
+                self.timings.sample_queue_depth(self.queue_reference.qsize())
+            # Timestamps come from capture, not from when the frame left the queue.
+            # The pooled metadata is reused once the frame is released, keep a copy
+            metadata = frame.metadata.copy()
+            self.current_metadata = metadata
+            curr_frame_time = metadata.get_capture_time()
+            if self.rate_controller is not None and not self.rate_controller.should_analyse():
+                self.skip_frame(frame, curr_frame_time, metadata)
+                return
+            # Process mode, unless the analysis process could not be started and the model now runs here
+            if self.config.analysis_mode == "process" and analyzer.fa is None:
+                self.submit_frame(frame, metadata)
+                return
+            
+            analysis_start = time.perf_counter()
+            # Convert it to RGB into a reusable buffer and give the capture buffer back
+            convert_start = time.perf_counter_ns()
+            image = self.rgb_buffers.next(frame.image.shape)
+            cv.cvtColor(frame.image, cv.COLOR_BGR2RGB, dst=image)
+            frame.release()
+            if self.timings is not None:
+                self.timings.record('cvt_color', time.perf_counter_ns() - convert_start)
+            #cv.imshow('RGB image',image)
+            # Process it
+            analyzer.process(image, curr_frame_time, metadata)
+            self.frame_analysed()
+            if self.rate_controller is not None:
+                self.rate_controller.record_cost(time.perf_counter() - analysis_start)
                     
-                else:
-                    one_face_detected = False
-                    #TODO: Here, we should reset the variables that are logged to prevent duplicate logging of the same data point. These should probably instead be replaced with None or NaN, something to distinguish it from the rest of the data.
-
-                # TO-DO: review paying attention metrics for calculation
-                # if blink_ready is True and short_perclos_ready is True:
-                #     if (short_perclos > 20) or ((short_perclos > 10) and (num_blinks_in_window <= self.config.blink_threshold)):
-                #         PayingAttention = False
-                #     else:
-                #         PayingAttention = True
-                #         try:
-                #             self.report_facade.write_data(curr_frame_time, left_eye_opening, right_eye_opening, is_blink, last_blink_duration, short_perclos, blink_rate, num_blinks_in_window, PayingAttention)
-                #         except:
-                #             print("Unable to write to report: ", sys.exc_info())
-                #     # TO-DO: review paying attention metrics
-                #     # if PayingAttention:
-                #     #     cv.putText(image, f"Paying Attention? : Yes", (10, 135), cv.FONT_HERSHEY_SIMPLEX, .75, (0, 255, 0),2)
-                #     # else:
-                #     #     cv.putText(image, f"Paying Attention? : No", (10, 135), cv.FONT_HERSHEY_SIMPLEX, .75, (255, 0, 0),2)
-                # else:
-                #     cv.putText(image, f"Paying Attention? : N/A", (10, 135), cv.FONT_HERSHEY_SIMPLEX, .75, (0, 255, 0),2)
-                #     try:
-                #         self.report_facade.write_data(curr_frame_time, left_eye_opening, right_eye_opening, is_blink, last_blink_duration, short_perclos, blink_rate, num_blinks_in_window, None)
-                #     except:
-                #         print("Unable to write to report: ", sys.exc_info())
+            self.preview.offer(image, analyzer.hud)
+            
+        def frame_failed(self, frame):
+            print("Unable to process frame: ", sys.exc_info())
+            if frame is not None:
+                frame.release()
+            # A trial frame is still logged, as not analysed
+            if self.mode == self.MODE_ANALYSING and self.current_metadata is not None:
+                self.analyzer.skip_frame(self.current_metadata.get_capture_time(), self.current_metadata)
+            
+        def create_rate_controller(self):
+            if not self.config.adaptive_frame_skipping:
+                return None
+            return AnalysisRateController(self.config.fps, self.config.min_analysis_rate, self.config.max_analysis_rate)
+            
+        def skip_frame(self, frame, curr_frame_time, metadata):
+            # Not analysed, but still logged and, if a preview is due, shown
+            self.analyzer.skip_frame(curr_frame_time, metadata)
+            if self.preview.is_due():
+                image = self.rgb_buffers.next(frame.image.shape)
+                cv.cvtColor(frame.image, cv.COLOR_BGR2RGB, dst=image)
+                self.preview.offer(image, self.analyzer.hud)
+            frame.release()
+            
+        def print_rate_controller_stats(self, rate_controller):
+            if rate_controller is not None:
+                print("Adaptive frame skipping: ", rate_controller.get_stats())
+            
+        def print_overlay_time(self, analyzer):
+            # Lets the overlay modes be compared on the same setup
+            print(f"Overlay ({analyzer.overlay_mode}): {analyzer.get_overlay_time():.3f} ms per frame over {analyzer.overlay_frames} frames")
                 
-                try:
-                    if one_face_detected:
-                        self.report_facade.write_data(log_time = curr_frame_time, left_eye_opening = left_eye_opening, right_eye_opening = right_eye_opening, perclos = short_perclos, is_blink = is_blink, last_blink_duration = last_blink_duration, blink_rate = blink_rate, one_face_detected = one_face_detected, left_iris_loc = left_iris_pos, left_eyelid_loc = left_eyelid_loc, left_eye_loc = left_eye_loc, right_iris_loc = right_iris_pos, right_eyelid_loc = right_eyelid_loc, right_eye_loc = right_eye_loc)
-                    else:
-                        self.report_facade.write_data(log_time = curr_frame_time, left_eye_opening = "NaN", right_eye_opening = "NaN", perclos = "NaN", is_blink = "NaN", last_blink_duration = "NaN", blink_rate = "NaN", one_face_detected = one_face_detected,  left_iris_loc = "NaN", left_eyelid_loc = "NaN", left_eye_loc = "NaN", right_iris_loc = "NaN", right_eyelid_loc = "NaN", right_eye_loc = "NaN")
-                except:
-                    print("Unable to write to report: ", sys.exc_info())
-                        
-                qt_image = QImage(image.data, image.shape[1], image.shape[0], QImage.Format.Format_RGB888)
-                self.inner_image_update_signal.emit(qt_image)
\ No newline at end of file
+        def submit_frame(self, frame, metadata):
+            # Process mode: the face model runs in a child process, this thread only converts, logs and previews
+            worker = self.analysis_worker
+            if worker is None:
+                # Started on the first frame, the shared-memory ring is sized after it. Kept for the following trials
+                worker = AnalysisWorker(frame.image.shape, self.config.blink_detection_threshold, slots=self.config.analysis_worker_slots,
+                                        analysis_resolution=self.config.analysis_resolution, face_roi_cropping=self.config.face_roi_cropping, max_faces=self.config.max_faces)
+                if not worker.started:
+                    # Would most likely fail again: the face model runs in this thread for the rest of the session
+                    print("Analysis process could not be started, analysing in the image worker thread instead")
+                    self.analyzer.start_local_inference()
+                    self.analyzer.skip_frame(metadata.get_capture_time(), metadata)
+                    frame.release()
+                    return
+                self.analysis_worker = worker
+            if not worker.can_submit():
+                # All slots in flight, wait for the oldest one
+                self.finish_result(worker.get_result(block=True))
+                worker = self.analysis_worker
+                if worker is None:
+                    # The analysis process died, this frame is logged unanalysed and the next one starts a new process
+                    self.analyzer.skip_frame(metadata.get_capture_time(), metadata)
+                    frame.release()
+                    return
+            # The frame is converted into a shared-memory slot, so the capture buffer can go back right away
+            worker.submit(frame.image, metadata)
+            frame.release()
+            # Its row now comes with the result, or as a lost frame if the process dies
+            self.current_metadata = None
+            self.collect_results()
+            
+        def collect_results(self):
+            worker = self.analysis_worker
+            result = worker.get_result(block=False)
+            while result is not None:
+                self.finish_frame(result)
+                if self.rate_controller is not None:
+                    # The face model is the bottleneck in this mode, its cost is measured in the child
+                    self.rate_controller.record_cost(worker.last_inference_time)
+                result = worker.get_result(block=False)
+            if worker.failed:
+                self.analysis_worker_failed()
+                
+        def finish_result(self, result):
+            # Result of a blocking get_result: None if the analysis process died
+            if result is not None:
+                self.finish_frame(result)
+            elif self.analysis_worker.failed:
+                self.analysis_worker_failed()
+                
+        def analysis_worker_failed(self):
+            # Frames lost in the dead process are still logged, as not analysed, so the report has a row for every frame.
+            # The process is replaced on the next frame
+            worker = self.analysis_worker
+            self.analysis_worker = None
+            for metadata in worker.take_lost_frames():
+                self.analyzer.skip_frame(metadata.get_capture_time(), metadata)
+            print(f"Analysis process failed, {worker.frames_lost} frames were not analysed")
+            try:
+                worker.shutdown()
+            except:
+                print("Unable to clean up the analysis process: ", sys.exc_info())
+                    
+        def finish_frame(self, result):
+            image, metadata, measurement, slot = result
+            if self.timings is not None:
+                # Face model and eye metrics both ran in the child, measured there
+                self.timings.record('face_process', int(self.analysis_worker.last_inference_time * 1e9))
+            self.analyzer.process_result(image, metadata.get_capture_time(), measurement, metadata)
+            self.frame_analysed()
+            self.preview.offer(image, self.analyzer.hud)
+            self.analysis_worker.release(slot)
@@ -1,51 +1,242 @@
-from PyQt6.QtCore import QThread
-import queue
-import cv2 as cv
+from PyQt6.QtCore import QThread, pyqtSignal
+import sys
+import threading
 import time
 
 from Model.CaptureConfig import CaptureConfig
+from Model.FrameSource import create_frame_source
+from Model.VideoRecorder import VideoRecorder
+from Model.FramePool import FramePool
 
 class ImageProducer():
-    def __init__(self, queue_reference: queue, config: CaptureConfig) -> None:
+    STOP_TIMEOUT = 2000     #In milliseconds
+    OPEN_TIMEOUT = 10       #In seconds, some USB cameras take several seconds to open
+    BACKPRESSURE_TIMEOUT = 0.1  #In seconds, how long fast replay waits for room before checking it should stop
+    HOLD_INTERVAL = 0.01    #In seconds, how often a held replay checks whether it should restart
+    
+    def __init__(self, queue_reference, config: CaptureConfig, timings=None) -> None:
         self.config = config
+        self.timings = timings
         self.queue = queue_reference
         self.image_collection = ImageProducer.ImageCollector(self)
-        self.cap = cv.VideoCapture(self.config.camera, cv.CAP_DSHOW)
-        self.cap.set(cv.CAP_PROP_FPS, self.config.fps)
+        # Camera, video file, image directory or synthetic frames, see Model/FrameSource.py
+        self.source = create_frame_source(self.config)
+        self.mode = None
         self.capturing = True
+        self.video_recorder = None
+        # Frames travel through the queue as PooledFrame objects; consumers release them back here
+        self.frame_pool = FramePool(size=self.config.frame_pool_size)
+        # Replays start over with every trial. A held replay hands no frames over; a fast replay is held until the first
+        # trial (in preview the worker would only drop its frames), and any replay once it reaches its end
+        self.replay_hold = threading.Event()
+        self.replay_restart = threading.Event()
+        if self.is_fast_replay():
+            self.replay_hold.set()
+        # The source is opened (camera mode negotiated) in the background, the GUI keeps building meanwhile
+        self.opened = threading.Event()
+        # Set when nobody waits for the source any more: an open finishing after that releases the device at once
+        self.open_lock = threading.Lock()
+        self.open_abandoned = False
+        self.opener = threading.Thread(target=self.open_source, daemon=True)
+        self.opener.start()
         
-    def start_video_capture(self):
-        self.capturing = True
+    def open_source(self):
+        try:
+            self.mode = self.source.open()
+            print(f"Capture mode of {self.source.describe()}: ", self.mode)
+        except:
+            print(f"Unable to open {self.source.describe()}: ", sys.exc_info())
+        finally:
+            with self.open_lock:
+                self.opened.set()
+                if self.open_abandoned:
+                    print(f"{self.source.describe()} opened after the timeout, releasing it")
+                    self.source.release()
+        
+    def abandon_open(self):
+        # Returns False if the source finished opening meanwhile
+        with self.open_lock:
+            if self.opened.is_set():
+                return False
+            self.open_abandoned = True
+            return True
+        
+    def is_open(self):
+        return self.opened.is_set() and self.mode is not None and self.source.is_opened()
         
-        while not self.cap.isOpened():
-                print(f"Capture with camera {self.config.camera} not initialized")
+    def describe_source(self):
+        return self.source.describe()
         
+    def is_fast_replay(self):
+        return not self.source.live and self.config.frame_source_pacing == "fast"
+        
+    def hold_replay(self):
+        # Before a trial starts, so no frame of the previous playback reaches it
+        if not self.source.live:
+            self.replay_hold.set()
+        
+    def restart_replay(self):
+        # Once the trial started: the replay starts over from its first frame, stamped from now
+        if not self.source.live:
+            self.replay_restart.set()
+        
+    def start_video_capture(self):
+        # Returns at once: the collector waits for the source to open, and emits open_failed_signal if it does not
+        self.capturing = True
         self.image_collection.start()
         
+    def wait_until_open(self):
+        # Gives up early when capture is stopped meanwhile
+        deadline = time.monotonic() + self.OPEN_TIMEOUT
+        while self.capturing and not self.opened.wait(self.HOLD_INTERVAL):
+            if time.monotonic() >= deadline and self.abandon_open():
+                return False
+        return self.capturing and self.is_open()
+        
     def stop_video_capture(self):
         self.capturing = False
-        self.image_collection.quit()
+        # Let the current read finish, so no frame is queued after the consumers switch queues
+        self.image_collection.wait(self.STOP_TIMEOUT)
+        
+    def start_recording(self, output_directory):
+        # Raw frames are encoded in a separate process, fed through shared memory
+        self.stop_recording()
+        video_recorder = VideoRecorder(output_directory, fps=self.config.fps, slots=self.config.raw_video_buffer_slots)
+        if self.is_open():
+            # Spawn the encoder now rather than from the capture thread on the first frame
+            video_recorder.start((self.mode['height'], self.mode['width'], 3))
+        self.video_recorder = video_recorder
+        
+    def stop_recording(self):
+        video_recorder = self.video_recorder
+        if video_recorder is None:
+            return None
+        self.video_recorder = None
+        return video_recorder.stop()
+        
+    def get_pool_stats(self):
+        return self.frame_pool.get_stats()
         
     def shutdown(self):
         self.stop_video_capture()
-        self.cap.release()
+        self.stop_recording()
+        if self.opened.wait(self.OPEN_TIMEOUT) or not self.abandon_open():
+            self.source.release()
+        print("Frame pool: ", self.get_pool_stats())
     
     class ImageCollector(QThread):
+        open_failed_signal = pyqtSignal(str)
+        
         def __init__(self, collection_reference) -> None:
             super().__init__()
             self.image_collection = collection_reference
             
         def run(self):
-            while self.image_collection.capturing:
+            producer = self.image_collection
+            source = producer.source
+            # Waiting here rather than in start_video_capture keeps the GUI thread free while slow cameras open
+            if not producer.wait_until_open():
+                if producer.capturing:
+                    print(f"Capture with {source.describe()} not initialized")
+                    self.open_failed_signal.emit(source.describe())
+                return
+            # Replayed frames are stamped from their media time; fast replay never drops them, it waits for the pipeline instead
+            live = source.live
+            fast = not live and producer.config.frame_source_pacing == "fast"
+            driver_paced = source.paced
+            interval_ns = int(1e9 / max(1, producer.config.fps))
+            next_due_ns = 0
+            sequence = 0
+            replay_start_ns = time.monotonic_ns()
+            while producer.capturing:
+                if not live:
+                    if producer.replay_restart.is_set():
+                        producer.replay_restart.clear()
+                        source.rewind()
+                        sequence = 0
+                        replay_start_ns = time.monotonic_ns()
+                        producer.replay_hold.clear()
+                    if producer.replay_hold.is_set():
+                        time.sleep(producer.HOLD_INTERVAL)
+                        continue
                 start_time = time.time()
-                ret, frame = self.image_collection.cap.read()
+                # grab() blocks until the driver has a frame; only frames we keep are decoded by retrieve()
+                if not source.grab():
+                    if not live:
+                        # End of the replay, held until the next trial restarts it
+                        print(f"End of the replay of {source.describe()}")
+                        producer.replay_hold.set()
+                        continue
+                    print(f"WARNING: Frame not returned from {source.describe()}. This is normal during shut down.")
+                    break
+                sequence += 1
+                if live:
+                    capture_ns = time.monotonic_ns()
+                else:
+                    capture_ns = replay_start_ns + int(source.get_timestamp() * 1e6)
+                    if not fast:
+                        # Real-time replay: hand each frame over when its media time comes
+                        time.sleep(max(0, (capture_ns - time.monotonic_ns()) / 1e9))
+                if driver_paced:
+                    # The camera may run faster than config.fps: drop the frames that are not due yet, undecoded
+                    if capture_ns < next_due_ns - interval_ns // 4:
+                        continue
+                    next_due_ns = max(next_due_ns, capture_ns - interval_ns // 2) + interval_ns
+                if not fast and producer.video_recorder is None and producer.queue.would_drop():
+                    # The hand-off would drop this frame on offer, skip decoding it (recorded frames are always decoded)
+                    producer.queue.count_drop()
+                    self.pace(start_time, live and not driver_paced)
+                    continue
+                frame = self.acquire_frame(fast)
+                if frame is None:
+                    # Every buffer is still held downstream, skip decoding
+                    self.pace(start_time, live and not driver_paced)
+                    continue
+                # Decode time only: with V4L2, grab() mostly waits for the driver
+                retrieve_start = time.perf_counter_ns()
+                ret, frame.image = source.retrieve(image=frame.image)
+                if producer.timings is not None:
+                    producer.timings.record('capture_read', time.perf_counter_ns() - retrieve_start)
                     
                 if not ret:
-                    print("WARNING: Frame not returned from webcam. This is normal during shut down.")
+                    frame.release()
+                    print(f"WARNING: Frame not returned from {source.describe()}. This is normal during shut down.")
                     break
-                if not self.image_collection.queue.full():  # Avoid filling the queue with too many frames
-                    self.image_collection.queue.put(frame)
+                # Stamped as soon as the frame is back, so queue wait and analysis time stay out of the timestamps.
+                # Sequence numbers count every grabbed frame, gaps in the report are frames dropped before analysis
+                frame.metadata.stamp(capture_ns, sequence - 1, source.get_timestamp())
+                video_recorder = producer.video_recorder
+                if video_recorder is not None:
+                    video_recorder.write(frame.image, frame.metadata.get_capture_time(), frame.metadata.sequence)
+                if not live and producer.replay_hold.is_set():
+                    # Grabbed before the replay was held for a trial start
+                    frame.release()
+                elif fast:
+                    self.hand_over(frame)
+                else:
+                    # Never blocks: depending on the hand-off policy, either this frame or a stale one is dropped
+                    producer.queue.offer(frame)
+                
+                self.pace(start_time, live and not driver_paced)
                 
-                # Wait to maintain the frame rate
+        def acquire_frame(self, wait):
+            producer = self.image_collection
+            frame = producer.frame_pool.acquire()
+            # Fast replay waits for a buffer to come back instead of skipping the frame
+            while wait and frame is None and producer.capturing:
+                time.sleep(0.001)
+                frame = producer.frame_pool.acquire()
+            return frame
+            
+        def hand_over(self, frame):
+            producer = self.image_collection
+            while not producer.queue.offer_blocking(frame, producer.BACKPRESSURE_TIMEOUT):
+                if not producer.capturing:
+                    frame.release()
+                    return
+                
+        def pace(self, start_time, sleep_paced):
+            # Wait to maintain the frame rate of cameras the driver does not pace
+            if sleep_paced:
                 time.sleep(max(0, (1 / self.image_collection.config.fps) - (time.time() - start_time)))
-        
\ No newline at end of file
+        
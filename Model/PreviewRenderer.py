@@ -0,0 +1,106 @@
+import threading
+import time
+
+import cv2 as cv
+import numpy as np
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QImage
+
+class PreviewRenderer(QThread):
+    # Preview path decoupled from capture and analysis.
+    # offer() is called by the streamer/analyzer threads and returns immediately unless a preview frame is due:
+    # at most max_fps frames per second are taken, and none while the GUI has not painted the previous one.
+    # Taken frames are copied to a staging buffer, downscaled to the widget size on this thread, and emitted
+    # as QImages that own their pixels, together with the HUD values of that frame (None outside analysis)
+    preview_update_signal = pyqtSignal(QImage, object)
+    DISPLAY_TIMEOUT = 1.0     #In seconds, stop waiting for the GUI to report a painted frame after this long
+    STOP_TIMEOUT = 1000       #In milliseconds
+
+    def __init__(self, max_fps, timings=None) -> None:
+        super().__init__()
+        self.timings = timings
+        self.min_interval = 1 / max(1, max_fps)
+        self.condition = threading.Condition()
+        self.staging = None
+        self.staging_hud = None
+        self.pending = False          # A staged frame waits to be rendered
+        self.displaying = False       # A rendered frame was emitted and the GUI has not painted it yet
+        self.last_offer_time = 0.0
+        self.last_emit_time = 0.0
+        self.target_size = (640, 480)
+        self.running = True
+
+        # Stats
+        self.frames_rendered = 0
+        self.frames_coalesced = 0
+
+    def set_target_size(self, width, height):
+        with self.condition:
+            self.target_size = (max(1, int(width)), max(1, int(height)))
+
+    def is_due(self):
+        # Cheap check so callers can skip preparing a frame that would not be shown
+        now = time.monotonic()
+        if now - self.last_offer_time < self.min_interval:
+            return False
+        if self.displaying and now - self.last_emit_time > self.DISPLAY_TIMEOUT:
+            self.displaying = False
+        return not (self.pending or self.displaying)
+
+    def offer(self, image, hud=None):
+        now = time.monotonic()
+        if now - self.last_offer_time < self.min_interval:
+            return False
+        with self.condition:
+            if self.displaying and now - self.last_emit_time > self.DISPLAY_TIMEOUT:
+                self.displaying = False
+            if self.pending or self.displaying:
+                # GUI (or this thread) is still busy with the previous preview
+                self.frames_coalesced += 1
+                return False
+            if self.staging is None or self.staging.shape != image.shape:
+                self.staging = np.empty_like(image)
+            np.copyto(self.staging, image)
+            self.staging_hud = hud
+            self.pending = True
+            self.last_offer_time = now
+            self.condition.notify()
+        return True
+
+    def frame_displayed(self):
+        # Called by the GUI once the last preview frame is painted
+        with self.condition:
+            self.displaying = False
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.wait(self.STOP_TIMEOUT)
+
+    def run(self):
+        while self.running:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    break
+                target_width, target_height = self.target_size
+            render_start = time.perf_counter_ns()
+            # offer() leaves the staging buffer alone while pending is set, so it can be read without the lock
+            image = self.staging
+            hud = self.staging_hud
+            height, width = image.shape[:2]
+            scale = min(target_width / width, target_height / height, 1.0)
+            if scale < 1.0:
+                image = cv.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv.INTER_AREA)
+            qt_image = QImage(image.data, image.shape[1], image.shape[0], image.strides[0], QImage.Format.Format_RGB888).copy()
+
+            with self.condition:
+                self.pending = False
+                self.displaying = True
+                self.last_emit_time = time.monotonic()
+            self.frames_rendered += 1
+            self.preview_update_signal.emit(qt_image, hud)
+            if self.timings is not None:
+                self.timings.record('preview_emit', time.perf_counter_ns() - render_start)
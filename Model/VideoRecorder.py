@@ -0,0 +1,139 @@
+import csv
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from multiprocessing import shared_memory
+
+import cv2 as cv
+import numpy as np
+
+class VideoRecorder:
+    # Default values
+    DEFAULT_SLOTS = int(8)            #Frames that can wait for the encoder before new ones are dropped
+    DEFAULT_FOURCC = "MJPG"
+    VIDEO_FILE = "raw_video.avi"
+    TIMESTAMPS_FILE = "raw_video_timestamps.csv"
+    timestamps_headers = ['frame', 'sequence', 'capture_time']
+    STOP_TIMEOUT = 30                 #In seconds, time given to the encoder to finish its backlog
+
+    def __init__(self, output_directory, fps, slots=DEFAULT_SLOTS, fourcc=DEFAULT_FOURCC) -> None:
+        self.video_file = os.path.join(output_directory, self.VIDEO_FILE)
+        self.timestamps_file = os.path.join(output_directory, self.TIMESTAMPS_FILE)
+        self.fps = fps
+        self.slots = max(1, int(slots))
+        self.fourcc = fourcc
+        self.lock = threading.Lock()
+        self.frame_shape = None
+        self.shared_frames = None
+        self.frames = None
+        self.process = None
+        self.stopped = False
+
+        # Stats
+        self.frames_captured = 0
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self.frames_encoded = 0
+
+    def start(self, frame_shape):
+        # The ring is sized after the frame shape. Called by whoever starts the recording when the capture size is known,
+        # so the capture thread does not stall while the encoder process spawns; otherwise lazily with the first frame
+        self.frame_shape = tuple(frame_shape)
+        frame_size = int(np.prod(frame_shape))
+        self.shared_frames = shared_memory.SharedMemory(create=True, size=frame_size * self.slots)
+        self.frames = np.ndarray((self.slots,) + tuple(frame_shape), dtype=np.uint8, buffer=self.shared_frames.buf)
+
+        # spawn: the encoder never inherits the Qt/mediapipe state of this process
+        context = multiprocessing.get_context("spawn")
+        self.free_slots = context.Queue()
+        self.filled_slots = context.Queue()
+        self.results = context.Queue()
+        for slot in range(self.slots):
+            self.free_slots.put(slot)
+
+        self.process = context.Process(target=encode_frames, args=(self.shared_frames.name, tuple(frame_shape), self.slots, self.video_file, self.timestamps_file, self.fps, self.fourcc, self.free_slots, self.filled_slots, self.results), daemon=True)
+        self.process.start()
+
+    def write(self, frame, capture_time, sequence):
+        # Called from the capture thread. Never blocks: if the encoder is behind, the frame is dropped.
+        # sequence is the frame's capture sequence number (FrameMetadata.sequence), the key to its data.csv row
+        with self.lock:
+            if self.stopped:
+                return False
+            if self.process is None:
+                self.start(frame.shape)
+            self.frames_captured += 1
+            if frame.shape != self.frame_shape:
+                self.frames_dropped += 1
+                return False
+            try:
+                slot = self.free_slots.get_nowait()
+            except queue.Empty:
+                self.frames_dropped += 1
+                return False
+            np.copyto(self.frames[slot], frame)
+            self.filled_slots.put((slot, sequence, capture_time))
+            self.frames_submitted += 1
+            return True
+
+    def stop(self):
+        # Let the encoder finish its backlog, then release the shared memory. Returns the recording stats
+        with self.lock:
+            if self.stopped:
+                return self.get_stats()
+            self.stopped = True
+            if self.process is not None:
+                self.filled_slots.put(None)
+                try:
+                    self.frames_encoded = self.results.get(timeout=self.STOP_TIMEOUT)
+                except queue.Empty:
+                    print("Video encoder did not finish in time: ", self.video_file)
+                self.process.join(timeout=self.STOP_TIMEOUT)
+                if self.process.is_alive():
+                    self.process.terminate()
+                self.frames = None
+                self.shared_frames.close()
+                self.shared_frames.unlink()
+            return self.get_stats()
+
+    def get_stats(self):
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_submitted': self.frames_submitted,
+            'frames_dropped': self.frames_dropped,
+            'frames_encoded': self.frames_encoded
+        }
+
+def encode_frames(shared_frames_name, frame_shape, slots, video_file, timestamps_file, fps, fourcc, free_slots, filled_slots, results):
+    # Encoder process entry point
+    shared_frames = shared_memory.SharedMemory(name=shared_frames_name)
+    frames = np.ndarray((slots,) + frame_shape, dtype=np.uint8, buffer=shared_frames.buf)
+    writer = cv.VideoWriter(video_file, cv.VideoWriter_fourcc(*fourcc), fps, (frame_shape[1], frame_shape[0]))
+    if not writer.isOpened():
+        print("Unable to open video writer: ", video_file)
+
+    frames_encoded = 0
+    try:
+        with(open(file=timestamps_file, mode='w', newline='')) as timestamps:
+            timestamps_writer = csv.writer(timestamps)
+            timestamps_writer.writerow(VideoRecorder.timestamps_headers)
+            while True:
+                item = filled_slots.get()
+                if item is None:
+                    break
+                slot, sequence, capture_time = item
+                if writer.isOpened():
+                    writer.write(frames[slot])
+                free_slots.put(slot)
+                # sequence is the capture sequence of data.csv: gaps are frames dropped here or before reaching the recorder
+                timestamps_writer.writerow([frames_encoded, sequence, capture_time])
+                frames_encoded += 1
+    except:
+        print("Video encoder failed: ", sys.exc_info())
+    finally:
+        writer.release()
+        del frames
+        shared_frames.close()
+        results.put(frames_encoded)
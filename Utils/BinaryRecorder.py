@@ -0,0 +1,181 @@
+import os
+import glob
+import threading
+
+import numpy as np
+
+# Columnar, append-only binary companion of data.csv.
+# Each chunk is a directory holding one .npy file per column, so every column can be memory-mapped:
+#   recording/chunk_000000/timestamp.npy           float64 (N,)       epoch seconds
+#   recording/chunk_000000/left_eye_opening.npy    float32 (N,)       NaN when no face was detected
+#   recording/chunk_000000/blink_detected.npy      int8    (N,)       -1 when no face was detected
+#   recording/chunk_000000/analysis_skipped.npy    bool    (N,)       frame skipped by adaptive frame skipping (absent in older recordings)
+#   recording/chunk_000000/capture_ns.npy          int64   (N,)       monotonic capture time, -1 without frame metadata (absent in older recordings)
+#   recording/chunk_000000/frame_sequence.npy      int64   (N,)       capture sequence number, -1 without frame metadata (absent in older recordings)
+#   recording/chunk_000000/camera_timestamp.npy    float64 (N,)       driver timestamp in ms, NaN if unavailable (absent in older recordings)
+#   recording/chunk_000000/left_eyelid_loc.npy     float32 (N, K, 3)  NaN when no face was detected
+# Chunks are written to a temporary directory and renamed when complete, so a crash never leaves a partial chunk.
+
+SCALAR_COLUMNS = {
+    'timestamp': np.float64,
+    'left_eye_opening': np.float32,
+    'right_eye_opening': np.float32,
+    'perclos': np.float32,
+    'blink_detected': np.int8,
+    'last_blink_duration': np.float32,
+    'blink_rate': np.float32,
+    'one_face_detected': np.bool_,
+    'analysis_skipped': np.bool_,
+    'capture_ns': np.int64,
+    'frame_sequence': np.int64,
+    'camera_timestamp': np.float64
+}
+LANDMARK_COLUMNS = ['left_iris_loc', 'left_eyelid_loc', 'left_eye_loc', 'right_iris_loc', 'right_eyelid_loc', 'right_eye_loc']
+CHUNK_PREFIX = "chunk_"
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _as_points(value):
+    if value is None or isinstance(value, str):
+        return None
+    points = np.asarray(value, dtype=np.float32)
+    if points.size == 0 or points.size % 3 != 0:
+        return None
+    return points.reshape(-1, 3)
+
+class BinaryRecorder:
+    DEFAULT_CHUNK_ROWS = int(1024)
+
+    def __init__(self, directory, chunk_rows=DEFAULT_CHUNK_ROWS, task_runner=None) -> None:
+        self.directory = directory
+        self.chunk_rows = max(1, int(chunk_rows))
+        # Callable used to hand a full chunk to another thread (e.g. ReportWriter.submit). Returns False if it refused the task
+        self.task_runner = task_runner
+        self.lock = threading.Lock()
+        self.landmark_shapes = {}
+        self.chunk_index = 0
+        self.closed = False
+        try:
+            os.makedirs(self.directory)
+        except:
+            pass
+        self.allocate_chunk()
+
+    def allocate_chunk(self):
+        self.rows = 0
+        self.scalars = {name: np.empty(self.chunk_rows, dtype=dtype) for name, dtype in SCALAR_COLUMNS.items()}
+        self.landmarks = {name: None for name in LANDMARK_COLUMNS}
+        for name, shape in self.landmark_shapes.items():
+            self.landmarks[name] = np.full((self.chunk_rows, shape, 3), np.nan, dtype=np.float32)
+
+    def append(self, log_time, left_eye_opening, right_eye_opening, perclos, is_blink, last_blink_duration, blink_rate, one_face_detected, left_iris_loc, left_eyelid_loc, left_eye_loc, right_iris_loc, right_eyelid_loc, right_eye_loc, analysis_skipped=False, metadata=None):
+        with self.lock:
+            if self.closed:
+                return
+            row = self.rows
+            self.scalars['timestamp'][row] = log_time
+            self.scalars['left_eye_opening'][row] = _as_float(left_eye_opening)
+            self.scalars['right_eye_opening'][row] = _as_float(right_eye_opening)
+            self.scalars['perclos'][row] = _as_float(perclos)
+            blink = _as_float(is_blink)
+            self.scalars['blink_detected'][row] = -1 if np.isnan(blink) else int(blink)
+            self.scalars['last_blink_duration'][row] = _as_float(last_blink_duration)
+            self.scalars['blink_rate'][row] = _as_float(blink_rate)
+            self.scalars['one_face_detected'][row] = bool(one_face_detected)
+            self.scalars['analysis_skipped'][row] = bool(analysis_skipped)
+            if metadata is not None:
+                self.scalars['capture_ns'][row] = metadata.capture_ns
+                self.scalars['frame_sequence'][row] = metadata.sequence
+                self.scalars['camera_timestamp'][row] = metadata.camera_timestamp
+            else:
+                self.scalars['capture_ns'][row] = -1
+                self.scalars['frame_sequence'][row] = -1
+                self.scalars['camera_timestamp'][row] = np.nan
+
+            values = (left_iris_loc, left_eyelid_loc, left_eye_loc, right_iris_loc, right_eyelid_loc, right_eye_loc)
+            for name, value in zip(LANDMARK_COLUMNS, values):
+                points = _as_points(value)
+                if points is None:
+                    continue
+                column = self.landmarks[name]
+                if column is None:
+                    # First time we see this landmark group, its shape is fixed from now on
+                    self.landmark_shapes[name] = points.shape[0]
+                    column = np.full((self.chunk_rows, points.shape[0], 3), np.nan, dtype=np.float32)
+                    self.landmarks[name] = column
+                if points.shape[0] == column.shape[1]:
+                    column[row] = points
+
+            self.rows += 1
+            if self.rows >= self.chunk_rows:
+                self.flush_chunk()
+
+    def flush_chunk(self):
+        # Must be called with self.lock held
+        if self.rows == 0:
+            return
+        rows = self.rows
+        columns = {name: column[:rows] for name, column in self.scalars.items()}
+        for name, column in self.landmarks.items():
+            columns[name] = column[:rows] if column is not None else np.empty((rows, 0, 3), dtype=np.float32)
+        chunk_path = os.path.join(self.directory, f"{CHUNK_PREFIX}{self.chunk_index:06d}")
+        self.chunk_index += 1
+        # Fresh buffers for the next chunk, the filled ones now belong to the save task
+        self.allocate_chunk()
+
+        task = lambda: self.save_chunk(chunk_path, columns)
+        if self.task_runner is None or not self.task_runner(task):
+            task()
+
+    def save_chunk(self, chunk_path, columns):
+        temporary_path = chunk_path + ".tmp"
+        try:
+            os.makedirs(temporary_path)
+        except:
+            pass
+        for name, column in columns.items():
+            np.save(os.path.join(temporary_path, name + ".npy"), column)
+        os.replace(temporary_path, chunk_path)
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.flush_chunk()
+            self.closed = True
+
+def list_recording_chunks(directory):
+    chunks = glob.glob(os.path.join(directory, CHUNK_PREFIX + "[0-9]*"))
+    return sorted(chunk for chunk in chunks if not chunk.endswith(".tmp"))
+
+def iter_recording_chunks(directory, mmap_mode='r'):
+    # Yields one {column: array} dict per chunk. With mmap_mode, nothing is read until the arrays are used
+    for chunk in list_recording_chunks(directory):
+        columns = {}
+        for name in list(SCALAR_COLUMNS) + LANDMARK_COLUMNS:
+            path = os.path.join(chunk, name + ".npy")
+            if os.path.exists(path):
+                columns[name] = np.load(path, mmap_mode=mmap_mode)
+        yield columns
+
+def load_recording(directory, mmap_mode='r'):
+    # Returns {column: array} for the whole recording. A single chunk is returned as memory-mapped views
+    chunks = list(iter_recording_chunks(directory, mmap_mode=mmap_mode))
+    if not chunks:
+        raise FileNotFoundError(f"No recording chunks found in {directory}")
+    if len(chunks) == 1:
+        return chunks[0]
+
+    recording = {}
+    for name in chunks[0]:
+        parts = [chunk[name] for chunk in chunks if name in chunk]
+        if name in LANDMARK_COLUMNS:
+            # Chunks recorded before any face was seen store (N, 0, 3); widen them with NaN
+            width = max(part.shape[1] for part in parts)
+            parts = [part if part.shape[1] == width else np.full((part.shape[0], width, 3), np.nan, dtype=np.float32) for part in parts]
+        recording[name] = np.concatenate(parts)
+    return recording
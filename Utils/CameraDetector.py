@@ -1,11 +1,152 @@
-from pygrabber.dshow_graph import FilterGraph
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
 
-def find_cameras() -> dict:
+# Camera enumeration with supported modes.
+# Linux lists /dev/video* capture nodes and probes their modes with v4l2-ctl; Windows lists DirectShow devices
+# (names only). Probing is slow, so results are cached on disk keyed by device identity (Linux: name + physical port
+# + USB ids, Windows: name + device index) and later launches can show the cached list right away while detect_cameras() refreshes it.
+# A camera is a dict: {'index', 'name', 'identity', 'modes'}, where modes is a list of
+# {'fourcc', 'width', 'height', 'fps'} sorted best first (empty when the modes are unknown).
+
+CACHE_VERSION = 1
+PROBE_TIMEOUT = 5       #In seconds, per device
+cache_lock = threading.Lock()
+
+def get_cache_path():
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "Palpebra", "cameras.json")
+
+def load_cache():
+    try:
+        with open(get_cache_path(), "r") as cache_file:
+            cache = json.load(cache_file)
+        if cache.get('version') == CACHE_VERSION:
+            return cache
+    except:
+        pass
+    return {'version': CACHE_VERSION, 'cameras': [], 'modes': {}}
+
+def save_cache(cache):
+    path = get_cache_path()
+    with cache_lock:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = path + ".tmp"
+            with open(temporary_path, "w") as cache_file:
+                json.dump(cache, cache_file)
+            os.replace(temporary_path, path)
+        except:
+            print("Unable to save camera cache: ", sys.exc_info())
+
+def read_sysfs(path):
+    try:
+        with open(path, "r") as sysfs_file:
+            return sysfs_file.read().strip()
+    except:
+        return ""
+
+def linux_device_identity(node):
+    # Stable across launches as long as the camera stays on the same port; /dev/videoN numbers are not
+    sysfs = os.path.join("/sys/class/video4linux", os.path.basename(node))
+    name = read_sysfs(os.path.join(sysfs, "name"))
+    port = os.path.realpath(os.path.join(sysfs, "device")) if os.path.exists(os.path.join(sysfs, "device")) else node
+    modalias = read_sysfs(os.path.join(sysfs, "device", "modalias"))
+    return name, f"{name}|{port}|{modalias}"
+
+def parse_v4l2_formats(output):
+    modes = []
+    fourcc = None
+    size = None
+    for line in output.splitlines():
+        match = re.search(r"\[\d+\]: '(\w+)'", line)
+        if match:
+            fourcc = match.group(1)
+            size = None
+            continue
+        match = re.search(r"Size: \w+ (\d+)x(\d+)", line)
+        if match:
+            size = (int(match.group(1)), int(match.group(2)))
+            continue
+        match = re.search(r"\(([\d.]+) fps\)", line)
+        if match and fourcc and size:
+            modes.append({'fourcc': fourcc, 'width': size[0], 'height': size[1], 'fps': float(match.group(1))})
+    # Highest resolution, then highest frame rate, then the cheaper-on-USB MJPG first
+    modes.sort(key=lambda mode: (-mode['width'] * mode['height'], -mode['fps'], mode['fourcc'] != "MJPG"))
+    return modes
+
+def probe_linux_modes(node):
+    # None if the modes cannot be probed (no v4l2-ctl), [] if the node is not a video capture device
+    v4l2_ctl = shutil.which("v4l2-ctl")
+    if v4l2_ctl is None:
+        return None
+    try:
+        output = subprocess.run([v4l2_ctl, "-d", node, "--list-formats-ext"], capture_output=True, text=True, timeout=PROBE_TIMEOUT).stdout
+    except:
+        print(f"Unable to probe {node}: ", sys.exc_info())
+        return None
+    return parse_v4l2_formats(output)
+
+def find_linux_cameras(cache):
+    cameras = []
+    nodes = sorted(glob.glob("/dev/video*"), key=lambda node: int(re.sub(r"\D", "", node) or 0))
+    for node in nodes:
+        index = int(re.sub(r"\D", "", node) or 0)
+        name, identity = linux_device_identity(node)
+        modes = cache['modes'].get(identity)
+        if modes is None:
+            modes = probe_linux_modes(node)
+            if modes is not None:
+                cache['modes'][identity] = modes
+        if modes == []:
+            # Metadata/output nodes have no capture formats
+            continue
+        cameras.append({'index': index, 'name': name or node, 'identity': identity, 'modes': modes or []})
+    return cameras
+
+def find_windows_cameras():
+    # pygrabber is Windows only, imported here so other platforms never need it
+    try:
+        import comtypes
+        comtypes.CoInitialize()     # COM must be initialised on every thread that uses it
+    except:
+        pass
+    from pygrabber.dshow_graph import FilterGraph
     devices = FilterGraph().get_input_devices()
+    # DirectShow only gives names, identical webcams share one: the device index keeps them apart
+    return [{'index': device_index, 'name': device_name, 'identity': f"{device_name}|{device_index}", 'modes': []} for device_index, device_name in enumerate(devices)]
 
+def get_cached_cameras():
+    # Instant: the cameras found by the last detect_cameras() call
+    return load_cache()['cameras']
+
+def detect_cameras(refresh=False):
+    # Enumerates cameras and their modes, probing only devices that are not cached yet (all of them with refresh)
+    cache = load_cache()
+    if refresh:
+        cache['modes'] = {}
+    if sys.platform.startswith("linux"):
+        cameras = find_linux_cameras(cache)
+    elif sys.platform.startswith("win"):
+        cameras = find_windows_cameras()
+    else:
+        cameras = []
+    cache['cameras'] = cameras
+    save_cache(cache)
+    return cameras
+
+def find_cameras() -> dict:
     available_cameras = {}
 
-    for device_index, device_name in enumerate(devices):
-        available_cameras[device_index] = device_name
+    for camera in detect_cameras():
+        available_cameras[camera['index']] = camera['name']
 
-    return available_cameras
\ No newline at end of file
+    return available_cameras
@@ -0,0 +1,137 @@
+import csv
+import math
+import threading
+import time
+
+# Low-overhead latency instrumentation for the capture/analysis pipeline.
+# Durations are time.perf_counter_ns()/time.monotonic_ns() differences recorded into fixed-bucket histograms,
+# so recording is O(1) with no allocation and percentiles can be read at any time.
+# Each stage is expected to be recorded from a single thread; readers (stats panel, timings.csv) get an approximate snapshot
+
+class LatencyHistogram:
+    MIN_NS = 1000               #Lower edge of the first bucket (1 us), shorter durations go to bucket 0
+    BUCKETS_PER_OCTAVE = 4      #Bucket width ~19%, the error of a percentile read from the buckets
+    OCTAVES = 24                #Up to ~16 s, longer durations go to the last bucket
+
+    def __init__(self) -> None:
+        self.size = self.BUCKETS_PER_OCTAVE * self.OCTAVES + 2
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self.size
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns):
+        if duration_ns < self.MIN_NS:
+            index = 0
+        else:
+            index = min(self.size - 1, int(math.log2(duration_ns / self.MIN_NS) * self.BUCKETS_PER_OCTAVE) + 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def bucket_upper_ns(self, index):
+        return self.MIN_NS * 2 ** (index / self.BUCKETS_PER_OCTAVE)
+
+    def get_quantile(self, quantile):
+        # Upper edge of the bucket holding the quantile, capped at the largest value seen. NaN without samples
+        if self.count == 0:
+            return math.nan
+        rank = quantile * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return min(self.bucket_upper_ns(index), self.max_ns)
+        return self.max_ns
+
+    def get_mean(self):
+        return self.total_ns / self.count if self.count else math.nan
+
+class PipelineTimings:
+    STAGES = ['capture_read', 'queue_wait', 'cvt_color', 'face_process', 'process_eyes', 'perclos', 'overlay', 'write_data', 'preview_emit']
+    QUANTILES = (0.5, 0.95, 0.99)
+    csv_headers = ['stage', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+        self.reset()
+
+    def reset(self):
+        self.start_time = time.monotonic()
+        for histogram in self.histograms.values():
+            histogram.reset()
+        with self.lock:
+            self.counters = {}
+        self.queue_depth_samples = 0
+        self.queue_depth_total = 0
+        self.max_queue_depth = 0
+
+    def record(self, stage, duration_ns):
+        self.histograms[stage].record(duration_ns)
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def set_counter(self, counter, value):
+        with self.lock:
+            self.counters[counter] = value
+
+    def sample_queue_depth(self, depth):
+        self.queue_depth_samples += 1
+        self.queue_depth_total += depth
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def get_counters(self):
+        with self.lock:
+            counters = dict(self.counters)
+        counters['avg_queue_depth'] = self.queue_depth_total / self.queue_depth_samples if self.queue_depth_samples else 0.0
+        counters['max_queue_depth'] = self.max_queue_depth
+        counters.update(self.get_rates())
+        return counters
+
+    def get_rates(self):
+        # Frames per second since reset: decoded by capture, reported by analysis, sent to the preview
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        return {
+            'capture_fps': self.histograms['capture_read'].count / elapsed,
+            'analysis_fps': self.histograms['write_data'].count / elapsed,
+            'preview_fps': self.histograms['preview_emit'].count / elapsed
+        }
+
+    def get_summary(self):
+        # [(stage, count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms)] for the stages that were recorded
+        rows = []
+        for stage in self.STAGES:
+            histogram = self.histograms[stage]
+            if histogram.count == 0:
+                continue
+            quantiles = [histogram.get_quantile(quantile) / 1e6 for quantile in self.QUANTILES]
+            rows.append([stage, histogram.count, histogram.get_mean() / 1e6] + quantiles + [histogram.max_ns / 1e6])
+        return rows
+
+    def format_summary(self):
+        # Compact text for the on-screen stats panel
+        lines = [f"{'stage':<13}{'p50':>8}{'p95':>8}{'p99':>8}  (ms)"]
+        for stage, count, mean, p50, p95, p99, maximum in self.get_summary():
+            lines.append(f"{stage:<13}{p50:>8.2f}{p95:>8.2f}{p99:>8.2f}")
+        for counter, value in self.get_counters().items():
+            lines.append(f"{counter}: {value:.1f}" if isinstance(value, float) else f"{counter}: {value}")
+        return "\n".join(lines)
+
+    def write_csv(self, path):
+        with open(file=path, mode='w', newline='') as timings_file:
+            writer = csv.writer(timings_file)
+            writer.writerow(self.csv_headers)
+            for row in self.get_summary():
+                writer.writerow([row[0], row[1]] + [f"{value:.4f}" for value in row[2:]])
+            # Counters follow the stages, with their value in the count column
+            for counter, value in self.get_counters().items():
+                writer.writerow([counter, value, "", "", "", "", ""])
@@ -0,0 +1,134 @@
+import csv
+import glob
+import gzip
+import os
+import sys
+import time
+
+# Rotated data report, used instead of a single data.csv when CaptureConfig.report_chunk_size or report_chunk_duration is set.
+# Rows are written to numbered gzip-compressed CSV chunks, each with the header row, and a manifest lists the closed chunks:
+#   data/data_000000.csv.gz
+#   data/data_000001.csv.gz
+#   data/manifest.csv        chunk, first_timestamp, last_timestamp, rows, bytes
+# A chunk is closed once its compressed size or its age reaches the limit. The manifest is rewritten (via a temporary file)
+# after every chunk, so it always lists complete chunks; the chunk still open during a crash is only missing from it.
+
+DATA_DIRECTORY = "data"
+CHUNK_PREFIX = "data_"
+CHUNK_SUFFIX = ".csv.gz"
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_HEADERS = ['chunk', 'first_timestamp', 'last_timestamp', 'rows', 'bytes']
+
+class ChunkedCsvWriter:
+    # Same writerows/flush interface as a csv writer over an open file, so ReportWriter can use either
+    COMPRESS_LEVEL = 6      #zlib level, 9 costs a lot more CPU for little gain on this data
+    SYNC_INTERVAL = 5.0     #In seconds, how often buffered rows are pushed through the compressor to disk
+
+    def __init__(self, directory, headers, max_bytes=0, max_seconds=0) -> None:
+        self.directory = directory
+        self.headers = headers
+        self.max_bytes = max(0, int(max_bytes))         #0 = no size limit
+        self.max_seconds = max(0.0, float(max_seconds)) #0 = no time limit
+        self.chunks = []
+        self.chunk_index = 0
+        self.raw_file = None
+        self.data_file = None
+        self.writer = None
+        try:
+            os.makedirs(self.directory)
+        except:
+            pass
+
+    def open_chunk(self):
+        self.chunk_name = f"{CHUNK_PREFIX}{self.chunk_index:06d}{CHUNK_SUFFIX}"
+        self.chunk_index += 1
+        # The size limit applies to what reached the disk, so keep the underlying file to ask it
+        self.raw_file = open(os.path.join(self.directory, self.chunk_name), mode='wb')
+        self.data_file = gzip.open(self.raw_file, mode='wt', newline='', compresslevel=self.COMPRESS_LEVEL)
+        self.writer = csv.writer(self.data_file)
+        self.writer.writerow(self.headers)
+        self.chunk_opened = time.monotonic()
+        self.last_sync = self.chunk_opened
+        self.chunk_rows = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def writerows(self, rows):
+        for row in rows:
+            if self.data_file is None:
+                self.open_chunk()
+            self.writer.writerow(row)
+            if self.first_timestamp is None:
+                self.first_timestamp = row[0]
+            self.last_timestamp = row[0]
+            self.chunk_rows += 1
+
+    def flush(self):
+        # Called after every batch of rows (every row when writing synchronously), so it must stay cheap: a gzip flush
+        # ends the deflate block and hurts compression. The compressor is only flushed every SYNC_INTERVAL, so a crash
+        # loses at most that much of the open chunk. The size limit is checked on what the compressor already wrote,
+        # so a chunk can end a few tens of kB past report_chunk_size
+        if self.data_file is None:
+            return
+        now = time.monotonic()
+        if now - self.last_sync >= self.SYNC_INTERVAL:
+            self.data_file.flush()
+            self.last_sync = now
+        if self.max_bytes and self.raw_file.tell() >= self.max_bytes:
+            self.close_chunk()
+        elif self.max_seconds and now - self.chunk_opened >= self.max_seconds:
+            self.close_chunk()
+
+    def close_chunk(self):
+        self.data_file.close()
+        chunk_bytes = self.raw_file.tell()
+        self.raw_file.close()
+        self.chunks.append([self.chunk_name, self.first_timestamp, self.last_timestamp, self.chunk_rows, chunk_bytes])
+        self.data_file = None
+        self.raw_file = None
+        self.writer = None
+        self.write_manifest()
+
+    def write_manifest(self):
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        temporary_path = manifest_path + ".tmp"
+        try:
+            with(open(file=temporary_path, mode='w', newline='')) as manifest_file:
+                writer = csv.writer(manifest_file)
+                writer.writerow(MANIFEST_HEADERS)
+                writer.writerows(self.chunks)
+            os.replace(temporary_path, manifest_path)
+        except:
+            print("Unable to write report manifest: ", sys.exc_info())
+
+    def close(self):
+        if self.data_file is not None:
+            self.close_chunk()
+        elif not self.chunks:
+            # No rows at all, still leave a readable (header only) chunk
+            self.open_chunk()
+            self.close_chunk()
+
+def read_manifest(directory):
+    # Returns the manifest rows as dicts, in chunk order
+    with(open(file=os.path.join(directory, MANIFEST_NAME), mode='r', newline='')) as manifest_file:
+        return list(csv.DictReader(manifest_file))
+
+def list_data_files(path):
+    # The files holding a data report, in order: [path] for a data.csv, the chunks for a rotated report directory.
+    # Chunks are listed from the directory rather than the manifest, so the last one is found even after a crash
+    if not os.path.isdir(path):
+        return [path]
+    chunks = sorted(glob.glob(os.path.join(path, CHUNK_PREFIX + "[0-9]*" + CHUNK_SUFFIX)))
+    if not chunks:
+        raise FileNotFoundError(f"No data chunks found in {path}")
+    return chunks
+
+def iter_data_frames(path, chunksize=None, **read_csv_arguments):
+    # Streams a data report (data.csv or rotated chunks) as pandas DataFrames: one per chunk, or per chunksize rows
+    import pandas as pd
+    for data_file in list_data_files(path):
+        if chunksize is None:
+            yield pd.read_csv(data_file, **read_csv_arguments)
+        else:
+            yield from pd.read_csv(data_file, chunksize=chunksize, **read_csv_arguments)
@@ -1,26 +1,42 @@
 from Model.CaptureConfig import CaptureConfig
+from Utils.ReportWriter import ReportWriter, format_row
+from Utils.BinaryRecorder import BinaryRecorder
+from Utils.ReportChunks import ChunkedCsvWriter, DATA_DIRECTORY, iter_data_frames
+from Utils.RunningStatistics import RunningStatistics
 
 import os
 import csv
 from datetime import datetime
 from pathvalidate import sanitize_filename
-
-import pandas as pd
 import sys
 
 class ReportGenerator:
-    config_headers = ['perclos_high_threshold', 'perclos_mid_threshold', 'perclos_low_threshold', 'perclos_window_size', 'blink_detection_threshold', 'blink_window_size', 'intended_fps']
-    data_headers = ['timestamp', 'left_eye_opening', 'right_eye_opening', 'perclos', 'blink_detected', 'last_blink_duration', 'blink_rate', 'OneFaceDetected', "left_iris_loc", "left_eyelid_loc", "left_eye_loc", "right_iris_loc", "right_eyelid_loc", "right_eye_loc"]
+    config_headers = ['perclos_high_threshold', 'perclos_mid_threshold', 'perclos_low_threshold', 'perclos_window_size', 'blink_detection_threshold', 'blink_window_size', 'intended_fps', 'landmark_space']
+    summary_metrics = ['left_eye_opening', 'right_eye_opening', 'perclos', 'blink_rate']
+    EXCEL_MAX_ROWS = 1048576        #Rows per worksheet, header included. Longer raw data continues on raw_data_2, ...
+    RAW_DATA_READ_ROWS = 100000     #Rows read at a time when copying the data report to final_report.xlsx
+    data_headers = ['timestamp', 'left_eye_opening', 'right_eye_opening', 'perclos', 'blink_detected', 'last_blink_duration', 'blink_rate', 'OneFaceDetected', 'analysis_skipped', 'frame_sequence', 'camera_timestamp', "left_iris_loc", "left_eyelid_loc", "left_eye_loc", "right_iris_loc", "right_eyelid_loc", "right_eye_loc"]
 
     def __init__(self, config: CaptureConfig) -> None:
         self.config = config
         self.config_report = ""
         self.data_report = ""
         self.report_location = ""
+        self.report_writer = None
+        self.chunked_writer = None
+        self.binary_recorder = None
+        self.binary_report = ""
+        self.statistics = {metric: RunningStatistics() for metric in self.summary_metrics}
+        self.skipped_frames = 0
+        self.report_rows_dropped = 0
         
     def initial_setup(self):
+        self.close_data_report()
         self.initialize_directory()
         self.initialize_reports()
+        self.reset_statistics()
+        self.start_report_writer()
+        self.start_binary_recorder()
     
     def initialize_directory(self):
         report_start_time = datetime.now().strftime('%Y%m%d_%H-%M-%S')
@@ -32,54 +48,161 @@ class ReportGenerator:
         except:
             pass
         self.config_report = os.path.join(self.report_location, "config.csv")
-        self.data_report = os.path.join(self.report_location, "data.csv")
+        # With report rotation, data.csv is replaced by a directory of compressed chunks (see Utils/ReportChunks.py)
+        self.data_report = os.path.join(self.report_location, DATA_DIRECTORY if self.config.is_report_rotated() else "data.csv")
+        self.binary_report = os.path.join(self.report_location, "recording")
     
     def initialize_reports(self):
         with(open(file=self.config_report, mode='w', newline='')) as config_file:
             writer = csv.writer(config_file)
             writer.writerow(self.config_headers)
             
-        with(open(file=self.data_report, mode='w', newline='')) as data_file:
-            writer = csv.writer(data_file)
-            writer.writerow(self.data_headers)
+        if self.config.is_report_rotated():
+            self.chunked_writer = ChunkedCsvWriter(self.data_report, self.data_headers, max_bytes=self.config.report_chunk_size * 1024 * 1024, max_seconds=self.config.report_chunk_duration * 60)
+        else:
+            with(open(file=self.data_report, mode='w', newline='')) as data_file:
+                writer = csv.writer(data_file)
+                writer.writerow(self.data_headers)
         self.write_config()
+        
+    def reset_statistics(self):
+        for statistics in self.statistics.values():
+            statistics.reset()
+        self.skipped_frames = 0
+        self.report_rows_dropped = 0
+        
+    def start_report_writer(self):
+        if not self.config.async_report_writing:
+            return
+        self.report_writer = ReportWriter(self.data_report, queue_size=self.config.report_queue_size, flush_rows=self.config.report_flush_rows, flush_interval=self.config.report_flush_interval, chunked_writer=self.chunked_writer)
+        self.report_writer.start()
+        
+    def start_binary_recorder(self):
+        if not self.config.binary_recording:
+            return
+        task_runner = self.report_writer.submit if self.report_writer is not None else None
+        self.binary_recorder = BinaryRecorder(self.binary_report, chunk_rows=self.config.binary_chunk_rows, task_runner=task_runner)
+        
+    def close_data_report(self):
+        # Save the last binary chunk and drain pending rows of the background writer, if any. Safe to call more than once
+        binary_recorder = self.binary_recorder
+        if binary_recorder is not None:
+            self.binary_recorder = None
+            binary_recorder.close()
+        
+        report_writer = self.report_writer
+        if report_writer is not None:
+            self.report_writer = None
+            report_writer.close()
+            stats = report_writer.get_stats()
+            self.report_rows_dropped = stats['rows_dropped']
+            print(f"Report writer closed: {stats['rows_written']} rows ({stats['rows_dropped']} dropped) in {stats['flush_count']} flushes, max queue depth {stats['max_queue_depth']}, avg flush {stats['avg_flush_latency']*1000:.2f} ms, max flush {stats['max_flush_latency']*1000:.2f} ms")
+        
+        # The last chunk of a rotated report is closed once every row reached it
+        chunked_writer = self.chunked_writer
+        if chunked_writer is not None:
+            self.chunked_writer = None
+            chunked_writer.close()
+        
+    def get_writer_stats(self):
+        report_writer = self.report_writer
+        if report_writer is None:
+            return None
+        return report_writer.get_stats()
     
     def write_config(self):
         with(open(file=self.config_report, mode='a', newline='')) as config_file:
             writer = csv.writer(config_file)
             writer.writerow(self.config.as_list())
         
-    def write_data(self, log_time, left_eye_opening, right_eye_opening, perclos, is_blink, last_blink_duration, blink_rate, one_face_detected, left_iris_loc, left_eyelid_loc, left_eye_loc, right_iris_loc, right_eyelid_loc, right_eye_loc):
+    def write_data(self, log_time, left_eye_opening, right_eye_opening, perclos, is_blink, last_blink_duration, blink_rate, one_face_detected, left_iris_loc, left_eyelid_loc, left_eye_loc, right_iris_loc, right_eyelid_loc, right_eye_loc, analysis_skipped=False, metadata=None):
+        # log_time is the frame's capture time in epoch seconds. metadata, if given, is its FrameMetadata
         timestamp = datetime.fromtimestamp(log_time).strftime('%Y-%m-%d-%H-%M-%S-%f')
+        frame_sequence = metadata.sequence if metadata is not None else "NaN"
+        camera_timestamp = metadata.camera_timestamp if metadata is not None else "NaN"
+        # New columns go before the landmark columns, raw_coordinate_visualizer reads the last 6 columns
+        row = [timestamp, left_eye_opening, right_eye_opening, perclos, is_blink, last_blink_duration, blink_rate, one_face_detected, analysis_skipped, frame_sequence, camera_timestamp, left_iris_loc, left_eyelid_loc, left_eye_loc, right_iris_loc, right_eyelid_loc, right_eye_loc]      #Choose which data is written to excel report-out here. Note that any new items will need to be declared in the function header as well, unless we implement kwargs. Will also need to add to headers for initial log file creation
+        
+        if one_face_detected:
+            # Running aggregates for the summary sheet, rows without a face are skipped like dropna did
+            self.statistics['left_eye_opening'].update(left_eye_opening)
+            self.statistics['right_eye_opening'].update(right_eye_opening)
+            self.statistics['perclos'].update(perclos)
+            self.statistics['blink_rate'].update(blink_rate)
+        if analysis_skipped:
+            self.skipped_frames += 1
+        
+        binary_recorder = self.binary_recorder
+        if binary_recorder is not None:
+            binary_recorder.append(log_time, left_eye_opening, right_eye_opening, perclos, is_blink, last_blink_duration, blink_rate, one_face_detected, left_iris_loc, left_eyelid_loc, left_eye_loc, right_iris_loc, right_eyelid_loc, right_eye_loc, analysis_skipped, metadata)
+        
+        report_writer = self.report_writer
+        if report_writer is not None and report_writer.write_row(row):
+            return
+        
+        chunked_writer = self.chunked_writer
+        if chunked_writer is not None:
+            chunked_writer.writerows([format_row(row)])
+            chunked_writer.flush()
+            return
         
         with(open(file=self.data_report, mode='a', newline='')) as data_file:
             writer = csv.writer(data_file)
-            writer.writerow([timestamp, left_eye_opening, right_eye_opening, perclos, is_blink, last_blink_duration, blink_rate, one_face_detected, left_iris_loc, left_eyelid_loc, left_eye_loc, right_iris_loc, right_eyelid_loc, right_eye_loc])      #Choose which data is written to excel report-out here. Note that any new items will need to be declared in the function header as well, unless we implement kwargs. Will also need to add to headers for initial log file creation
+            writer.writerow(format_row(row))
+        
+    def write_timings(self, timings):
+        # Per-stage latency percentiles and pipeline counters of the trial (see Utils/PipelineTimings.py)
+        try:
+            timings.write_csv(os.path.join(self.report_location, "timings.csv"))
+        except:
+            print("Unable to write timings report", sys.exc_info())
+        
+    def write_raw_data(self, writer):
+        # Streams the data report (data.csv or its chunks) into raw_data sheets, a new sheet whenever one is full
+        sheet = 1
+        sheet_rows = 0
+        for raw_data in iter_data_frames(self.data_report, chunksize=self.RAW_DATA_READ_ROWS):
+            if sheet_rows and 1 + sheet_rows + len(raw_data) > self.EXCEL_MAX_ROWS:
+                sheet += 1
+                sheet_rows = 0
+            sheet_name = 'raw_data' if sheet == 1 else f'raw_data_{sheet}'
+            raw_data.to_excel(writer, sheet_name=sheet_name, index=False, header=not sheet_rows, startrow=1 + sheet_rows if sheet_rows else 0)
+            sheet_rows += len(raw_data)
         
     def get_data_report_location(self):
         return self.data_report
 
+    def get_binary_report_location(self):
+        return self.binary_report
+
     def get_config_report_location(self):
         return self.data_report
     
-    def generate_summary_report(self, trial_duration):
-        summary = {}
-        df = pd.read_csv(self.data_report)
-        raw_data = df.copy(deep=True)
-        df = df.dropna()
+    def generate_summary_report(self, trial_duration, include_raw_data=None, rates=None):
+        # rates: optional {name: frames per second} of the capture pipeline (see PipelineTimings.get_rates)
+        self.close_data_report()
+        if include_raw_data is None:
+            include_raw_data = self.config.summary_include_raw_data
         
-        summary['avg_left_eye_opening'] = [df['left_eye_opening'].mean()]
-        summary['avg_right_eye_opening'] = [df['right_eye_opening'].mean()] 
-        summary['avg_perclos'] = [df['perclos'].mean()]
+        summary = {}
+        summary['avg_left_eye_opening'] = [self.statistics['left_eye_opening'].get_mean()]
+        summary['avg_right_eye_opening'] = [self.statistics['right_eye_opening'].get_mean()] 
+        summary['avg_perclos'] = [self.statistics['perclos'].get_mean()]
         summary['trial_duration'] = trial_duration
+        summary['analysis_skipped_frames'] = [self.skipped_frames]
+        summary['report_rows_dropped'] = [self.report_rows_dropped]
+        for name, rate in (rates or {}).items():
+            summary[name] = [rate]
+        for metric in self.summary_metrics:
+            for key, value in self.statistics[metric].as_dict(metric).items():
+                summary[key] = [value]
         
         try:
-            with pd.ExcelWriter(f"{self.report_location}\\final_report.xlsx") as writer:  
+            # pandas is only needed here, keep it out of application startup
+            import pandas as pd
+            with pd.ExcelWriter(os.path.join(self.report_location, "final_report.xlsx")) as writer:  
                 pd.DataFrame.from_dict(summary).to_excel(writer, sheet_name='summary', index=False)
-                raw_data.to_excel(writer, sheet_name='raw_data', index=False)
+                if include_raw_data:
+                    self.write_raw_data(writer)
         except:
             print("Unable to produce summary report", sys.exc_info())
-        
-        
-                
-        
\ No newline at end of file
@@ -0,0 +1,160 @@
+import csv
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+def format_row(row):
+    # Landmark positions arrive as numpy arrays and are written as lists, like before
+    return [value.tolist() if isinstance(value, np.ndarray) else value for value in row]
+
+class ReportWriter(threading.Thread):
+    # Default values
+    DEFAULT_QUEUE_SIZE = int(2048)         #Max rows waiting to be written before write_row blocks
+    DEFAULT_FLUSH_ROWS = int(20)           #Flush after this many rows...
+    DEFAULT_FLUSH_INTERVAL = float(1.0)    #...or after this many seconds, whichever comes first
+    PUT_TIMEOUT = 0.5                      #In seconds, how often a blocked write_row checks the I/O thread is still alive
+
+    # Sentinel used to ask the I/O thread to drain and stop
+    _STOP = object()
+
+    def __init__(self, file_path, queue_size=DEFAULT_QUEUE_SIZE, flush_rows=DEFAULT_FLUSH_ROWS, flush_interval=DEFAULT_FLUSH_INTERVAL, chunked_writer=None) -> None:
+        super().__init__(daemon=True)
+        self.file_path = file_path
+        # Rotated report (Utils/ReportChunks.py), written instead of file_path. Its owner closes it once this thread is done
+        self.chunked_writer = chunked_writer
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.rows = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.closed = False
+        self.close_lock = threading.Lock()
+
+        # Stats
+        self.stats_lock = threading.Lock()
+        self.rows_written = 0
+        self.rows_dropped = 0   #Rows of batches that could not be written
+        self.flush_count = 0
+        self.max_queue_depth = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    def submit(self, task):
+        # Run a callable on the I/O thread, in order with the queued rows. Returns False once closed
+        return self.write_row(task)
+
+    def write_row(self, row):
+        # Blocks only if the I/O thread is more than queue_size rows behind. Returns False once closed, or if the
+        # I/O thread died: the caller then writes the row itself
+        with self.close_lock:
+            if self.closed or not self.is_alive():
+                return False
+            while True:
+                try:
+                    self.rows.put(row, timeout=self.PUT_TIMEOUT)
+                    break
+                except queue.Full:
+                    if not self.is_alive():
+                        return False
+        depth = self.rows.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    def close(self):
+        # Drain every queued row to disk and stop the I/O thread
+        with self.close_lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.is_alive():
+                self.rows.put(self._STOP)
+        self.join()
+        # Left behind only if the I/O thread died
+        while True:
+            try:
+                row = self.rows.get_nowait()
+            except queue.Empty:
+                break
+            if callable(row):
+                self.run_task(row)
+            elif row is not self._STOP:
+                with self.stats_lock:
+                    self.rows_dropped += 1
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {
+                'queue_depth': self.rows.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'rows_written': self.rows_written,
+                'rows_dropped': self.rows_dropped,
+                'flush_count': self.flush_count,
+                'last_flush_latency': self.last_flush_latency,
+                'max_flush_latency': self.max_flush_latency,
+                'avg_flush_latency': (self.total_flush_latency / self.flush_count) if self.flush_count else 0.0
+            }
+
+    def run(self):
+        try:
+            if self.chunked_writer is not None:
+                self.write_rows(self.chunked_writer, self.chunked_writer)
+                return
+            with(open(file=self.file_path, mode='a', newline='')) as data_file:
+                self.write_rows(data_file, csv.writer(data_file))
+        except:
+            print("Report writer stopped: ", sys.exc_info())
+
+    def write_rows(self, data_file, writer):
+        pending = []
+        last_flush_time = time.monotonic()
+        while True:
+            timeout = self.flush_interval - (time.monotonic() - last_flush_time)
+            try:
+                row = self.rows.get(timeout=max(0.001, timeout))
+            except queue.Empty:
+                row = None
+
+            if row is self._STOP:
+                self.flush(data_file, writer, pending)
+                break
+            if callable(row):
+                self.run_task(row)
+            elif row is not None:
+                pending.append(row)
+
+            if len(pending) >= self.flush_rows or (time.monotonic() - last_flush_time) >= self.flush_interval:
+                self.flush(data_file, writer, pending)
+                pending = []
+                last_flush_time = time.monotonic()
+
+    def run_task(self, task):
+        try:
+            task()
+        except:
+            print("Unable to run report task: ", sys.exc_info())
+
+    def flush(self, data_file, writer, pending):
+        if not pending:
+            return
+        start_time = time.perf_counter()
+        try:
+            writer.writerows(format_row(row) for row in pending)
+            data_file.flush()
+        except:
+            # Not retried: part of the batch may already be in the file. Counted, so the summary shows the gap
+            print(f"Unable to write to report, {len(pending)} rows dropped: ", sys.exc_info())
+            with self.stats_lock:
+                self.rows_dropped += len(pending)
+            return
+        latency = time.perf_counter() - start_time
+
+        with self.stats_lock:
+            self.rows_written += len(pending)
+            self.flush_count += 1
+            self.last_flush_latency = latency
+            self.total_flush_latency += latency
+            if latency > self.max_flush_latency:
+                self.max_flush_latency = latency
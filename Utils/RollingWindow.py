@@ -0,0 +1,73 @@
+import numpy as np
+
+class RollingWindow:
+    # Time-based rolling window over a preallocated circular buffer.
+    # Samples older than window_size seconds (relative to the newest sample) are evicted,
+    # and a running sum keeps sum()/mean() constant time whatever the window length or frame rate
+    DEFAULT_CAPACITY = int(1024)
+
+    def __init__(self, window_size, capacity=DEFAULT_CAPACITY) -> None:
+        self.window_size = float(window_size)
+        self.timestamps = np.zeros(max(1, int(capacity)), dtype=np.float64)
+        self.values = np.zeros(max(1, int(capacity)), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self.head = 0   # Index of the oldest sample
+        self.count = 0
+        self.total = 0.0
+        self.first_timestamp = None
+
+    def push(self, timestamp, value):
+        cutoff = timestamp - self.window_size
+        capacity = self.timestamps.shape[0]
+        # Each sample is evicted at most once, so this loop is amortised O(1) per push
+        while self.count and self.timestamps[self.head] <= cutoff:
+            self.total -= self.values[self.head]
+            self.head = (self.head + 1) % capacity
+            self.count -= 1
+        if self.count == 0:
+            # Nothing left to subtract from, drop any accumulated rounding error
+            self.total = 0.0
+
+        if self.count == capacity:
+            self.grow()
+            capacity = self.timestamps.shape[0]
+
+        tail = (self.head + self.count) % capacity
+        self.timestamps[tail] = timestamp
+        self.values[tail] = value
+        self.count += 1
+        self.total += value
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+
+    def grow(self):
+        # Only happens if the frame rate exceeds what the capacity was sized for
+        order = (self.head + np.arange(self.count)) % self.timestamps.shape[0]
+        capacity = self.timestamps.shape[0] * 2
+        timestamps = np.zeros(capacity, dtype=np.float64)
+        values = np.zeros(capacity, dtype=np.float64)
+        timestamps[:self.count] = self.timestamps[order]
+        values[:self.count] = self.values[order]
+        self.timestamps = timestamps
+        self.values = values
+        self.head = 0
+
+    def sum(self):
+        return self.total
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def __len__(self):
+        return self.count
+
+    def is_ready(self, timestamp):
+        # True once samples span a whole window
+        return self.first_timestamp is not None and (timestamp - self.first_timestamp) >= self.window_size
+
+    @classmethod
+    def for_rate(cls, window_size, rate):
+        # Size the buffer for window_size seconds at rate samples per second, with headroom for jitter
+        return cls(window_size, capacity=int(window_size * rate * 2) + 1)
@@ -0,0 +1,133 @@
+import math
+
+class P2Quantile:
+    # Streaming quantile estimate using the P-square algorithm (Jain & Chlamtac, 1985).
+    # Keeps five markers, so memory and update cost are constant no matter how many values are seen
+    def __init__(self, quantile) -> None:
+        self.quantile = float(quantile)
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired_positions = [1, 1 + 2 * self.quantile, 1 + 4 * self.quantile, 3 + 2 * self.quantile, 5]
+        self.increments = [0, self.quantile / 2, self.quantile, (1 + self.quantile) / 2, 1]
+
+    def update(self, value):
+        if len(self.heights) < 5:
+            self.heights.append(value)
+            self.heights.sort()
+            return
+
+        heights = self.heights
+        positions = self.positions
+        # Find the cell the new value falls in, extending the extremes if needed
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired_positions[i] += self.increments[i]
+
+        # Adjust the three middle markers
+        for i in range(1, 4):
+            offset = self.desired_positions[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = self.parabolic(i, step)
+                if not (heights[i - 1] < height < heights[i + 1]):
+                    height = self.linear(i, step)
+                heights[i] = height
+                positions[i] += step
+
+    def parabolic(self, i, step):
+        h = self.heights
+        n = self.positions
+        return h[i] + step / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i]) + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1]))
+
+    def linear(self, i, step):
+        h = self.heights
+        n = self.positions
+        return h[i] + step * (h[i + step] - h[i]) / (n[i + step] - n[i])
+
+    def value(self):
+        if not self.heights:
+            return math.nan
+        if len(self.heights) < 5:
+            # Too few values for the markers, use the exact quantile of what we have
+            index = self.quantile * (len(self.heights) - 1)
+            low = int(math.floor(index))
+            high = min(low + 1, len(self.heights) - 1)
+            return self.heights[low] + (self.heights[high] - self.heights[low]) * (index - low)
+        return self.heights[2]
+
+class RunningStatistics:
+    # Default values
+    DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES) -> None:
+        self.quantiles = tuple(quantiles)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.nan
+        self.max = math.nan
+        self.sketches = {quantile: P2Quantile(quantile) for quantile in self.quantiles}
+
+    def update(self, value):
+        # Ignores missing values ("NaN" strings, None, NaN) like dropna does
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        if math.isnan(value):
+            return
+
+        # Welford's online mean/variance
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.count == 1:
+            self.min = value
+            self.max = value
+        else:
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+        for sketch in self.sketches.values():
+            sketch.update(value)
+
+    def get_mean(self):
+        return self.mean if self.count else math.nan
+
+    def get_variance(self):
+        # Sample variance, same as pandas' default (ddof=1)
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    def get_std(self):
+        return math.sqrt(self.get_variance()) if self.count > 1 else math.nan
+
+    def get_quantile(self, quantile):
+        return self.sketches[quantile].value()
+
+    def as_dict(self, prefix):
+        ans = {}
+        ans[f"{prefix}_count"] = self.count
+        ans[f"{prefix}_mean"] = self.get_mean()
+        ans[f"{prefix}_std"] = self.get_std()
+        ans[f"{prefix}_min"] = self.min
+        ans[f"{prefix}_max"] = self.max
+        for quantile in self.quantiles:
+            ans[f"{prefix}_p{int(round(quantile * 100)):02d}"] = self.get_quantile(quantile)
+        return ans
@@ -0,0 +1,15 @@
+import threading
+import time
+
+# Startup milestones, relative to the moment this module is first imported (main.py imports it before anything heavy).
+# Each milestone is printed once per run
+start_time = time.perf_counter()
+logged_events = set()
+lock = threading.Lock()
+
+def log_event(name):
+    with lock:
+        if name in logged_events:
+            return
+        logged_events.add(name)
+    print(f"Startup: {name} after {time.perf_counter() - start_time:.2f} s")
@@ -3,7 +3,9 @@ from PyQt6.QtWidgets import (
     QDialogButtonBox,
     QVBoxLayout,
     QLineEdit,
-    QLabel
+    QLabel,
+    QCheckBox,
+    QComboBox
 )
 
 from PyQt6.QtGui import (
@@ -15,6 +17,26 @@ from PyQt6.QtGui import (
 from Model.CaptureConfig import CaptureConfig
 
 class AdvancedConfigurationModal(QDialog):
+    OVERLAY_MODE_NAMES = {
+        "pixels": "Drawn on the video",
+        "widgets": "Drawn by the interface (faster)",
+        "off": "None (fastest)"
+    }
+    FRAME_SOURCE_NAMES = {
+        "camera": "Camera",
+        "video": "Video file (replay)",
+        "images": "Image directory (replay)",
+        "synthetic": "Synthetic frames"
+    }
+    PRIMARY_FACE_POLICY_NAMES = {
+        "persistent": "Participant: face tracked for longest",
+        "largest": "Participant: largest face"
+    }
+    FRAME_SOURCE_PACING_NAMES = {
+        "realtime": "Real time",
+        "fast": "As fast as possible"
+    }
+    
     def __init__(self, parent, config = CaptureConfig):
         super().__init__(parent)
         self.config = config
@@ -72,6 +94,79 @@ class AdvancedConfigurationModal(QDialog):
         self.fps_input.setValidator(QIntValidator(bottom=1))
         self.fps_input.setText(str(self.config.fps))
         
+        self.record_raw_video_input = QCheckBox("Record raw video during trials", parent=self)
+        self.record_raw_video_input.setFont(QFont('Arial font', 10))
+        self.record_raw_video_input.setChecked(self.config.record_raw_video)
+        
+        self.analysis_process_input = QCheckBox("Run face analysis in a separate process", parent=self)
+        self.analysis_process_input.setFont(QFont('Arial font', 10))
+        self.analysis_process_input.setChecked(self.config.analysis_mode == "process")
+        
+        self.latest_frame_input = QCheckBox("Always analyse the latest frame (drop stale frames)", parent=self)
+        self.latest_frame_input.setFont(QFont('Arial font', 10))
+        self.latest_frame_input.setChecked(self.config.frame_handoff == "latest")
+        
+        self.adaptive_frame_skipping_input = QCheckBox("Skip frames when analysis cannot keep up", parent=self)
+        self.adaptive_frame_skipping_input.setFont(QFont('Arial font', 10))
+        self.adaptive_frame_skipping_input.setChecked(self.config.adaptive_frame_skipping)
+        
+        analysis_rate_label = QLabel("Min / Max Analysed Frames per Second")
+        analysis_rate_label.setFont(QFont('Arial font', 10))
+        self.min_analysis_rate_input = QLineEdit(parent=self)
+        self.min_analysis_rate_input.setValidator(QDoubleValidator(bottom=0.1, decimals=2))
+        self.min_analysis_rate_input.setText(str(self.config.min_analysis_rate))
+        self.max_analysis_rate_input = QLineEdit(parent=self)
+        self.max_analysis_rate_input.setValidator(QDoubleValidator(bottom=0.1, decimals=2))
+        self.max_analysis_rate_input.setText(str(self.config.max_analysis_rate))
+        
+        analysis_resolution_label = QLabel("Analysis Resolution (px, 0 = camera resolution)")
+        analysis_resolution_label.setFont(QFont('Arial font', 10))
+        self.analysis_resolution_input = QLineEdit(parent=self)
+        self.analysis_resolution_input.setValidator(QIntValidator(bottom=0))
+        self.analysis_resolution_input.setText(str(self.config.analysis_resolution))
+        
+        self.face_roi_cropping_input = QCheckBox("Only analyse the region around the face", parent=self)
+        self.face_roi_cropping_input.setFont(QFont('Arial font', 10))
+        self.face_roi_cropping_input.setChecked(self.config.face_roi_cropping)
+        
+        max_faces_label = QLabel("Faces Tracked per Frame")
+        max_faces_label.setFont(QFont('Arial font', 10))
+        self.max_faces_input = QLineEdit(parent=self)
+        self.max_faces_input.setValidator(QIntValidator(bottom=1, top=10))
+        self.max_faces_input.setText(str(self.config.max_faces))
+        self.primary_face_policy_input = QComboBox(parent=self)
+        for primary_face_policy in CaptureConfig.PRIMARY_FACE_POLICIES:
+            self.primary_face_policy_input.addItem(self.PRIMARY_FACE_POLICY_NAMES[primary_face_policy], primary_face_policy)
+        self.primary_face_policy_input.setCurrentIndex(CaptureConfig.PRIMARY_FACE_POLICIES.index(self.config.primary_face_policy))
+        
+        self.show_stats_panel_input = QCheckBox("Show pipeline timings next to the video", parent=self)
+        self.show_stats_panel_input.setFont(QFont('Arial font', 10))
+        self.show_stats_panel_input.setChecked(self.config.show_stats_panel)
+        
+        frame_source_label = QLabel("Frame source")
+        frame_source_label.setFont(QFont('Arial font', 10))
+        self.frame_source_input = QComboBox(parent=self)
+        for frame_source in CaptureConfig.FRAME_SOURCES:
+            self.frame_source_input.addItem(self.FRAME_SOURCE_NAMES[frame_source], frame_source)
+        self.frame_source_input.setCurrentIndex(CaptureConfig.FRAME_SOURCES.index(self.config.frame_source))
+        self.frame_source_path_input = QLineEdit(parent=self)
+        self.frame_source_path_input.setPlaceholderText("Video file or image directory to replay")
+        self.frame_source_path_input.setText(self.config.frame_source_path)
+        self.frame_source_pacing_input = QComboBox(parent=self)
+        for frame_source_pacing in CaptureConfig.FRAME_SOURCE_PACINGS:
+            self.frame_source_pacing_input.addItem(self.FRAME_SOURCE_PACING_NAMES[frame_source_pacing], frame_source_pacing)
+        self.frame_source_pacing_input.setCurrentIndex(CaptureConfig.FRAME_SOURCE_PACINGS.index(self.config.frame_source_pacing))
+        self.frame_source_loop_input = QCheckBox("Loop the replay", parent=self)
+        self.frame_source_loop_input.setFont(QFont('Arial font', 10))
+        self.frame_source_loop_input.setChecked(self.config.frame_source_loop)
+        
+        overlay_mode_label = QLabel("Analysis overlay")
+        overlay_mode_label.setFont(QFont('Arial font', 10))
+        self.overlay_mode_input = QComboBox(parent=self)
+        for overlay_mode in CaptureConfig.OVERLAY_MODES:
+            self.overlay_mode_input.addItem(self.OVERLAY_MODE_NAMES[overlay_mode], overlay_mode)
+        self.overlay_mode_input.setCurrentIndex(CaptureConfig.OVERLAY_MODES.index(self.config.overlay_mode))
+        
         
         layout = QVBoxLayout()
         layout.addWidget(perclos_high_threshold_label)
@@ -88,6 +183,27 @@ class AdvancedConfigurationModal(QDialog):
         layout.addWidget(self.blink_window_size_input)
         layout.addWidget(fps_label)
         layout.addWidget(self.fps_input)
+        layout.addWidget(self.record_raw_video_input)
+        layout.addWidget(self.analysis_process_input)
+        layout.addWidget(self.latest_frame_input)
+        layout.addWidget(self.adaptive_frame_skipping_input)
+        layout.addWidget(analysis_rate_label)
+        layout.addWidget(self.min_analysis_rate_input)
+        layout.addWidget(self.max_analysis_rate_input)
+        layout.addWidget(analysis_resolution_label)
+        layout.addWidget(self.analysis_resolution_input)
+        layout.addWidget(self.face_roi_cropping_input)
+        layout.addWidget(max_faces_label)
+        layout.addWidget(self.max_faces_input)
+        layout.addWidget(self.primary_face_policy_input)
+        layout.addWidget(self.show_stats_panel_input)
+        layout.addWidget(frame_source_label)
+        layout.addWidget(self.frame_source_input)
+        layout.addWidget(self.frame_source_path_input)
+        layout.addWidget(self.frame_source_pacing_input)
+        layout.addWidget(self.frame_source_loop_input)
+        layout.addWidget(overlay_mode_label)
+        layout.addWidget(self.overlay_mode_input)
         
         layout.addWidget(self.buttonBox)
         self.setLayout(layout)
@@ -101,6 +217,22 @@ class AdvancedConfigurationModal(QDialog):
         self.blink_detection_threshold_input.setText(str(self.config.blink_detection_threshold))
         self.blink_window_size_input.setText(str(self.config.blink_window_size))
         self.fps_input.setText(str(self.config.fps))
+        self.record_raw_video_input.setChecked(self.config.record_raw_video)
+        self.analysis_process_input.setChecked(self.config.analysis_mode == "process")
+        self.latest_frame_input.setChecked(self.config.frame_handoff == "latest")
+        self.overlay_mode_input.setCurrentIndex(CaptureConfig.OVERLAY_MODES.index(self.config.overlay_mode))
+        self.analysis_resolution_input.setText(str(self.config.analysis_resolution))
+        self.face_roi_cropping_input.setChecked(self.config.face_roi_cropping)
+        self.max_faces_input.setText(str(self.config.max_faces))
+        self.primary_face_policy_input.setCurrentIndex(CaptureConfig.PRIMARY_FACE_POLICIES.index(self.config.primary_face_policy))
+        self.adaptive_frame_skipping_input.setChecked(self.config.adaptive_frame_skipping)
+        self.show_stats_panel_input.setChecked(self.config.show_stats_panel)
+        self.frame_source_input.setCurrentIndex(CaptureConfig.FRAME_SOURCES.index(self.config.frame_source))
+        self.frame_source_path_input.setText(self.config.frame_source_path)
+        self.frame_source_pacing_input.setCurrentIndex(CaptureConfig.FRAME_SOURCE_PACINGS.index(self.config.frame_source_pacing))
+        self.frame_source_loop_input.setChecked(self.config.frame_source_loop)
+        self.min_analysis_rate_input.setText(str(self.config.min_analysis_rate))
+        self.max_analysis_rate_input.setText(str(self.config.max_analysis_rate))
         
     def save_config(self):
         self.config.set_perclos_high_threshold(self.perclos_high_threshold_input.text())
@@ -110,5 +242,21 @@ class AdvancedConfigurationModal(QDialog):
         self.config.set_blink_detection_threshold(self.blink_detection_threshold_input.text())
         self.config.set_blink_window_size(self.blink_window_size_input.text())
         self.config.set_fps(self.fps_input.text())
+        self.config.set_record_raw_video(self.record_raw_video_input.isChecked())
+        self.config.set_analysis_mode("process" if self.analysis_process_input.isChecked() else "thread")
+        self.config.set_frame_handoff("latest" if self.latest_frame_input.isChecked() else "fifo")
+        self.config.set_overlay_mode(self.overlay_mode_input.currentData())
+        self.config.set_analysis_resolution(self.analysis_resolution_input.text() or 0)
+        self.config.set_face_roi_cropping(self.face_roi_cropping_input.isChecked())
+        self.config.set_max_faces(self.max_faces_input.text() or CaptureConfig.DEFAULT_MAX_FACES)
+        self.config.set_primary_face_policy(self.primary_face_policy_input.currentData())
+        self.config.set_adaptive_frame_skipping(self.adaptive_frame_skipping_input.isChecked())
+        self.config.set_show_stats_panel(self.show_stats_panel_input.isChecked())
+        self.config.set_frame_source(self.frame_source_input.currentData())
+        self.config.set_frame_source_path(self.frame_source_path_input.text().strip())
+        self.config.set_frame_source_pacing(self.frame_source_pacing_input.currentData())
+        self.config.set_frame_source_loop(self.frame_source_loop_input.isChecked())
+        self.config.set_min_analysis_rate(self.min_analysis_rate_input.text() or CaptureConfig.DEFAULT_MIN_ANALYSIS_RATE)
+        self.config.set_max_analysis_rate(self.max_analysis_rate_input.text() or CaptureConfig.DEFAULT_MAX_ANALYSIS_RATE)
         self.accept()
         
\ No newline at end of file
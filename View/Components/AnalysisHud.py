@@ -0,0 +1,85 @@
+from PyQt6.QtWidgets import (
+    QWidget,
+    QLabel,
+    QVBoxLayout
+)
+
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt
+
+class AnalysisHud(QWidget):
+    # Analysis HUD drawn by Qt over the preview (CaptureConfig.overlay_mode == "widgets"), instead of
+    # cv.putText on every analysed frame. Fed with FrameAnalyzer.build_hud() values at preview rate,
+    # and a label is only touched when its text or colour changed
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: transparent;")
+
+        self.perclos_label = self.build_label()
+        self.blinks_label = self.build_label()
+        self.blink_duration_label = self.build_label()
+        self.eye_opening_label = self.build_label()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(2)
+        layout.addWidget(self.perclos_label)
+        layout.addWidget(self.blinks_label)
+        layout.addWidget(self.blink_duration_label)
+        layout.addWidget(self.eye_opening_label)
+        self.setLayout(layout)
+
+        # (text, colour) currently shown by each label
+        self.shown = {}
+        self.hide()
+
+    def build_label(self):
+        label = QLabel(parent=self)
+        label.setFont(QFont('Arial font', 12, QFont.Weight.Bold))
+        return label
+
+    def set_label(self, label, text, color):
+        if text is None:
+            if label.isVisible():
+                label.hide()
+                return True
+            return False
+        changed = self.shown.get(label) != (text, color)
+        if changed:
+            self.shown[label] = (text, color)
+            label.setText(text)
+            label.setStyleSheet(f"color: rgb({color[0]}, {color[1]}, {color[2]});")
+        if not label.isVisible():
+            label.show()
+            changed = True
+        return changed
+
+    def update_values(self, hud):
+        # hud is None while no single face is found, or when the frame does not come from the analyzer
+        if hud is None:
+            if self.isVisible():
+                self.hide()
+            return
+
+        perclos_text = None
+        if hud['perclos'] is not None:
+            perclos_text = f"Perclos ({hud['perclos_window_size']} seconds) : {hud['perclos']:2.2f}%"
+        blinks_text = None
+        if hud['blinks'] is not None:
+            blinks_text = f"Blinks in last {hud['blink_window_size']} seconds : {hud['blinks']}"
+
+        changed = self.set_label(self.perclos_label, perclos_text, hud['perclos_color'])
+        changed |= self.set_label(self.blinks_label, blinks_text, hud['blinks_color'])
+        changed |= self.set_label(self.blink_duration_label, f"Last Blink Duration (s) : {hud['last_blink_duration']:2.2f}s", (0, 0, 0))
+
+        left_eye_opening = hud['left_eye_opening']
+        right_eye_opening = hud['right_eye_opening']
+        changed |= self.set_label(self.eye_opening_label, f"Eye opening : left {left_eye_opening:2.2f}, right {right_eye_opening:2.2f}",
+                       (255, 0, 0) if min(left_eye_opening, right_eye_opening) <= 0.5 else (255, 255, 255))
+
+        if changed:
+            self.adjustSize()
+        if not self.isVisible():
+            self.show()
+            self.raise_()
@@ -14,13 +14,14 @@ from PyQt6.QtGui import (
     QFont
 )
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
 
 from View.Components.AdvancedConfigurationModal import AdvancedConfigurationModal
 from Model.CaptureConfig import CaptureConfig
 import Utils.CameraDetector as cam_detector
 
 import os
+import sys
 
 class CaptureConfiguration(QWidget):
     def __init__(self, navigation_handler, configuration_handler) -> None:
@@ -28,18 +29,25 @@ class CaptureConfiguration(QWidget):
         self.navigation_handler = navigation_handler
         self.configuration_handler = configuration_handler
         
-        self.available_cameras = cam_detector.find_cameras()
+        # Cameras found on the last launch are shown right away, detection refreshes them in the background
+        self.available_cameras = cam_detector.get_cached_cameras()
         
         self.layout = QVBoxLayout()
         self.buttons = QHBoxLayout()
         self.create_buttons()
         
         self.config = CaptureConfig()
+        # The frame rate the user asked for, config.fps holds it capped to the selected camera mode
+        self.requested_fps = self.config.fps
         
         # align layout itself
         self.build_layout()
         self.layout.setAlignment(Qt.AlignmentFlag.AlignCenter) 
         self.setLayout(self.layout)
+        
+        self.camera_detection = CaptureConfiguration.CameraDetection()
+        self.camera_detection.cameras_detected.connect(self.update_cameras)
+        self.camera_detection.start()
     
     def navigate_back(self):
         self.config.reset()
@@ -70,15 +78,29 @@ class CaptureConfiguration(QWidget):
         camera_selection_label = QLabel("Select the camera to be used in the capture")
         camera_selection_label.setFont(QFont('Arial font', 10))
         
-        camera_selection = QComboBox()
-        camera_selection.addItem("None")
-        camera_selection.addItems(list(self.available_cameras.values()))
-        camera_selection.currentTextChanged.connect(self.camera_selection)
+        self.camera_selection_input = QComboBox()
+        self.fill_camera_selection()
+        self.camera_selection_input.currentIndexChanged.connect(self.camera_selection)
+        
+        camera_mode_label = QLabel("Camera mode")
+        camera_mode_label.setFont(QFont('Arial font', 10))
+        self.camera_mode_input = QComboBox()
+        self.camera_mode_input.currentIndexChanged.connect(self.camera_mode_selection)
+        self.fill_camera_modes(None)
         
         participant_id_label = QLabel("Participant ID")
         participant_id_label.setFont(QFont('Arial font', 10))
         self.participant_id_input = QLineEdit(parent=self)
         
+        # Group sessions: one more camera and participant per row, each captured and reported separately
+        additional_participants_label = QLabel("Additional participants (group session)")
+        additional_participants_label.setFont(QFont('Arial font', 10))
+        self.participant_rows = []
+        self.participant_rows_layout = QVBoxLayout()
+        self.add_participant_button = QPushButton("Add participant")
+        self.add_participant_button.adjustSize()
+        self.add_participant_button.clicked.connect(self.add_participant_row)
+        
         self.select_location_button = QPushButton("Select report location")
         self.select_location_button.adjustSize()
         self.select_location_button.clicked.connect(self.select_report_location)
@@ -86,20 +108,75 @@ class CaptureConfiguration(QWidget):
         # align layout elements
         self.layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignCenter)
         self.layout.addWidget(camera_selection_label, alignment=Qt.AlignmentFlag.AlignCenter)
-        self.layout.addWidget(camera_selection, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.camera_selection_input, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(camera_mode_label, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.camera_mode_input, alignment=Qt.AlignmentFlag.AlignCenter)
         self.layout.addWidget(participant_id_label, alignment=Qt.AlignmentFlag.AlignCenter)
         self.layout.addWidget(self.participant_id_input, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(additional_participants_label, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.layout.addLayout(self.participant_rows_layout)
+        self.layout.addWidget(self.add_participant_button, alignment=Qt.AlignmentFlag.AlignCenter)
         self.layout.addWidget(self.select_location_button, alignment=Qt.AlignmentFlag.AlignCenter)
         self.layout.addLayout(self.buttons)
         
+    def add_participant_row(self):
+        row = QWidget(parent=self)
+        row_layout = QHBoxLayout()
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        camera_input = QComboBox(parent=row)
+        self.fill_camera_combo(camera_input)
+        participant_id_input = QLineEdit(parent=row)
+        participant_id_input.setPlaceholderText("Participant ID")
+        remove_button = QPushButton("Remove", parent=row)
+        row_layout.addWidget(camera_input)
+        row_layout.addWidget(participant_id_input)
+        row_layout.addWidget(remove_button)
+        row.setLayout(row_layout)
+        
+        participant_row = (row, camera_input, participant_id_input)
+        remove_button.clicked.connect(lambda: self.remove_participant_row(participant_row))
+        self.participant_rows.append(participant_row)
+        self.participant_rows_layout.addWidget(row, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.add_participant_button.setEnabled(len(self.participant_rows) + 1 < CaptureConfig.MAX_PARTICIPANTS)
+        
+    def remove_participant_row(self, participant_row):
+        self.participant_rows.remove(participant_row)
+        participant_row[0].deleteLater()
+        self.add_participant_button.setEnabled(True)
+        
+    def fill_camera_combo(self, combo):
+        selected = combo.currentData()
+        combo.blockSignals(True)
+        combo.clear()
+        for camera in self.available_cameras:
+            combo.addItem(camera['name'], camera['identity'])
+        combo.setCurrentIndex(max(0, combo.findData(selected)))
+        combo.blockSignals(False)
+        
+    def camera_index(self, identity):
+        for camera in self.available_cameras:
+            if camera['identity'] == identity:
+                return camera['index']
+        return None
+        
     def create_config(self):
         participant_id = self.participant_id_input.text()
-        if not participant_id:
+        additional_participants = [(self.camera_index(camera_input.currentData()), participant_id_input.text()) for _, camera_input, participant_id_input in self.participant_rows]
+        participant_ids = [participant_id] + [additional_participant_id for _, additional_participant_id in additional_participants]
+        cameras = [self.config.camera] + [camera for camera, _ in additional_participants]
+        if not all(participant_ids):
             QMessageBox.critical(self, "Invalid configuration", "Participant ID cannot be empty")
+        elif len(set(participant_ids)) != len(participant_ids):
+            QMessageBox.critical(self, "Invalid configuration", "Participant IDs must be different")
+        elif self.config.frame_source == "camera" and (None in cameras or len(set(cameras)) != len(cameras)):
+            QMessageBox.critical(self, "Invalid configuration", "Every participant needs a different camera")
         elif not self.config.report_directory:
             QMessageBox.critical(self, "Invalid configuration", "Please select a report location")
         else:
             self.config.set_participant_id(participant_id)
+            self.config.clear_additional_participants()
+            for camera, additional_participant_id in additional_participants:
+                self.config.add_participant(camera, additional_participant_id)
             self.configuration_handler(self.config)
         
     def select_report_location(self):
@@ -108,24 +185,87 @@ class CaptureConfiguration(QWidget):
         self.select_location_button.setText(self.config.report_directory)
         self.select_location_button.adjustSize()
         
-    def camera_selection(self, camera):
-        if(camera != "None"):
-            self.config.set_camera(self.camera_index(camera))
-            self.start_button.setEnabled(True)
-        else:
-            self.start_button.setEnabled(False)
+    def fill_camera_selection(self):
+        selected = self.camera_selection_input.currentData()
+        self.camera_selection_input.blockSignals(True)
+        self.camera_selection_input.clear()
+        self.camera_selection_input.addItem("None", None)
+        for camera in self.available_cameras:
+            self.camera_selection_input.addItem(camera['name'], camera['identity'])
+        position = self.camera_selection_input.findData(selected)
+        self.camera_selection_input.setCurrentIndex(max(0, position))
+        self.camera_selection_input.blockSignals(False)
+        self.camera_selection(self.camera_selection_input.currentIndex())
+        
+    def update_cameras(self, cameras):
+        self.available_cameras = cameras
+        self.fill_camera_selection()
+        for _, camera_input, _ in self.participant_rows:
+            self.fill_camera_combo(camera_input)
+        
+    def selected_camera(self):
+        identity = self.camera_selection_input.currentData()
+        for camera in self.available_cameras:
+            if camera['identity'] == identity:
+                return camera
+        return None
+        
+    def camera_selection(self, position):
+        camera = self.selected_camera()
+        if camera is not None:
+            self.config.set_camera(camera['index'])
+        # Replayed and synthetic frames need no camera
+        self.start_button.setEnabled(camera is not None or self.config.frame_source != "camera")
+        self.fill_camera_modes(camera)
             
-    def camera_index(self, camera_name: str):
-        # list out keys and values separately
-        key_list = list(self.available_cameras.keys())
-        val_list = list(self.available_cameras.values())
-
-        position = val_list.index(camera_name)
-        return key_list[position]
+    def fill_camera_modes(self, camera):
+        # Only modes reported by the camera are offered, plus the driver default
+        selected = self.camera_mode_input.currentData()
+        self.camera_mode_input.blockSignals(True)
+        self.camera_mode_input.clear()
+        self.camera_mode_input.addItem("Driver default", None)
+        if camera is not None:
+            for mode in camera['modes']:
+                if mode['fourcc'] not in CaptureConfig.CAPTURE_FOURCCS:
+                    continue
+                self.camera_mode_input.addItem(f"{mode['width']}x{mode['height']} @ {mode['fps']:g} fps ({mode['fourcc']})", mode)
+        position = self.camera_mode_input.findData(selected)
+        self.camera_mode_input.setCurrentIndex(max(0, position))
+        self.camera_mode_input.blockSignals(False)
+        self.camera_mode_selection(self.camera_mode_input.currentIndex())
+        
+    def camera_mode_selection(self, position):
+        mode = self.camera_mode_input.currentData()
+        if mode is None:
+            self.config.set_capture_resolution(CaptureConfig.DEFAULT_CAPTURE_WIDTH, CaptureConfig.DEFAULT_CAPTURE_HEIGHT)
+            self.config.set_capture_fourcc(CaptureConfig.DEFAULT_CAPTURE_FOURCC)
+            self.config.set_fps(self.requested_fps)
+            return
+        self.config.set_capture_resolution(mode['width'], mode['height'])
+        self.config.set_capture_fourcc(mode['fourcc'])
+        # Never ask for more frames than the camera delivers in this mode. Capped from the requested rate, so a faster mode
+        # selected afterwards gets it back
+        self.config.set_fps(min(self.requested_fps, max(1, int(mode['fps']))))
     
     def advanced_configurations(self):
+        # The modal shows and edits the requested frame rate, not the one capped to the camera mode
+        self.config.set_fps(self.requested_fps)
         modal = AdvancedConfigurationModal(parent=self, config=self.config)
         modal.exec()
+        self.requested_fps = self.config.fps
+        self.camera_selection(self.camera_selection_input.currentIndex())
+        
+    class CameraDetection(QThread):
+        # Probes cameras off the GUI thread, the result is cached for the next launch
+        cameras_detected = pyqtSignal(object)
+        
+        def run(self):
+            try:
+                cameras = cam_detector.detect_cameras()
+            except:
+                print("Unable to detect cameras: ", sys.exc_info())
+                return
+            self.cameras_detected.emit(cameras)
         
         
             
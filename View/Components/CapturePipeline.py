@@ -0,0 +1,145 @@
+from PyQt6.QtWidgets import (
+    QWidget,
+    QLabel,
+    QVBoxLayout,
+    QSizePolicy
+)
+
+from PyQt6.QtGui import QPixmap, QFont
+from PyQt6.QtCore import Qt
+
+from Model.ImageConsumer import ImageConsumer
+from Model.ImageProducer import ImageProducer
+from Model.CaptureConfig import CaptureConfig
+from Model.FrameMailbox import create_frame_handoff
+from Utils.ReportGenerator import ReportGenerator
+from Utils.PipelineTimings import PipelineTimings
+
+from View.Components.AnalysisHud import AnalysisHud
+
+class CapturePipeline(QWidget):
+    # One participant of a capture session: its camera (ImageProducer), analysis (ImageConsumer), report and timings,
+    # shown as one preview tile. CaptureFeed runs one pipeline per participant, all driven by the same trial controls
+    def __init__(self, config: CaptureConfig, logger, parent=None) -> None:
+        super().__init__(parent)
+        self.config = config
+        self.logger = logger
+        self.name = f"P{self.config.participant_id}"
+
+        self.report_facade = ReportGenerator(self.config)
+        # Per-stage latencies, shared by the capture, analysis and preview threads and written per trial to timings.csv
+        self.timings = PipelineTimings()
+
+        self.caption = QLabel(self.name)
+        self.caption.setFont(QFont('Arial font', 10))
+        self.video_feed = QLabel()
+        # The label takes the free space and the preview is downscaled to fit it, off the GUI thread
+        self.video_feed.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.video_feed.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+        self.video_feed.setMinimumSize(320, 240)
+        # Drawn over the preview when overlay_mode is "widgets"
+        self.hud = AnalysisHud(parent=self.video_feed)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.caption, alignment=Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.video_feed, stretch=1)
+        self.setLayout(layout)
+
+        initial_queue = create_frame_handoff(self.config.frame_handoff, self.config.frame_queue_size)
+        self.producer = ImageProducer(config=self.config, queue_reference=initial_queue, timings=self.timings)
+        self.consumer = ImageConsumer(config=self.config, queue_reference=initial_queue, report_facade=self.report_facade, timings=self.timings)
+
+        self.consumer.image_update_signal.connect(self.update_video)
+        self.producer.image_collection.open_failed_signal.connect(self.source_failed)
+        self.dropped_at_trial_start = 0
+        self.exhausted_at_trial_start = 0
+        self.coalesced_at_trial_start = 0
+
+    def update_counters(self):
+        # Counters since the trial started (since the feed opened before the first trial)
+        self.timings.set_counter('frames_dropped', self.producer.queue.dropped - self.dropped_at_trial_start)
+        self.timings.set_counter('pool_exhausted', self.producer.get_pool_stats()['exhausted'] - self.exhausted_at_trial_start)
+        self.timings.set_counter('preview_coalesced', self.consumer.preview.frames_coalesced - self.coalesced_at_trial_start)
+        self.timings.set_counter('analysis_skipped', self.report_facade.skipped_frames)
+
+    def log_dropped_frames(self):
+        # The hand-off lives for the whole session, frames dropped during the trial are the difference
+        dropped = self.producer.queue.dropped - self.dropped_at_trial_start
+        if dropped:
+            print(f"{self.name}: frame hand-off ({self.config.frame_handoff}) dropped {dropped} frames")
+            self.logger.generic_log("frames dropped", f"{self.name} {self.config.frame_handoff}: {dropped}")
+
+    def update_video(self, frame, hud):
+        self.video_feed.setPixmap(QPixmap.fromImage(frame))
+        if self.config.overlay_mode == "widgets":
+            self.hud.update_values(hud)
+        # Lets the preview renderer send the next frame, frames arriving meanwhile are coalesced
+        self.consumer.preview_displayed()
+
+    def update_preview_size(self):
+        self.consumer.set_preview_size(self.video_feed.width(), self.video_feed.height())
+
+    def start_streaming(self):
+        # Does not wait for the source to open, so every pipeline's camera opens in parallel
+        self.producer.start_video_capture()
+        self.consumer.start_video_stream()
+
+    def source_failed(self, source):
+        self.logger.log_failure(f"{self.name}: {source} could not be opened")
+
+    def pause(self):
+        # Nobody sees the preview, stop converting frames (a running trial goes on)
+        if not self.consumer.is_analysing():
+            self.consumer.pause()
+
+    def resume(self):
+        if self.consumer.worker.isRunning() and not self.consumer.is_analysing():
+            self.consumer.start_video_stream()
+
+    def start_trial(self, condition):
+        self.config.set_condition(condition)
+        # Capture and the worker keep running, the trial starts with the next captured frame
+        self.dropped_at_trial_start = self.producer.queue.dropped
+        self.exhausted_at_trial_start = self.producer.get_pool_stats()['exhausted']
+        self.coalesced_at_trial_start = self.consumer.preview.frames_coalesced
+        self.timings.reset()
+        # A replay starts over with the trial, so every trial analyses the same frames
+        self.producer.hold_replay()
+        self.consumer.start_video_analysis()
+        self.producer.restart_replay()
+        if self.config.record_raw_video:
+            self.producer.start_recording(self.report_facade.report_location)
+
+    def stop_trial(self):
+        # First half of ending a trial, done for every pipeline before any waits, so all trials end together
+        self.stop_recording()
+        if self.producer.is_fast_replay():
+            # Nobody needs its frames until the next trial restarts it
+            self.producer.hold_replay()
+        self.trial_end = self.consumer.end_video_analysis(wait=False)
+
+    def finish_trial(self, trial_duration):
+        # Back to preview once every frame of the trial is in the report
+        self.consumer.wait_for_command(self.trial_end)
+        self.hud.update_values(None)
+
+        self.update_counters()
+        rates = self.timings.get_rates()
+        self.report_facade.generate_summary_report(trial_duration, rates=rates)
+        self.report_facade.write_timings(self.timings)
+        self.log_dropped_frames()
+        print(f"{self.name}: capture {rates['capture_fps']:.1f} FPS, analysis {rates['analysis_fps']:.1f} FPS")
+        self.logger.generic_log("pipeline fps", f"{self.name}: capture {rates['capture_fps']:.1f}, analysis {rates['analysis_fps']:.1f}, preview {rates['preview_fps']:.1f}")
+
+    def stop_recording(self):
+        recording_stats = self.producer.stop_recording()
+        if recording_stats is not None:
+            print(f"{self.name} raw video recording: ", recording_stats)
+            self.logger.generic_log("raw video recording", f"{self.name}: {recording_stats['frames_encoded']} frames encoded, {recording_stats['frames_dropped']} frames dropped")
+
+    def shutdown(self):
+        self.consumer.shutdown()
+        self.stop_recording()
+        self.producer.shutdown()
+        self.report_facade.close_data_report()
@@ -5,9 +5,11 @@ from PyQt6.QtWidgets import (
 
 from View.Components.InitialPage import InitialPage
 from View.Components.CaptureConfiguration import CaptureConfiguration
-from View.Components.CaptureFeed import CaptureFeed
+from PyQt6.QtCore import QTimer
 from Model.CaptureConfig import CaptureConfig
+from Model.FaceModelPrewarm import face_model_prewarm
 from Utils.Logger import Logger
+import Utils.StartupTimer as startup_timer
 
 class Container(QMainWindow):
     def __init__(self) -> None:
@@ -29,10 +31,19 @@ class Container(QMainWindow):
         
         self.showMaximized() 
         self.show()
+        # Runs once the event loop has painted the window
+        QTimer.singleShot(0, self.first_window_shown)
+        
+    def first_window_shown(self):
+        startup_timer.log_event("first window")
+        # Build the face model while the user fills in the configuration
+        face_model_prewarm.start()
         
     def navigate(self, page: str):
         if(page == "configuration"):
             self.stacked.setCurrentWidget(self.configuration_page)
+            # The previous session used the pre-warmed model, prepare one for the next session
+            face_model_prewarm.start()
         elif(page == "video_feed"):
             self.stacked.setCurrentWidget(self.video_feed)
         elif(page == "initial"):
@@ -43,6 +54,8 @@ class Container(QMainWindow):
         self.start_capture()
         
     def start_capture(self):
+        # CaptureFeed pulls in OpenCV and the analysis pipeline, loaded only once a capture starts
+        from View.Components.CaptureFeed import CaptureFeed
         self.logger = Logger(self.config.report_directory, self.config.participant_id)
         self.video_feed = CaptureFeed(navigation_handler=self.navigate, capture_config=self.config, logger=self.logger)
         self.stacked.addWidget(self.video_feed)
@@ -0,0 +1,38 @@
+from PyQt6.QtWidgets import QLabel
+
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import QTimer
+
+class StatsPanel(QLabel):
+    # Live per-stage latencies (p50/p95/p99), frame rates and pipeline counters of every capture pipeline
+    # (View/Components/CapturePipeline.py), shown next to the video feed when CaptureConfig.show_stats_panel is set.
+    # Refreshed by a timer on the GUI thread, so the pipeline threads never wait on it
+    REFRESH_INTERVAL = 1000     #In milliseconds
+
+    def __init__(self, pipelines, parent=None) -> None:
+        super().__init__(parent)
+        self.pipelines = pipelines
+        self.setFont(QFont('Courier New', 9))
+        self.setStyleSheet("background: #202020; color: #e0e0e0; padding: 6px;")
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH_INTERVAL)
+        self.timer.timeout.connect(self.refresh)
+
+    def refresh(self):
+        sections = []
+        for pipeline in self.pipelines:
+            # Counters kept elsewhere (hand-off drops, pool) are brought up to date first
+            pipeline.update_counters()
+            summary = pipeline.timings.format_summary()
+            sections.append(f"{pipeline.name}\n{summary}" if len(self.pipelines) > 1 else summary)
+        self.setText("\n\n".join(sections))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
@@ -0,0 +1,158 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+
+DEFAULT_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".wmv")
+
+
+def find_videos(input_dir: str, extensions: Tuple[str, ...], recursive: bool) -> List[str]:
+    """List video files in input_dir (optionally recursively), sorted for reproducible output."""
+    videos = []
+    for root, dirs, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(extensions):
+                videos.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(videos)
+
+
+def participant_id_for(video_path: str, input_dir: str) -> str:
+    """
+    Participant ID of a video: its path relative to input_dir, without extension, directories joined with '_'.
+    With --recursive, same-named videos in different subdirectories then get different report directories.
+    """
+    relative_path = os.path.splitext(os.path.relpath(video_path, input_dir))[0]
+    return "_".join(part for part in relative_path.split(os.sep) if part)
+
+
+def format_duration(seconds: float) -> str:
+    """Same HH:MM:SS.cc format the Stopwatch widget reports as trial duration."""
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours:02}:{minutes:02}:{secs:02}.{centiseconds:02}"
+
+
+def analyze_video(video_path: str, participant_id: str, output_dir: str, condition: str, config_overrides: dict) -> Tuple[str, Optional[str], int, float]:
+    """
+    Worker entry point: run the live analysis on every frame of one video file.
+    Produces the same report directory layout (config.csv, data.csv, final_report.xlsx) as a GUI trial.
+    Returns (video_path, report_location, frames, seconds).
+    """
+    # Heavy imports happen in the worker only, the parent process never loads mediapipe
+    import cv2 as cv
+    from Model.CaptureConfig import CaptureConfig
+    from Model.FrameAnalyzer import FrameAnalyzer
+    from Model.FramePool import FrameMetadata
+    from Utils.ReportGenerator import ReportGenerator
+
+    # One file per worker, so keep OpenCV from spawning its own thread pool on top of ours
+    cv.setNumThreads(1)
+
+    cap = cv.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video file '{video_path}'")
+
+    video_fps = cap.get(cv.CAP_PROP_FPS) or CaptureConfig.DEFAULT_FPS
+    frame_count = cap.get(cv.CAP_PROP_FRAME_COUNT)
+
+    config = CaptureConfig()
+    for name, value in config_overrides.items():
+        getattr(config, f"set_{name}")(value)
+    config.set_fps(max(1, round(video_fps)))
+    config.set_participant_id(participant_id)
+    config.set_condition(condition)
+    config.set_report_directory(output_dir)
+
+    report_facade = ReportGenerator(config)
+    report_facade.initial_setup()
+    analyzer = FrameAnalyzer(config=config, report_facade=report_facade, overlay_mode="off")
+
+    # Frame times are rebuilt from the stream position. The file was closed when the recording ended,
+    # so its modification time minus the video duration approximates the wall clock of the first frame
+    start_epoch = os.path.getmtime(video_path) - (frame_count / video_fps if frame_count > 0 else 0)
+
+    frames = 0
+    last_position = 0.0
+    start_time = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        position = cap.get(cv.CAP_PROP_POS_MSEC) / 1000
+        if position <= 0 and frames > 0:
+            # Some containers do not report positions, fall back to the nominal frame rate
+            position = frames / video_fps
+        last_position = position
+        image = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
+        analyzer.process(image, start_epoch + position, FrameMetadata(capture_ns=-1, sequence=frames, camera_timestamp=position * 1000))
+        frames += 1
+    cap.release()
+
+    report_facade.generate_summary_report(format_duration(last_position))
+    return video_path, report_facade.report_location, frames, time.perf_counter() - start_time
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the PERCLOS/blink analysis headlessly on a directory of recorded videos.")
+    ap.add_argument("--input", required=True, help="Directory containing the video files")
+    ap.add_argument("--out", required=True, help="Directory where one report directory per video is created")
+    ap.add_argument("--condition", default="batch", help="Condition name used in the report directory names")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Number of worker processes (default: number of cores)")
+    ap.add_argument("--extensions", nargs="+", default=list(DEFAULT_EXTENSIONS),
+                    help="Video file extensions to pick up")
+    ap.add_argument("--recursive", action="store_true", help="Also look for videos in subdirectories")
+    ap.add_argument("--perclos_high_threshold", type=int, help="Override CaptureConfig.perclos_high_threshold (percent)")
+    ap.add_argument("--perclos_low_threshold", type=int, help="Override CaptureConfig.perclos_low_threshold (percent)")
+    ap.add_argument("--perclos_window_size", type=int, help="Override CaptureConfig.perclos_window_size (seconds)")
+    ap.add_argument("--blink_detection_threshold", type=float, help="Override CaptureConfig.blink_detection_threshold")
+    ap.add_argument("--blink_window_size", type=int, help="Override CaptureConfig.blink_window_size (seconds)")
+    ap.add_argument("--binary_recording", action="store_true", help="Also write the chunked .npy recording")
+    args = ap.parse_args()
+
+    extensions = tuple(ext.lower() if ext.startswith(".") else "." + ext.lower() for ext in args.extensions)
+    videos = find_videos(args.input, extensions, args.recursive)
+    if not videos:
+        print(f"No video files found in {args.input}")
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+
+    overrides = {}
+    for name in ("perclos_high_threshold", "perclos_low_threshold", "perclos_window_size", "blink_detection_threshold", "blink_window_size"):
+        if getattr(args, name) is not None:
+            overrides[name] = getattr(args, name)
+    if args.binary_recording:
+        overrides["binary_recording"] = True
+
+    workers = max(1, min(args.workers, len(videos)))
+    print(f"Analysing {len(videos)} videos with {workers} worker processes")
+
+    failures = 0
+    start_time = time.perf_counter()
+    # spawn: workers start from a clean interpreter on every platform (mediapipe is not fork-safe)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {executor.submit(analyze_video, video, participant_id_for(video, args.input), args.out, args.condition, overrides): video for video in videos}
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                _, report_location, frames, seconds = future.result()
+                print(f"{video}: {frames} frames in {seconds:.1f}s ({frames / max(seconds, 1e-9):.1f} FPS) -> {report_location}")
+            except Exception:
+                failures += 1
+                print(f"{video}: analysis failed", sys.exc_info())
+
+    print(f"Done in {time.perf_counter() - start_time:.1f}s, {len(videos) - failures}/{len(videos)} videos analysed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
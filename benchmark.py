@@ -0,0 +1,322 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+
+DEFAULT_RESOLUTIONS = ("640x480", "1280x720", "1920x1080")
+DEFAULT_SESSION_LENGTHS = (60, 600)     # Seconds of recording at --fps
+DEFAULT_FRAMES = 300
+DEFAULT_TOLERANCE = 0.2
+
+# Landmark counts of the synthetic measurements, as returned by FaceAnalyzer for one eye
+EYELID_POINTS = 16
+EYE_CONTOUR_POINTS = 4  # FaceAnalyzer's eye "contour" is the iris outline
+BLINK_INTERVAL = 4.0    # Seconds between synthetic blinks
+BLINK_DURATION = 0.15   # Seconds
+
+
+def parse_resolution(text: str) -> Tuple[int, int]:
+    """'1280x720' -> (1280, 720)."""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def build_config(output_dir: str, fps: int, name: str, binary_recording: bool):
+    """CaptureConfig for one benchmark case, reporting into its own directory."""
+    from Model.CaptureConfig import CaptureConfig
+
+    config = CaptureConfig()
+    config.set_fps(fps)
+    config.set_participant_id(name)
+    config.set_condition("benchmark")
+    config.set_report_directory(output_dir)
+    config.set_binary_recording(binary_recording)
+    return config
+
+
+def synthetic_frames(width: int, height: int, count: int = 4) -> list:
+    """A few BGR frames with texture and a face-sized bright ellipse, so conversions and copies touch real data."""
+    import cv2 as cv
+    import numpy as np
+
+    rng = np.random.default_rng(seed=width * height)
+    frames = []
+    for i in range(count):
+        frame = rng.integers(0, 64, size=(height, width, 3), dtype=np.uint8)
+        center = (width // 2 + (i - count // 2) * width // 50, height // 2)
+        cv.ellipse(frame, center, (width // 6, height // 4), 0, 0, 360, (170, 190, 220), -1)
+        frames.append(frame)
+    return frames
+
+
+def synthetic_measurement(t: float, width: int, height: int):
+    """EyeMeasurement with a plausible eye opening signal, a blink every BLINK_INTERVAL seconds and landmarks around the frame centre."""
+    import numpy as np
+    from Model.FrameAnalyzer import EyeMeasurement
+
+    phase = t % BLINK_INTERVAL
+    closing = phase < BLINK_DURATION
+    opening = 0.1 if closing else 0.7 + 0.1 * math.sin(t)
+    is_blink = phase < 1.0 / 30
+    sway = 5 * math.sin(t * 0.5)
+
+    def eye(cx):
+        # Eyelids: an ellipse around the eye, as tall as the eye is open. Iris: four points on a circle
+        angles = np.linspace(0, 2 * math.pi, EYELID_POINTS, endpoint=False)
+        eyelids = np.stack([cx + 25 * np.cos(angles) + sway, height / 2 + 10 * opening * np.sin(angles), np.zeros(EYELID_POINTS)], axis=1)
+        angles = np.linspace(0, 2 * math.pi, EYE_CONTOUR_POINTS, endpoint=False)
+        contour = np.stack([cx + 6 * np.cos(angles) + sway, height / 2 + 6 * np.sin(angles), np.zeros(EYE_CONTOUR_POINTS)], axis=1)
+        return np.array([cx + sway, height / 2, 0.0]), eyelids, contour
+
+    left_iris, left_eyelids, left_contour = eye(width / 2 - 60)
+    right_iris, right_eyelids, right_contour = eye(width / 2 + 60)
+    return EyeMeasurement(opening, opening, is_blink, BLINK_DURATION, left_iris, right_iris, left_eyelids, right_eyelids, left_contour, right_contour)
+
+
+def result(benchmark: str, items: int, seconds: float, unit: str, **extra) -> dict:
+    """One machine-readable result row."""
+    row = {
+        "benchmark": benchmark,
+        "items": items,
+        "unit": unit,
+        "seconds": seconds,
+        "per_item_ms": seconds / items * 1e3 if items else math.nan,
+        "rate": items / seconds if seconds > 0 else math.nan,
+    }
+    row.update(extra)
+    return row
+
+
+def bench_frame_analysis(width: int, height: int, frames: int, fps: int, overlay_mode: str, output_dir: str, binary_recording: bool) -> dict:
+    """
+    The analysis worker's per-frame path without camera or face model: pooled capture buffer, BGR->RGB into a reusable buffer,
+    FrameAnalyzer.process_measurement with a synthetic measurement (rolling windows, overlay, write_data).
+    The face model itself is left out, its cost depends on the face and is not what this guards.
+    """
+    import cv2 as cv
+    from Model.FrameAnalyzer import FrameAnalyzer
+    from Model.FramePool import ConversionBuffers, FramePool
+    from Utils.PipelineTimings import PipelineTimings
+    from Utils.ReportGenerator import ReportGenerator
+
+    config = build_config(output_dir, fps, f"frames_{width}x{height}_{overlay_mode}", binary_recording)
+    report_facade = ReportGenerator(config)
+    report_facade.initial_setup()
+    timings = PipelineTimings()
+    analyzer = FrameAnalyzer(config=config, report_facade=report_facade, overlay_mode=overlay_mode, local_inference=False, timings=timings)
+
+    sources = synthetic_frames(width, height)
+    pool = FramePool()
+    rgb_buffers = ConversionBuffers()
+    start_epoch = time.time()
+
+    start_time = time.perf_counter()
+    for i in range(frames):
+        t = i / fps
+        frame = pool.acquire()
+        if frame.image is None or frame.image.shape != sources[0].shape:
+            frame.image = sources[0].copy()
+        frame.image[...] = sources[i % len(sources)]
+        frame.metadata.stamp(time.monotonic_ns(), i, t * 1000)
+
+        convert_start = time.perf_counter_ns()
+        metadata = frame.metadata.copy()
+        image = rgb_buffers.next(frame.image.shape)
+        cv.cvtColor(frame.image, cv.COLOR_BGR2RGB, dst=image)
+        frame.release()
+        timings.record('cvt_color', time.perf_counter_ns() - convert_start)
+
+        analyzer.process_measurement(image, start_epoch + t, synthetic_measurement(t, width, height), metadata)
+    # Rows still queued for the writer thread count as part of the work
+    report_facade.close_data_report()
+    seconds = time.perf_counter() - start_time
+
+    stages = {row[0]: dict(zip(timings.csv_headers[1:], row[1:])) for row in timings.get_summary()}
+    return result("frame_analysis", frames, seconds, "frames", resolution=f"{width}x{height}", overlay_mode=overlay_mode, stages=stages)
+
+
+def bench_write_data(rows: int, fps: int, output_dir: str, binary_recording: bool) -> Tuple[dict, object]:
+    """ReportGenerator.write_data alone, one row per frame of a session. Returns the result and the report generator."""
+    from Model.FramePool import FrameMetadata
+    from Utils.ReportGenerator import ReportGenerator
+
+    config = build_config(output_dir, fps, f"session_{rows}", binary_recording)
+    report_facade = ReportGenerator(config)
+    report_facade.initial_setup()
+    start_epoch = time.time() - rows / fps
+
+    # Measurements are built up front, only the reporting is timed
+    measurements = [synthetic_measurement(i / fps, 640, 480) for i in range(min(rows, fps * 60))]
+    landmarks = [(m.left_iris_pos.tolist(), m.left_eyelid_loc.tolist(), m.left_eye_loc.tolist(),
+                  m.right_iris_pos.tolist(), m.right_eyelid_loc.tolist(), m.right_eye_loc.tolist()) for m in measurements]
+
+    start_time = time.perf_counter()
+    for i in range(rows):
+        m = measurements[i % len(measurements)]
+        left_iris, left_eyelid, left_eye, right_iris, right_eyelid, right_eye = landmarks[i % len(landmarks)]
+        report_facade.write_data(start_epoch + i / fps, m.left_eye_opening, m.right_eye_opening, 12.5, m.is_blink, m.last_blink_duration, 15.0, True,
+                                 left_iris, left_eyelid, left_eye, right_iris, right_eyelid, right_eye, metadata=FrameMetadata(-1, i, i * 1000 / fps))
+    report_facade.close_data_report()
+    seconds = time.perf_counter() - start_time
+    return result("write_data", rows, seconds, "rows", session_seconds=rows / fps), report_facade
+
+
+def bench_summary_report(report_facade, rows: int, fps: int, include_raw_data: bool) -> dict:
+    """ReportGenerator.generate_summary_report over the session written by bench_write_data. Raises if no report was produced."""
+    # generate_summary_report only prints its errors, a missing final_report.xlsx is how a failed run shows
+    report_path = os.path.join(report_facade.report_location, "final_report.xlsx")
+    if os.path.exists(report_path):
+        os.remove(report_path)
+    start_time = time.perf_counter()
+    report_facade.generate_summary_report(f"{rows / fps:.2f}s", include_raw_data=include_raw_data)
+    seconds = time.perf_counter() - start_time
+    if not os.path.exists(report_path):
+        raise RuntimeError(f"generate_summary_report did not produce {report_path} (is openpyxl installed?)")
+    return result("summary_report", rows, seconds, "rows", session_seconds=rows / fps, include_raw_data=include_raw_data)
+
+
+def bench_visualizer(csv_path: str, rows: int, fps: int, width: int, height: int, output_dir: str) -> List[dict]:
+    """raw_coordinate_visualizer on a generated data.csv: parsing the rows, then rendering them to a video file."""
+    from raw_coordinate_visualizer import DEFAULT_TS_FORMAT, load_csv_rows, render_video
+
+    start_time = time.perf_counter()
+    ts_labels, rel_seconds, marker_rows, frames_per_row = load_csv_rows(csv_path, fps, DEFAULT_TS_FORMAT)
+    marker_rows = list(marker_rows)
+    load_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    frames_written = render_video(ts_labels, rel_seconds, marker_rows, frames_per_row, os.path.join(output_dir, f"visualizer_{rows}.avi"), width, height, fps)
+    render_seconds = time.perf_counter() - start_time
+
+    return [
+        result("visualizer_load", rows, load_seconds, "rows", session_seconds=rows / fps),
+        result("visualizer_render", frames_written, render_seconds, "frames", session_seconds=rows / fps, resolution=f"{width}x{height}"),
+    ]
+
+
+def result_key(row: dict) -> tuple:
+    """Identifies the same case across runs."""
+    return tuple((name, row[name]) for name in ("benchmark", "resolution", "overlay_mode", "session_seconds", "include_raw_data") if name in row)
+
+
+def compare(results: List[dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Cases whose throughput fell more than tolerance below the baseline run."""
+    with open(baseline_path, "r") as baseline_file:
+        baseline = {result_key(row): row for row in json.load(baseline_file)["results"]}
+    regressions = []
+    for row in results:
+        previous = baseline.get(result_key(row))
+        if previous is None or not previous["rate"] or math.isnan(previous["rate"]):
+            continue
+        change = row["rate"] / previous["rate"] - 1
+        row["baseline_rate"] = previous["rate"]
+        row["change"] = change
+        if change < -tolerance:
+            regressions.append(f"{dict(result_key(row))}: {row['rate']:.1f} {row['unit']}/s vs {previous['rate']:.1f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the analysis and reporting pipeline headlessly, with synthetic frames and generated reports.")
+    ap.add_argument("--resolutions", nargs="+", default=list(DEFAULT_RESOLUTIONS), help="Frame sizes, WIDTHxHEIGHT")
+    ap.add_argument("--session_lengths", nargs="+", type=int, default=list(DEFAULT_SESSION_LENGTHS),
+                    help="Session lengths in seconds for the report benchmarks")
+    ap.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="Frames analysed per resolution")
+    ap.add_argument("--fps", type=int, default=30, help="Frame rate of the synthetic sessions")
+    ap.add_argument("--overlay_modes", nargs="+", default=["pixels", "widgets", "off"], help="Overlay modes to run the frame benchmark with")
+    ap.add_argument("--binary_recording", action="store_true", help="Also write the chunked .npy recording")
+    ap.add_argument("--skip", nargs="+", default=[], choices=["frame_analysis", "write_data", "summary_report", "visualizer"],
+                    help="Benchmarks to leave out")
+    ap.add_argument("--json", help="Write the results to this file (default: stdout)")
+    ap.add_argument("--baseline", help="Results file of an earlier run; exit with status 2 on throughput regressions")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed throughput drop against the baseline (0.2 = 20%%)")
+    ap.add_argument("--keep", help="Keep the generated reports and videos in this directory instead of a temporary one")
+    args = ap.parse_args()
+
+    # Nothing here needs a display; keep OpenCV's own threads from skewing single-frame timings
+    import cv2 as cv
+    cv.setNumThreads(1)
+
+    resolutions = [parse_resolution(text) for text in args.resolutions]
+    output_dir = args.keep or tempfile.mkdtemp(prefix="palpebra_benchmark_")
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    # The pipeline prints its own stats (report writer, frame pool...), keep stdout for the JSON results
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if "frame_analysis" not in args.skip:
+                for width, height in resolutions:
+                    for overlay_mode in args.overlay_modes:
+                        row = bench_frame_analysis(width, height, args.frames, args.fps, overlay_mode, output_dir, args.binary_recording)
+                        print(f"frame_analysis {width}x{height} {overlay_mode}: {row['rate']:.1f} frames/s ({row['per_item_ms']:.2f} ms/frame)", file=sys.stderr)
+                        results.append(row)
+
+            for session_seconds in args.session_lengths:
+                rows = session_seconds * args.fps
+                if {"write_data", "summary_report", "visualizer"} <= set(args.skip):
+                    break
+                row, report_facade = bench_write_data(rows, args.fps, output_dir, args.binary_recording)
+                if "write_data" not in args.skip:
+                    print(f"write_data {session_seconds}s: {row['rate']:.0f} rows/s", file=sys.stderr)
+                    results.append(row)
+                if "summary_report" not in args.skip:
+                    for include_raw_data in (False, True):
+                        row = bench_summary_report(report_facade, rows, args.fps, include_raw_data)
+                        print(f"summary_report {session_seconds}s raw_data={include_raw_data}: {row['seconds']:.2f}s", file=sys.stderr)
+                        results.append(row)
+                if "visualizer" not in args.skip:
+                    width, height = resolutions[0]
+                    for row in bench_visualizer(report_facade.get_data_report_location(), rows, args.fps, width, height, output_dir):
+                        print(f"{row['benchmark']} {session_seconds}s: {row['rate']:.0f} {row['unit']}/s", file=sys.stderr)
+                        results.append(row)
+        finally:
+            if not args.keep:
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else []
+
+    import numpy as np
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv.__version__,
+            "numpy": np.__version__,
+        },
+        "parameters": {
+            "resolutions": args.resolutions,
+            "session_lengths": args.session_lengths,
+            "frames": args.frames,
+            "fps": args.fps,
+            "overlay_modes": args.overlay_modes,
+            "binary_recording": args.binary_recording,
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 2 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,13 @@
+import multiprocessing
+
+# First import: startup milestones are measured from here
+import Utils.StartupTimer as startup_timer
 import View.App as App
 
 def main():
     gui = App.App()
-main()
\ No newline at end of file
+
+if __name__ == "__main__":
+    # Needed by the child processes (e.g. the raw video encoder) in packaged builds
+    multiprocessing.freeze_support()
+    main()
\ No newline at end of file
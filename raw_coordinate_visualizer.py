@@ -2,6 +2,7 @@ import argparse
 import ast
 import json
 import math
+from datetime import datetime
 from typing import Any, List, Optional, Sequence, Tuple
 
 import cv2
@@ -10,6 +11,7 @@ import pandas as pd
 
 
 DEFAULT_TS_FORMAT = "%Y-%m-%d-%H-%M-%S-%f"  # e.g., 2025-09-04-16-39-28-685863
+CSV_READ_ROWS = 10000  # Rows parsed at a time while rendering
 
 
 def find_timestamp_column(cols: Sequence[str]) -> str:
@@ -117,6 +119,11 @@ def compute_frames_per_row(
             return [1] * len(timestamps)
         deltas = s.diff().fillna(0).to_numpy()
 
+    return frames_from_deltas(deltas, target_fps)
+
+
+def frames_from_deltas(deltas: np.ndarray, target_fps: float) -> List[int]:
+    """Turn per-row elapsed seconds into frame counts; non-positive deltas use the median positive delta."""
     positive = [d for d in deltas if d > 0]
     median_dt = float(np.median(positive)) if positive else (1.0 / max(target_fps, 1e-9))
 
@@ -162,36 +169,66 @@ def open_video_writer(out_path: str, fps: float, size: Tuple[int, int]) -> cv2.V
     return _try("xxxx")  # unopened sentinel
 
 
-def main():
-    ap = argparse.ArgumentParser(description="Visualize eye landmark columns to video.")
-    ap.add_argument("--csv", required=True, help="Path to the CSV file (e.g., data.csv)")
-    ap.add_argument("--out", required=True, help="Output video path (e.g., output.mp4 or output.avi)")
-    ap.add_argument("--width", type=int, default=680, help="Frame width in pixels")
-    ap.add_argument("--height", type=int, default=480, help="Frame height in pixels")
-    ap.add_argument("--fps", type=float, default=30.0, help="Target video FPS (constant)")
-    ap.add_argument("--radius", type=int, default=3, help="Base dot radius in pixels")
-    ap.add_argument("--use_z_size", action="store_true",
-                    help="If set, scale dot radius by z (relative to face width).")
-    ap.add_argument("--z_alpha", type=float, default=0.25,
-                    help="Sensitivity of z-to-size mapping (radius *= 1 + z * z_alpha).")
-    ap.add_argument("--bg", choices=["black", "white"], default="black", help="Background color")
-    ap.add_argument("--timestamp_format", default=DEFAULT_TS_FORMAT,
-                    help="pandas/strftime format for timestamps; default matches 'YYYY-MM-DD-HH-MM-SS-ffffff'")
-    args = ap.parse_args()
-
-    W, H = args.width, args.height
+def load_csv_rows(csv_path: str, target_fps: float, ts_format: Optional[str]):
+    """
+    Read a data.csv, or the data/ directory of a rotated report (compressed chunks, read in order as one table).
+    Returns timestamp labels, relative seconds, per-row marker points and frames per row.
+    Only the timestamp column is loaded up front; marker rows are parsed lazily, CSV_READ_ROWS at a time.
+    """
+    from Utils.ReportChunks import iter_data_frames, list_data_files
 
-    df = pd.read_csv(args.csv)
-    if df.shape[1] < 7:
-        raise ValueError("Expected at least 7 columns (timestamp + 6 marker columns). Found: %d" % df.shape[1])
+    columns = pd.read_csv(list_data_files(csv_path)[0], nrows=0).columns
+    if len(columns) < 7:
+        raise ValueError("Expected at least 7 columns (timestamp + 6 marker columns). Found: %d" % len(columns))
 
     # Timestamp + last 6 marker columns
-    ts_col = find_timestamp_column(df.columns)
-    marker_cols = list(df.columns[-6:])
+    ts_col = find_timestamp_column(columns)
+    marker_cols = list(columns[-6:])
+    ts = pd.concat(list(iter_data_frames(csv_path, usecols=[ts_col])), ignore_index=True)[ts_col]
 
     # Timing (strict parse, no deprecated args)
-    frames_per_row = compute_frames_per_row(df[ts_col], args.fps, args.timestamp_format)
+    frames_per_row = compute_frames_per_row(ts, target_fps, ts_format)
+
+    # Relative time for overlay: strict format
+    ts_clean = ts.astype(str).str.strip()
+    dt = pd.to_datetime(ts_clean, format=ts_format, errors="coerce")
+    if dt.isna().all():
+        rel_t = pd.to_numeric(ts, errors="coerce").replace([np.inf, -np.inf], np.nan)
+        rel_t = None if rel_t.isna().all() else (rel_t - float(rel_t.iloc[0]))
+    else:
+        rel_t = (dt - dt.iloc[0]).dt.total_seconds()
+    rel_seconds = None if rel_t is None else rel_t.to_numpy(dtype=float)
+
+    ts_labels = [str(v) for v in ts]
+    marker_rows = ([coerce_points(row[col]) for col in marker_cols]
+                   for df in iter_data_frames(csv_path, chunksize=CSV_READ_ROWS, usecols=marker_cols)
+                   for _, row in df.iterrows())
+    return ts_labels, rel_seconds, marker_rows, frames_per_row
+
+
+def load_recording_rows(recording_path: str):
+    """Read a binary recording: returns timestamp labels, relative seconds, per-row marker arrays and per-row deltas."""
+    from Utils.BinaryRecorder import LANDMARK_COLUMNS, load_recording
+
+    recording = load_recording(recording_path)
+    ts = np.asarray(recording["timestamp"], dtype=float)
+    if ts.size == 0:
+        return [], None, iter(()), np.zeros(0)
 
+    deltas = np.diff(ts, prepend=ts[0])
+    rel_seconds = ts - ts[0]
+    ts_labels = [datetime.fromtimestamp(t).strftime(DEFAULT_TS_FORMAT) for t in ts]
+
+    # (N, K, 3) float32 arrays, rows with no face are all-NaN and skipped by the drawing loop
+    markers = [recording[col] for col in LANDMARK_COLUMNS]
+    marker_rows = ([m[i] if m.shape[1] else None for m in markers] for i in range(ts.size))
+    return ts_labels, rel_seconds, marker_rows, deltas
+
+
+def render_video(ts_labels: Sequence[str], rel_seconds: Optional[np.ndarray], marker_rows, frames_per_row: Sequence[int],
+                 out_path: str, W: int, H: int, fps: float, radius: int = 3, use_z_size: bool = False,
+                 z_alpha: float = 0.25, bg: str = "black") -> int:
+    """Draw each row's landmark columns on a blank frame and write them to out_path. Returns the number of frames written."""
     # Colors (BGR for OpenCV): red, green, blue, cyan, magenta, yellow
     palette = [
         (0, 0, 255),
@@ -203,15 +240,15 @@ def main():
     ]
 
     # Video writer with fallbacks
-    vw = open_video_writer(args.out, args.fps, (W, H))
+    vw = open_video_writer(out_path, fps, (W, H))
     if not vw.isOpened():
         raise RuntimeError(
             "Could not open VideoWriter for '%s'. "
-            "Try using a different extension (e.g., .avi) or a different path/codec." % args.out
+            "Try using a different extension (e.g., .avi) or a different path/codec." % out_path
         )
 
-    bg_color = (0, 0, 0) if args.bg == "black" else (255, 255, 255)
-    text_color = (255, 255, 255) if args.bg == "black" else (0, 0, 0)
+    bg_color = (0, 0, 0) if bg == "black" else (255, 255, 255)
+    text_color = (255, 255, 255) if bg == "black" else (0, 0, 0)
 
     # Text overlay
     font = cv2.FONT_HERSHEY_SIMPLEX
@@ -219,22 +256,13 @@ def main():
     thickness = 1
     ts_origin = (10, H - 10)
 
-    # Relative time for overlay: strict format
-    ts_clean = df[ts_col].astype(str).str.strip()
-    dt = pd.to_datetime(ts_clean, format=args.timestamp_format, errors="coerce")
-    if dt.isna().all():
-        rel_t = pd.to_numeric(df[ts_col], errors="coerce").replace([np.inf, -np.inf], np.nan)
-        rel_t = None if rel_t.isna().all() else (rel_t - float(rel_t.iloc[0]))
-    else:
-        rel_t = (dt - dt.iloc[0]).dt.total_seconds()
-
-    for i, row in df.iterrows():
+    frames_written = 0
+    for i, markers in enumerate(marker_rows):
         frame = np.full((H, W, 3), bg_color, dtype=np.uint8)
 
         # Draw per-column landmarks
-        for j, col in enumerate(marker_cols):
+        for j, pts in enumerate(markers):
             color = palette[j % len(palette)]
-            pts = coerce_points(row[col])
             if pts is None:
                 continue  # draw nothing for missing data
 
@@ -246,16 +274,16 @@ def main():
                 if xi < 0 or yi < 0 or xi >= W or yi >= H:
                     continue
 
-                r = int(args.radius)
-                if args.use_z_size and math.isfinite(z):
-                    r = max(1, min(12, int(round(args.radius * (1.0 + z * args.z_alpha)))))
+                r = int(radius)
+                if use_z_size and math.isfinite(z):
+                    r = max(1, min(12, int(round(radius * (1.0 + z * z_alpha)))))
 
                 cv2.circle(frame, (xi, yi), r, color, thickness=-1, lineType=cv2.LINE_AA)
 
         # Timestamp overlay
-        ts_raw = str(row[ts_col])
-        if rel_t is not None and pd.notna(rel_t.iloc[i]):
-            overlay = f"{ts_raw}   (t={float(rel_t.iloc[i]):.3f}s)"
+        ts_raw = ts_labels[i]
+        if rel_seconds is not None and np.isfinite(rel_seconds[i]):
+            overlay = f"{ts_raw}   (t={float(rel_seconds[i]):.3f}s)"
         else:
             overlay = ts_raw
         cv2.putText(frame, overlay, ts_origin, font, font_scale, text_color, thickness, cv2.LINE_AA)
@@ -264,8 +292,41 @@ def main():
         n_emit = frames_per_row[i] if i < len(frames_per_row) else 1
         for _ in range(max(1, n_emit)):
             vw.write(frame)
+            frames_written += 1
 
     vw.release()
+    return frames_written
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Visualize eye landmark columns to video.")
+    source = ap.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="Path to the CSV file (e.g., data.csv), or to the data/ directory of a rotated report")
+    source.add_argument("--recording", help="Path to a binary recording directory (e.g., recording/ next to data.csv)")
+    ap.add_argument("--out", required=True, help="Output video path (e.g., output.mp4 or output.avi)")
+    ap.add_argument("--width", type=int, default=680, help="Frame width in pixels")
+    ap.add_argument("--height", type=int, default=480, help="Frame height in pixels")
+    ap.add_argument("--fps", type=float, default=30.0, help="Target video FPS (constant)")
+    ap.add_argument("--radius", type=int, default=3, help="Base dot radius in pixels")
+    ap.add_argument("--use_z_size", action="store_true",
+                    help="If set, scale dot radius by z (relative to face width).")
+    ap.add_argument("--z_alpha", type=float, default=0.25,
+                    help="Sensitivity of z-to-size mapping (radius *= 1 + z * z_alpha).")
+    ap.add_argument("--bg", choices=["black", "white"], default="black", help="Background color")
+    ap.add_argument("--timestamp_format", default=DEFAULT_TS_FORMAT,
+                    help="pandas/strftime format for timestamps; default matches 'YYYY-MM-DD-HH-MM-SS-ffffff'")
+    args = ap.parse_args()
+
+    W, H = args.width, args.height
+
+    if args.recording:
+        ts_labels, rel_seconds, marker_rows, deltas = load_recording_rows(args.recording)
+        frames_per_row = frames_from_deltas(deltas, args.fps)
+    else:
+        ts_labels, rel_seconds, marker_rows, frames_per_row = load_csv_rows(args.csv, args.fps, args.timestamp_format)
+
+    render_video(ts_labels, rel_seconds, marker_rows, frames_per_row, args.out, W, H, args.fps,
+                 radius=args.radius, use_z_size=args.use_z_size, z_alpha=args.z_alpha, bg=args.bg)
     print(f"Wrote video to: {args.out}")
 
 
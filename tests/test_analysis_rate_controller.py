@@ -0,0 +1,42 @@
+import pytest
+
+import Model.AnalysisRateController as rate_controller_module
+from Model.AnalysisRateController import AnalysisRateController
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_controller_module.time, "monotonic", lambda: now[0])
+    return now
+
+def run(controller, clock, capture_fps, seconds, cost):
+    # Powers of two keep the simulated clock exact, so every adjustment window holds a whole number of frames
+    analysed = 0
+    for _ in range(int(capture_fps * seconds)):
+        clock[0] += 1 / capture_fps
+        if controller.should_analyse():
+            analysed += 1
+            controller.record_cost(cost)
+    return analysed
+
+@pytest.mark.parametrize("cost, expected_stride", [
+    (0.005, 2),     # Cheap frames: capped by max_rate, 64 / 32
+    (0.05, 4),      # The analyzer sustains 0.8 / 0.05 = 16 frames per second: 64 / 16
+    (1.0, 16),      # Too slow for min_rate, which still wins: 64 / 4
+])
+def test_stride_follows_the_measured_cost_and_capture_rate(clock, cost, expected_stride):
+    # Configured for 30 fps, the camera actually delivers 64
+    controller = AnalysisRateController(capture_fps=30, min_rate=4, max_rate=32)
+    run(controller, clock, capture_fps=64, seconds=3, cost=cost)
+    assert controller.stride == expected_stride
+    assert controller.capture_fps == 64
+    analysed = run(controller, clock, capture_fps=64, seconds=0.5, cost=cost)
+    assert analysed == 32 // expected_stride
+
+def test_every_frame_is_counted(clock):
+    controller = AnalysisRateController(capture_fps=32, min_rate=4, max_rate=8)
+    run(controller, clock, capture_fps=32, seconds=5, cost=0.01)
+    stats = controller.get_stats()
+    assert stats['frames_seen'] == 160
+    assert stats['frames_analysed'] + stats['frames_skipped'] == 160
+    assert stats['stride'] == 4 and stats['max_stride'] == 4
@@ -0,0 +1,52 @@
+import numpy as np
+
+from Model.FramePool import FrameMetadata
+from Utils.BinaryRecorder import BinaryRecorder, list_recording_chunks, load_recording
+
+def append_row(recorder, row, face=True):
+    eyelid = np.full((16, 3), row, dtype=np.float64)
+    iris = np.array([row, row + 0.5, 1.0])
+    if face:
+        recorder.append(100.0 + row, 0.3, 0.4, 12.5, row % 2 == 0, 0.1, 6.0, True, iris, eyelid, eyelid[:4], iris, eyelid, eyelid[:4],
+                        metadata=FrameMetadata(capture_ns=row * 1000, sequence=row, camera_timestamp=row * 25.0))
+    else:
+        recorder.append(100.0 + row, "NaN", "NaN", "NaN", "NaN", "NaN", "NaN", False, "NaN", "NaN", "NaN", "NaN", "NaN", "NaN", analysis_skipped=True)
+
+def test_rows_round_trip_across_chunks(tmp_path):
+    recorder = BinaryRecorder(str(tmp_path), chunk_rows=4)
+    for row in range(10):
+        append_row(recorder, row, face=row != 3)
+    recorder.close()
+    assert len(list_recording_chunks(str(tmp_path))) == 3
+
+    recording = load_recording(str(tmp_path))
+    np.testing.assert_array_equal(recording['timestamp'], 100.0 + np.arange(10))
+    np.testing.assert_array_equal(recording['frame_sequence'], [0, 1, 2, -1, 4, 5, 6, 7, 8, 9])
+    np.testing.assert_array_equal(recording['blink_detected'], [1, 0, 1, -1, 1, 0, 1, 0, 1, 0])
+    np.testing.assert_array_equal(recording['analysis_skipped'], np.arange(10) == 3)
+    assert np.isnan(recording['left_eye_opening'][3]) and recording['left_eye_opening'][0] == np.float32(0.3)
+    assert recording['left_eyelid_loc'].shape == (10, 16, 3)
+    assert np.isnan(recording['left_eyelid_loc'][3]).all()
+    np.testing.assert_array_equal(recording['left_eyelid_loc'][9], np.full((16, 3), 9.0))
+    np.testing.assert_array_equal(recording['left_iris_loc'][2], [[2.0, 2.5, 1.0]])
+
+def test_chunks_without_faces_are_widened(tmp_path):
+    recorder = BinaryRecorder(str(tmp_path), chunk_rows=2)
+    for row in range(4):
+        append_row(recorder, row, face=row >= 2)
+    recorder.close()
+    recording = load_recording(str(tmp_path))
+    assert recording['left_eyelid_loc'].shape == (4, 16, 3)
+    assert np.isnan(recording['left_eyelid_loc'][:2]).all()
+
+def test_chunks_are_handed_to_the_task_runner(tmp_path):
+    tasks = []
+    recorder = BinaryRecorder(str(tmp_path), chunk_rows=2, task_runner=lambda task: tasks.append(task) or True)
+    for row in range(3):
+        append_row(recorder, row)
+    recorder.close()
+    # Nothing is written until the runner runs the tasks
+    assert len(tasks) == 2 and list_recording_chunks(str(tmp_path)) == []
+    for task in tasks:
+        task()
+    assert len(load_recording(str(tmp_path))['timestamp']) == 3
@@ -0,0 +1,33 @@
+from Utils.CameraDetector import parse_v4l2_formats
+
+V4L2_OUTPUT = """ioctl: VIDIOC_ENUM_FMT
+	Type: Video Capture
+
+	[0]: 'YUYV' (YUYV 4:2:2)
+		Size: Discrete 640x480
+			Interval: Discrete 0.033s (30.000 fps)
+			Interval: Discrete 0.067s (15.000 fps)
+		Size: Discrete 1280x720
+			Interval: Discrete 0.100s (10.000 fps)
+	[1]: 'MJPG' (Motion-JPEG, compressed)
+		Size: Discrete 1280x720
+			Interval: Discrete 0.033s (30.000 fps)
+			Interval: Discrete 0.100s (10.000 fps)
+		Size: Discrete 640x480
+			Interval: Discrete 0.033s (30.000 fps)
+"""
+
+def test_modes_are_parsed_and_sorted_best_first():
+    modes = parse_v4l2_formats(V4L2_OUTPUT)
+    assert [(mode['fourcc'], mode['width'], mode['height'], mode['fps']) for mode in modes] == [
+        ('MJPG', 1280, 720, 30.0),
+        ('MJPG', 1280, 720, 10.0),
+        ('YUYV', 1280, 720, 10.0),
+        # Same size and rate: MJPG, cheaper on USB, goes first
+        ('MJPG', 640, 480, 30.0),
+        ('YUYV', 640, 480, 30.0),
+        ('YUYV', 640, 480, 15.0),
+    ]
+
+def test_nodes_without_capture_formats_have_no_modes():
+    assert parse_v4l2_formats("ioctl: VIDIOC_ENUM_FMT\n\tType: Video Capture\n") == []
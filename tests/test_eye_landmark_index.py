@@ -0,0 +1,48 @@
+import numpy as np
+
+from Model.EyeLandmarkIndex import EyeLandmarkIndex
+
+class FakeFace:
+    # The index attributes of a FaceAnalyzer Face, small groups at scattered mesh positions
+    left_eye_center_index = 468
+    right_eye_center_index = 473
+    left_eyelids_indices = [33, 7, 163]
+    right_eyelids_indices = [263, 249, 390, 373]
+    left_eye_contour_indices = [469, 470]
+    right_eye_contour_indices = [474, 475]
+
+def make_mesh(faces=None):
+    shape = (478, 3) if faces is None else (faces, 478, 3)
+    return np.random.default_rng(seed=5).uniform(0, 640, size=shape)
+
+def test_split_matches_indexing_each_group():
+    face = FakeFace()
+    mesh = make_mesh()
+    index = EyeLandmarkIndex()
+    left_iris, right_iris, left_eyelid, right_eyelid, left_eye, right_eye = index.split(index.gather(face, mesh))
+    np.testing.assert_array_equal(left_iris, mesh[face.left_eye_center_index])
+    np.testing.assert_array_equal(right_iris, mesh[face.right_eye_center_index])
+    np.testing.assert_array_equal(left_eyelid, mesh[face.left_eyelids_indices])
+    np.testing.assert_array_equal(right_eyelid, mesh[face.right_eyelids_indices])
+    np.testing.assert_array_equal(left_eye, mesh[face.left_eye_contour_indices])
+    np.testing.assert_array_equal(right_eye, mesh[face.right_eye_contour_indices])
+    # float64 like the mesh, so report values are not widened from float32
+    assert left_eyelid.dtype == np.float64
+
+def test_single_face_reuses_its_buffer():
+    face = FakeFace()
+    index = EyeLandmarkIndex()
+    first = index.gather(face, make_mesh())
+    second = index.gather(face, make_mesh() + 1)
+    assert first is second
+    np.testing.assert_array_equal(second[0], make_mesh()[face.left_eye_center_index] + 1)
+
+def test_several_faces_are_gathered_at_once():
+    face = FakeFace()
+    meshes = make_mesh(faces=3)
+    index = EyeLandmarkIndex()
+    points = index.gather(face, meshes)
+    assert points.shape == (3, 13, 3)
+    right_eyelids = index.split(points)[3]
+    for i in range(3):
+        np.testing.assert_array_equal(right_eyelids[i], meshes[i][face.right_eyelids_indices])
@@ -0,0 +1,35 @@
+import numpy as np
+
+from Model.FaceRoiTracker import FaceRoiTracker
+
+def make_frame(width=1280, height=720):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+def test_downscaled_full_frame_maps_back_to_frame_pixels():
+    tracker = FaceRoiTracker(analysis_resolution=320)
+    model_image, transform = tracker.prepare(make_frame())
+    assert model_image.shape[:2] == (180, 320)
+    points = np.array([[160.0, 90.0, 4.0], [0.0, 0.0, 0.0]])
+    np.testing.assert_allclose(tracker.to_frame(points, transform), [[640.0, 360.0, 16.0], [0.0, 0.0, 0.0]])
+
+def test_cropped_and_downscaled_roi_maps_back_to_frame_pixels():
+    tracker = FaceRoiTracker(analysis_resolution=100, roi_cropping=True)
+    frame = make_frame()
+    # Face landmarks spanning (500, 300) to (700, 500) in frame pixels
+    tracker.update(np.array([[500.0, 300.0, 0.0], [700.0, 500.0, 0.0]]), frame.shape)
+    assert tracker.is_tracking()
+    x0, y0, x1, y1 = tracker.roi
+    model_image, transform = tracker.prepare(frame)
+    scale = transform[0]
+    assert transform[1:] == (x0, y0)
+    assert max(model_image.shape[:2]) == 100
+    # A point at the centre of the face, as the face model would report it in model image pixels
+    model_point = np.array([[(600.0 - x0) * scale, (400.0 - y0) * scale, 0.0]])
+    np.testing.assert_allclose(tracker.to_frame(model_point, transform), [[600.0, 400.0, 0.0]], atol=1e-6)
+
+def test_identity_transform_returns_points_unchanged():
+    tracker = FaceRoiTracker()
+    model_image, transform = tracker.prepare(make_frame(640, 480))
+    assert tracker.is_identity(transform)
+    points = np.array([[10.0, 20.0, 0.5]])
+    assert tracker.to_frame(points, transform) is points
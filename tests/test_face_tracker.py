@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from Model.FaceTracker import batch_eye_openings
+
+def make_landmarks():
+    # 478 face mesh points, the eyes are placed by place_eye
+    rng = np.random.default_rng(seed=3)
+    return rng.uniform(0, 640, size=(478, 3))
+
+def place_eye(landmarks, eyelid_indices, iris_indices, origin, opening):
+    # Tilted lid at varying depths, so a 2D normalisation or iris distance would give different values
+    x, y = origin
+    landmarks[eyelid_indices[12]] = [x, y, 3.0]
+    landmarks[eyelid_indices[13]] = [x + 20.0, y + 4.0, -5.0]
+    landmarks[eyelid_indices[4]] = [x + 9.0, y - opening, 1.0]
+    landmarks[iris_indices[1]] = [x + 10.0, y + 6.0, 2.0]
+    landmarks[iris_indices[3]] = [x + 11.0, y - 6.0, -1.0]
+
+def test_eye_opening_of_a_level_lid():
+    eyelids = np.zeros((1, 16, 3))
+    eyelids[0, 12] = [0.0, 10.0, 0.0]
+    eyelids[0, 13] = [20.0, 10.0, 0.0]
+    eyelids[0, 4] = [10.0, 4.0, 0.0]
+    irises = np.zeros((1, 4, 3))
+    irises[0, 1] = [10.0, 13.0, 0.0]
+    irises[0, 3] = [10.0, 1.0, 0.0]
+    np.testing.assert_allclose(batch_eye_openings(eyelids, irises), [0.5])
+
+def test_negative_opening_is_clamped():
+    eyelids = np.zeros((1, 16, 3))
+    eyelids[0, 13] = [20.0, 0.0, 0.0]
+    eyelids[0, 4] = [10.0, 5.0, 0.0]
+    irises = np.zeros((1, 4, 3))
+    irises[0, 3] = [0.0, 10.0, 0.0]
+    np.testing.assert_allclose(batch_eye_openings(eyelids, irises), [0.0])
+
+def test_matches_face_process_eyes():
+    Face = pytest.importorskip("FaceAnalyzer.Face").Face
+    landmarks = make_landmarks()
+    place_eye(landmarks, Face.left_eyelids_indices, Face.left_eye_contour_indices, (200.0, 240.0), 7.0)
+    # Closed past the lid line, clamped at 0 by process_eyes
+    place_eye(landmarks, Face.right_eyelids_indices, Face.right_eye_contour_indices, (400.0, 236.0), -3.0)
+    left_eye_opening, right_eye_opening = Face(landmarks).process_eyes(None)
+    # The right eyelid has one point more than the left one, each eye is a separate batch
+    left = batch_eye_openings(landmarks[None, Face.left_eyelids_indices], landmarks[None, Face.left_eye_contour_indices])
+    right = batch_eye_openings(landmarks[None, Face.right_eyelids_indices], landmarks[None, Face.right_eye_contour_indices])
+    np.testing.assert_allclose([left[0], right[0]], [left_eye_opening, right_eye_opening])
+    assert left[0] > 0 and right[0] == 0
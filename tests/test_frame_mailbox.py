@@ -0,0 +1,65 @@
+import queue
+
+import pytest
+
+from Model.FrameMailbox import FrameQueue, LatestFrameMailbox, create_frame_handoff
+from Model.FramePool import FramePool
+
+def take_frames(pool, count):
+    frames = [pool.acquire() for _ in range(count)]
+    for sequence, frame in enumerate(frames):
+        frame.metadata.stamp(sequence * 1000, sequence, 0.0)
+    return frames
+
+def test_fifo_keeps_order_and_drops_the_newest_frame_when_full():
+    pool = FramePool(size=4)
+    handoff = FrameQueue(maxsize=2)
+    frames = take_frames(pool, 3)
+    assert handoff.offer(frames[0]) and handoff.offer(frames[1])
+    assert handoff.would_drop()
+    assert not handoff.offer(frames[2])
+    assert handoff.dropped == 1
+    # The dropped frame went back to the pool
+    assert pool.get_stats()['in_use'] == 2
+    assert handoff.get_nowait() is frames[0] and handoff.get_nowait() is frames[1]
+    with pytest.raises(queue.Empty):
+        handoff.get_nowait()
+
+def test_latest_replaces_the_unread_frame():
+    pool = FramePool(size=4)
+    handoff = LatestFrameMailbox()
+    frames = take_frames(pool, 3)
+    for frame in frames:
+        assert not handoff.would_drop()
+        assert handoff.offer(frame)
+    assert handoff.dropped == 2 and handoff.qsize() == 1
+    assert pool.get_stats()['in_use'] == 1
+    assert handoff.get(timeout=0.1).metadata.sequence == 2
+    with pytest.raises(queue.Empty):
+        handoff.get(timeout=0.01)
+
+def test_offer_blocking_waits_instead_of_dropping():
+    pool = FramePool(size=2)
+    for handoff in (FrameQueue(maxsize=1), LatestFrameMailbox()):
+        first, second = take_frames(pool, 2)
+        assert handoff.offer_blocking(first, timeout=0.01)
+        # Full: the frame is kept by the caller, nothing is dropped
+        assert not handoff.offer_blocking(second, timeout=0.01)
+        assert handoff.dropped == 0
+        first.release()
+        second.release()
+        handoff.get_nowait()
+
+def test_release_is_idempotent():
+    pool = FramePool(size=2)
+    frame = pool.acquire()
+    frame.release()
+    frame.release()
+    assert pool.get_stats()['in_use'] == 0
+    assert pool.acquire() is not pool.acquire()
+
+def test_unknown_policy_is_rejected():
+    assert isinstance(create_frame_handoff("fifo", 3), FrameQueue)
+    assert isinstance(create_frame_handoff("latest", 3), LatestFrameMailbox)
+    with pytest.raises(ValueError):
+        create_frame_handoff("lifo", 3)
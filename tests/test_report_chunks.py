@@ -0,0 +1,68 @@
+import gzip
+import os
+
+import numpy as np
+import pytest
+
+import Utils.ReportChunks as report_chunks
+from Utils.ReportChunks import ChunkedCsvWriter, iter_data_frames, list_data_files, read_manifest
+
+HEADERS = ['timestamp', 'value']
+
+def write_rows(writer, first, count):
+    rng = np.random.default_rng(seed=first)
+    for row in range(first, first + count):
+        writer.writerows([[row, rng.random()]])
+        writer.flush()
+
+def test_rotates_by_size_and_lists_chunks_in_the_manifest(tmp_path):
+    writer = ChunkedCsvWriter(str(tmp_path), HEADERS, max_bytes=16 * 1024)
+    write_rows(writer, 0, 20000)
+    writer.close()
+    manifest = read_manifest(str(tmp_path))
+    assert len(manifest) > 2
+    assert [entry['chunk'] for entry in manifest] == [os.path.basename(path) for path in list_data_files(str(tmp_path))]
+    assert sum(int(entry['rows']) for entry in manifest) == 20000
+    for entry in manifest[:-1]:
+        # Closed once the compressed size reached the limit, overshooting by the compressor's buffer at most
+        assert 16 * 1024 <= int(entry['bytes']) < 64 * 1024
+        assert int(entry['bytes']) == os.path.getsize(os.path.join(str(tmp_path), entry['chunk']))
+    assert manifest[0]['first_timestamp'] == '0' and manifest[-1]['last_timestamp'] == '19999'
+    with gzip.open(os.path.join(str(tmp_path), manifest[1]['chunk']), 'rt') as chunk:
+        assert chunk.readline().strip() == "timestamp,value"
+
+def test_rotates_by_time(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(report_chunks.time, "monotonic", lambda: now[0])
+    writer = ChunkedCsvWriter(str(tmp_path), HEADERS, max_seconds=60)
+    for row in range(10):
+        writer.writerows([[row, 0.5]])
+        writer.flush()
+        now[0] += 15
+    writer.close()
+    # A row every 15 s: a chunk is closed by the flush that finds it 60 s old, on its fifth row
+    assert [int(entry['rows']) for entry in read_manifest(str(tmp_path))] == [5, 5]
+
+def test_empty_report_still_has_a_header_only_chunk(tmp_path):
+    writer = ChunkedCsvWriter(str(tmp_path), HEADERS)
+    writer.close()
+    manifest = read_manifest(str(tmp_path))
+    assert len(manifest) == 1 and manifest[0]['rows'] == '0'
+
+def test_iter_data_frames_reads_chunks_in_order(tmp_path):
+    pytest.importorskip("pandas")
+    writer = ChunkedCsvWriter(str(tmp_path), HEADERS, max_bytes=4 * 1024)
+    write_rows(writer, 0, 3000)
+    writer.close()
+    assert len(list_data_files(str(tmp_path))) > 1
+    timestamps = np.concatenate([frame['timestamp'].to_numpy() for frame in iter_data_frames(str(tmp_path))])
+    np.testing.assert_array_equal(timestamps, np.arange(3000))
+    sizes = [len(frame) for frame in iter_data_frames(str(tmp_path), chunksize=1000)]
+    assert sum(sizes) == 3000 and max(sizes) <= 1000
+
+def test_plain_data_csv_is_its_own_single_file(tmp_path):
+    data_csv = tmp_path / "data.csv"
+    data_csv.write_text("timestamp,value\n0,0.5\n")
+    assert list_data_files(str(data_csv)) == [str(data_csv)]
+    with pytest.raises(FileNotFoundError):
+        list_data_files(str(tmp_path))
@@ -0,0 +1,31 @@
+import numpy as np
+
+from Utils.RollingWindow import RollingWindow
+
+def test_sum_and_mean_cover_the_last_window_size_seconds():
+    window = RollingWindow(window_size=1.0, capacity=64)
+    rng = np.random.default_rng(seed=4)
+    timestamps = np.cumsum(rng.uniform(0.01, 0.05, size=500))
+    values = rng.uniform(0, 1, size=500)
+    for i, (timestamp, value) in enumerate(zip(timestamps, values)):
+        window.push(timestamp, value)
+        # Samples strictly newer than timestamp - window_size are kept
+        kept = (timestamps[:i + 1] > timestamp - 1.0)
+        assert len(window) == kept.sum()
+        assert np.isclose(window.sum(), values[:i + 1][kept].sum())
+        assert np.isclose(window.mean(), values[:i + 1][kept].mean())
+
+def test_grows_past_its_capacity_without_losing_samples():
+    window = RollingWindow(window_size=10.0, capacity=4)
+    for i in range(100):
+        window.push(i * 0.01, 1.0)
+    assert len(window) == 100
+    assert window.sum() == 100.0
+
+def test_ready_once_samples_span_a_whole_window():
+    window = RollingWindow.for_rate(window_size=2.0, rate=30)
+    window.push(10.0, 1.0)
+    assert not window.is_ready(11.9)
+    assert window.is_ready(12.0)
+    window.reset()
+    assert len(window) == 0 and window.mean() == 0.0 and not window.is_ready(100.0)
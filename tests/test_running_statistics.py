@@ -0,0 +1,41 @@
+import math
+
+import numpy as np
+
+from Utils.RunningStatistics import P2Quantile, RunningStatistics
+
+def test_mean_variance_and_extremes_match_numpy():
+    values = np.random.default_rng(seed=1).normal(0.3, 0.05, size=5000)
+    statistics = RunningStatistics()
+    for value in values:
+        statistics.update(value)
+    assert statistics.count == len(values)
+    assert math.isclose(statistics.get_mean(), values.mean(), rel_tol=1e-12)
+    assert math.isclose(statistics.get_variance(), values.var(ddof=1), rel_tol=1e-9)
+    assert statistics.min == values.min() and statistics.max == values.max()
+
+def test_p2_quantiles_track_numpy_percentile():
+    values = np.random.default_rng(seed=2).gamma(2.0, 1.0, size=20000)
+    for quantile in (0.05, 0.5, 0.95):
+        sketch = P2Quantile(quantile)
+        for value in values:
+            sketch.update(value)
+        exact = np.percentile(values, quantile * 100)
+        # Five markers are within a couple of percent on a smooth distribution
+        assert math.isclose(sketch.value(), exact, rel_tol=0.02)
+
+def test_few_values_use_the_exact_quantile():
+    sketch = P2Quantile(0.5)
+    for value in (3.0, 1.0, 2.0):
+        sketch.update(value)
+    assert sketch.value() == 2.0
+    assert math.isnan(P2Quantile(0.5).value())
+
+def test_missing_values_are_ignored_like_dropna():
+    statistics = RunningStatistics()
+    for value in (1.0, "NaN", None, math.nan, 3.0):
+        statistics.update(value)
+    assert statistics.count == 2
+    assert statistics.get_mean() == 2.0
+    summary = statistics.as_dict("perclos")
+    assert summary["perclos_count"] == 2 and summary["perclos_p50"] == 2.0